@@ -1,7 +1,13 @@
-from PyQt4 import QtGui
+from PyQt4.QtGui import QColor
 
+from canvas.GLightWeightTag import GLightWeightTag
 
-class GAnnotatedTag(QtGui.QGraphicsItem):
+# Graphics Properties
+NODE_SELECTED_COLOR = QColor(128, 64, 0)
+NODE_UNSELECTED_COLOR = QColor(176, 112, 32)
+
+
+class GAnnotatedTag(GLightWeightTag):
     """
     A graphics item representing an annotated tag
 
@@ -15,6 +21,35 @@ class GAnnotatedTag(QtGui.QGraphicsItem):
     ensuring the authenticity of the tag.
 
     GAnnotatedTags appear as rectangles containing the relevant data,
-    depending on properties of the tag it represents
+    depending on properties of the tag it represents: the name of the
+    tag, with its tagger, date and message shown as a tooltip.
+
+    Attributes:
+        tag: The AnnotatedTag this label represents.
     """
-    pass
\ No newline at end of file
+
+    def __init__(self, tag):
+        """
+        Constructor
+
+        :param tag: The git annotated tag to be represented
+        """
+
+        super().__init__(tag)
+
+        # Describe the tag when hovered over
+        tool_tip_lines = [tag.name]
+        if tag.tagger is not None:
+            tool_tip_lines.append("{0} <{1}>".format(tag.tagger.name, tag.tagger.email))
+        if tag.date_tagged is not None:
+            tool_tip_lines.append(str(tag.date_tagged))
+        if tag.message:
+            tool_tip_lines.extend(["", tag.message.strip()])
+        self.setToolTip("\n".join(tool_tip_lines))
+
+    def get_color(self):
+        """
+        Return the background color of the tag, based on whether it is
+        selected
+        """
+        return NODE_SELECTED_COLOR if self.isSelected() else NODE_UNSELECTED_COLOR
@@ -1,7 +1,7 @@
 import logging
 from PyQt4 import QtGui
-from PyQt4.QtCore import QRectF, QPointF
-from PyQt4.QtGui import QColor, QFont, QFontMetrics
+from PyQt4.QtCore import QRectF, QPointF, Qt
+from PyQt4.QtGui import QColor, QFont, QFontMetrics, QPen
 
 # Graphics properties
 NODE_WIDTH = 75
@@ -13,6 +13,8 @@ NODE_TEXT_COLOR = QColor(255, 255, 255)
 NODE_TEXT_FONT_SIZE = 9
 NODE_SHA_LENGTH = 6
 NODE_LABEL_TEXT = 'commit'
+TRUNCATED_MARKER_MARGIN = 8
+TRUNCATED_MARKER_COLOR = QColor(255, 255, 255)
 
 
 class GCommitNode(QtGui.QGraphicsItem):
@@ -27,10 +29,16 @@ class GCommitNode(QtGui.QGraphicsItem):
     Inside a GCommitNode, there are two strings, a string labeling this
     as a commit, and a sha string, showing the sha of the commit.
 
+    When only part of the history is loaded, a commit whose parents
+    have not been loaded yet is drawn with a dashed line along its
+    bottom, showing that its history continues.
+
     Attributes:
         commit: The underlying Commit that this node represents
         children: A list of our children GCommitNodes
         parents: A List of our parent GCommitNodes
+        labels: A list of the branch and tag labels (and the HEAD
+            pointer) attached to this node, which move along with it
 
     """
 
@@ -48,7 +56,7 @@ class GCommitNode(QtGui.QGraphicsItem):
         self.commit = commit
         self.children = []
         self.parents = []
-        self._branch_labels = []
+        self.labels = []
 
         # Ensure that object can be selected and dragged around
         self.setFlag(QtGui.QGraphicsItem.ItemIsMovable, True)
@@ -85,6 +93,10 @@ class GCommitNode(QtGui.QGraphicsItem):
         # Render the node text
         self.paint_text(QPainter)
 
+        # Show that the history continues past the commits loaded
+        if getattr(self.commit, "truncated", False):
+            self.paint_truncated_marker(QPainter)
+
     def paint_rectangle(self, QPainter):
         """
         Renders the node rectangle
@@ -95,6 +107,19 @@ class GCommitNode(QtGui.QGraphicsItem):
         QPainter.drawRoundedRect(0, 0, NODE_WIDTH, NODE_HEIGHT, NODE_CORNER_RADIUS,
                                  NODE_CORNER_RADIUS)
 
+    def paint_truncated_marker(self, QPainter):
+        """
+        Renders a dashed line along the bottom of the node, showing that
+        its parents have not been loaded
+
+        :param QPainter: interface to the canvas
+        """
+
+        marker_y = NODE_HEIGHT - TRUNCATED_MARKER_MARGIN
+        QPainter.setPen(QPen(TRUNCATED_MARKER_COLOR, 1, Qt.DashLine))
+        QPainter.drawLine(QPointF(TRUNCATED_MARKER_MARGIN, marker_y),
+                          QPointF(NODE_WIDTH - TRUNCATED_MARKER_MARGIN, marker_y))
+
     def paint_text(self, QPainter):
         """
         Render the node text (commit sha and label)
@@ -132,12 +157,12 @@ class GCommitNode(QtGui.QGraphicsItem):
         # If we've been moved
         if change == QtGui.QGraphicsItem.ItemPositionChange:
 
-            # Move our branch labels along with us
-            for branch in self._branch_labels:
-                # Calculate our delta and apply it to this branch label
+            # Move our labels along with us
+            for label in self.labels:
+                # Calculate our delta and apply it to this label
                 delta_x = p_object.x() - self.pos().x()
                 delta_y = p_object.y() - self.pos().y()
-                branch.setPos(branch.pos().x() + delta_x, branch.pos().y() + delta_y)
+                label.setPos(label.pos().x() + delta_x, label.pos().y() + delta_y)
 
             # Update the scene (if it is ready)
             if self.scene():
@@ -151,10 +176,34 @@ class GCommitNode(QtGui.QGraphicsItem):
         # Propagate along the event
         return super().itemChange(change, p_object)
 
+    def set_commit(self, commit):
+        """
+        Make this node represent a different commit, forgetting its
+        links and labels, so it can be reused for another commit
+        instead of creating a new node
+
+        :param commit: the CommitNode this GCommitNode represents
+        """
+        self.setSelected(False)
+        self.commit = commit
+        self.children = []
+        self.parents = []
+        self.labels = []
+        self.update()
+
     def add_branch_label(self, branch_label):
         """
         Associate a branch label with this commit
 
         :param branch_label: The branch label to associate
         """
-        self._branch_labels.append(branch_label)
\ No newline at end of file
+        self.add_label(branch_label)
+
+    def add_label(self, label):
+        """
+        Associate a label (a branch or tag label, or the HEAD pointer)
+        with this commit
+
+        :param label: The label to associate
+        """
+        self.labels.append(label)
\ No newline at end of file
@@ -58,6 +58,18 @@ class GConnectionLine(QtGui.QGraphicsLineItem):
         self._line = None
         self._origin_point = None
 
+    def set_endpoints(self, origin, destination):
+        """
+        Connect this line to different objects, keeping its attachment
+        strategies, so it can be reused instead of creating a new line
+
+        :param origin: the node from which this line originates
+        :param destination: the node into which this line terminates
+        """
+        self._origin = origin
+        self._destination = destination
+        self.update()
+
     def paint(self, QPainter, QStyleOptionGraphicsItem, QWidget_widget=None):
         """
         Performs the rendering of the QGraphicsItem
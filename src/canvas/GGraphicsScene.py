@@ -1,17 +1,31 @@
-from PyQt4.QtCore import pyqtSignal
+from array import array
+
+import numpy
+from PyQt4.QtCore import QRectF, pyqtSignal
 from PyQt4.QtGui import QBrush
+from canvas.GAnnotatedTag import GAnnotatedTag
 from canvas.GBranchLabel import GBranchLabel
 from canvas import rendering_algorithms
 from PyQt4 import QtGui
 from canvas.GCommitArrow import GCommitArrow
-from canvas.GCommitNode import GCommitNode
+from canvas.GCommitNode import GCommitNode, NODE_HEIGHT, NODE_WIDTH
 from canvas.GConnectionLine import GConnectionLine
+from canvas.GHeadPointer import GHeadPointer
+from canvas.GLightWeightTag import GLightWeightTag
 
+from git.AnnotatedTag import AnnotatedTag
 from git.Commit import Commit
 
 
 # Graphics properties
 CANVAS_BACKGROUND_COLOR = QtGui.QColor(232, 232, 232)
+PROGRESSIVE_X_SPACING = 100
+PROGRESSIVE_Y_SPACING = 100
+# The position of the first label to the right of a commit, and the spacing of the others
+LABEL_X_OFFSET = 150
+LABEL_X_SPACING = 80
+# The position of the HEAD pointer above the branch label or commit it points to
+HEAD_POINTER_Y_OFFSET = -50
 
 
 class GGraphicsScene(QtGui.QGraphicsScene):
@@ -23,9 +37,16 @@ class GGraphicsScene(QtGui.QGraphicsScene):
     scene.
 
     A GGraphicsScene hosts GCommitNodes, GBranchLabels, GCommitArrows,
-    and other GGraphicsItem subclasses. It contains the graphs that
+    GLightWeightTags, GAnnotatedTags, a GHeadPointer, and other
+    GGraphicsItem subclasses. It contains the graphs that
     represent a repository.
 
+    The position of every commit is computed up front, into arrays, by
+    the layout algorithms (see rendering_algorithms), but GCommitNodes
+    are only moved into place and added to the scene (along with their
+    arrows) once they come into view, so the cost of drawing a large
+    history depends on how much of it is looked at.
+
     Signals:
         commitnode_selected(Commit):
             The CommitNode for the given commit was selected
@@ -48,34 +69,472 @@ class GGraphicsScene(QtGui.QGraphicsScene):
         # node twice (as it may be a child of multiple parents)
         self._sha_to_node = {}
 
-
-    def render_scene(self, commit, branches):
+        # A mapping of branch names to GBranchLabels, so the HEAD
+        # pointer can point to the checked out branch
+        self._branch_name_to_label = {}
+
+        # The rows and lanes of the commits added progressively
+        self._lanes = rendering_algorithms.LaneAllocator()
+
+        # Every GCommitNode laid out, with its index, coordinates, and
+        # whether it has been added to the scene yet, and the extent of
+        # the layout
+        self._layout_nodes = []
+        self._layout_indices = {}
+        self._layout_xs = array("d")
+        self._layout_ys = array("d")
+        self._layout_applied = bytearray()
+        self._layout_rect = QRectF()
+
+        # The arrows not yet added to the scene, with the node at their
+        # other end, by the id of each node they connect
+        self._pending_arrows = {}
+
+        # The topmost row, and the SHA-1 of the topmost commit in each
+        # column, for inserting new commits above the others
+        self._top_row = 0
+        self._column_tops = {}
+
+        # The labels (and their connection lines) on the canvas, and
+        # the GCommitNodes they are attached to
+        self._label_items = []
+        self._labelled_nodes = []
+
+    def render_scene(self, commit, branches, tags=(), head=None):
         """
         Renders the various elements of the canvas
 
         First, the commits are parsed recursively and rendered onto
-        the canvas as GCommitNodes in a graph arrangement. Arrows
-        are drawn to show parent-child relationships.
+        the canvas as GCommitNodes in a layered graph arrangement (see
+        rendering_algorithms.layered_layout). Arrows are drawn to show
+        parent-child relationships.
 
-        Then, branch and tag labels are drawn next to their commits
+        Then, branch and tag labels are drawn next to their commits,
+        and the HEAD pointer above the branch or commit it points to
 
         :param commit: The root of the commit tree to render
         :param branches: The branches of the commit tree to render
+        :param tags: The tags of the commit tree to render
+        :param head: The HeadPointer of the commit tree to render, if
+            any
         """
 
         # Convert our Commit tree to a tree of GCommitNode objects
         root_g_commit_node = self._node_tree_from_commit(commit)
 
-        # Measure layout of tree with chosen algorithm
-        rendering_algorithms.minimum_width(root_g_commit_node)
+        # Measure layout of graph with chosen algorithm
+        g_commit_nodes, parent_indices = rendering_algorithms.graph_from_nodes(root_g_commit_node)
+        layers, columns = rendering_algorithms.layered_layout(parent_indices)
+        self._extend_layout(g_commit_nodes,
+                            *rendering_algorithms.compute_coordinates(columns, layers))
 
         # Render commits onto canvas
         self._render_commit_tree(root_g_commit_node)
+        self.apply_visible_layout()
+
+        # Render branches, tags and HEAD onto the canvas
+        self.render_branch_labels(branches)
+        self.render_tag_labels(tags)
+        self.render_head_pointer(head)
+
+    def add_commits(self, commits):
+        """
+        Render a batch of commits as they are loaded, newest first
+
+        Each commit is drawn on its own row, below the commits added
+        before it, in the lane its child expects it in (or the first
+        free lane), so history fills in downward as it arrives (see
+        rendering_algorithms.LaneAllocator). An arrow is drawn for each
+        parent/child relationship as soon as both commits are on the
+        canvas.
+
+        :param commits: The newly loaded commits, newest first
+        """
+
+        first_row = len(self._lanes)
+        edges = []
+        for commit in commits:
+            # Place the commit on the next row, in its lane
+            row, column, lane_edges = self._lanes.place(
+                commit.sha, [parent.sha for parent in commit.parents])
+            self._column_tops.setdefault(column, commit.sha)
+
+            # Connect the commit to the children and parents already laid out
+            for lane_edge in lane_edges:
+                edges.append((lane_edge.parent, lane_edge.child))
+
+            # And to any children inserted above the lanes since the repo was loaded
+            for child in commit.children:
+                if child.sha not in self._lanes and self._has_commit(child.sha):
+                    edges.append((commit.sha, child.sha))
+
+        # Position the whole batch at once
+        self._add_to_layout(commits, *rendering_algorithms.compute_coordinates(
+            self._lanes.columns[first_row:], numpy.arange(first_row, len(self._lanes)),
+            PROGRESSIVE_X_SPACING, PROGRESSIVE_Y_SPACING), edges=edges)
+
+    def insert_commits(self, commits):
+        """
+        Render commits added to the repository since it was loaded,
+        above the commits already on the canvas
+
+        The new commits are drawn upward from the top row, oldest
+        first, so every commit is still above its parents. A commit
+        continues the column of its first parent if nothing has been
+        drawn above the parent yet, and otherwise starts a new column.
+        Nothing already on the canvas is moved.
+
+        :param commits: The new commits, newest first
+        """
+
+        num_columns = max(self._lanes.num_lanes, max(self._column_tops, default=-1) + 1)
+        inserted_commits = []
+        inserted_shas = set()
+        columns = []
+        rows = []
+        edges = []
+        for commit in reversed(commits):
+            if commit.sha in inserted_shas or self._has_commit(commit.sha):
+                continue
+
+            # Continue the first parent's column if the parent is at its top
+            column = None
+            if commit.parents:
+                first_parent_sha = commit.parents[0].sha
+                for top_column, top_sha in self._column_tops.items():
+                    if top_sha == first_parent_sha:
+                        column = top_column
+                        break
+            if column is None:
+                column = num_columns
+                num_columns += 1
+            self._column_tops[column] = commit.sha
+
+            # Position the commit on a new row above all the others
+            self._top_row -= 1
+            inserted_commits.append(commit)
+            inserted_shas.add(commit.sha)
+            columns.append(column)
+            rows.append(self._top_row)
+
+            # Connect the commit to its parents (its children are newer, so are drawn after it)
+            for parent in commit.parents:
+                if parent.sha in inserted_shas or self._has_commit(parent.sha):
+                    edges.append((parent.sha, commit.sha))
+
+        self._add_to_layout(inserted_commits, *rendering_algorithms.compute_coordinates(
+            columns, rows, PROGRESSIVE_X_SPACING, PROGRESSIVE_Y_SPACING), edges=edges)
+
+    def apply_layered_layout(self, shas, layers, columns):
+        """
+        Move every commit on the canvas to its place in a layered layout
+        of the history (see rendering_algorithms.layered_layout), so that
+        it reads as the graph it is, with as few lines crossing as
+        possible
+
+        The layout is computed off the GUI thread (see
+        RepositoryLoader) once the complete history has been loaded;
+        this only moves the commits. The newest commits stay at the top,
+        and commits inserted afterwards are drawn above them (see
+        insert_commits). A layout that does not include every commit on
+        the canvas (e.g., one computed before commits were inserted) is
+        ignored.
+
+        :param shas: The Sha1 of each node of the layout
+        :param layers: A NumPy array of the layer of each node
+        :param columns: A NumPy array of the column of each node
+        """
+        commits = self._get_layout_commits()
+        if not commits:
+            return
+        sha_indices = {sha: i for i, sha in enumerate(shas)}
+        order = [sha_indices.get(commit.sha) for commit in commits]
+        if None in order:
+            return
+        layers = layers[order]
+        columns = columns[order]
+
+        # Flip the layers, so that children are drawn above their parents as they are when loading
+        rows = layers.max() - layers
+        self._top_row = 0
+        self._column_tops = {}
+        column_list = columns.tolist()
+        for i in numpy.argsort(rows, kind="stable").tolist():
+            self._column_tops.setdefault(column_list[i], commits[i].sha)
+
+        self._layout_rect = QRectF()
+        self._set_layout(*rendering_algorithms.compute_coordinates(
+            columns, rows, PROGRESSIVE_X_SPACING, PROGRESSIVE_Y_SPACING))
+
+    def apply_layout(self, rect, first_index=0):
+        """
+        Move the commits laid out within the given region of the scene
+        into place, and add them to the scene, along with their arrows
+
+        Called for the region about to be drawn whenever the background
+        is drawn, so commits are added as they are scrolled into view.
+
+        :param rect: The QRectF of the region, in scene coordinates
+        :param first_index: The index in the layout of the first commit
+            to consider (e.g., the first of those just laid out)
+        """
+        if len(self._layout_nodes) <= first_index:
+            return
+        xs = numpy.frombuffer(self._layout_xs)[first_index:]
+        ys = numpy.frombuffer(self._layout_ys)[first_index:]
+        applied = numpy.frombuffer(self._layout_applied, dtype=numpy.bool_)[first_index:]
+
+        # Include the nodes whose top left corners are above or left of the region
+        indices = rendering_algorithms.find_visible(xs, ys, rect.left(), rect.top(),
+                                                    rect.right(), rect.bottom(),
+                                                    max(NODE_WIDTH, NODE_HEIGHT))
+        indices = indices[~applied[indices]] + first_index
+        del xs, ys, applied
+        for i in indices.tolist():
+            self._apply_node(i)
+
+    def apply_visible_layout(self, first_index=0):
+        """
+        Move the commits laid out within the visible region of each view
+        of the scene into place (see apply_layout)
+
+        :param first_index: The index in the layout of the first commit
+            to consider
+        """
+        for view in self.views():
+            self.apply_layout(view.mapToScene(view.viewport().rect()).boundingRect(), first_index)
+
+    def drawBackground(self, painter, rect):
+        """
+        Draw the background of the given region, after adding the
+        commits laid out within it to the scene
+
+        :param painter: The QPainter to draw with
+        :param rect: The exposed QRectF, in scene coordinates
+        """
+        self.apply_layout(rect)
+        super().drawBackground(painter, rect)
+
+    def clear_labels(self):
+        """
+        Remove every branch and tag label, and the HEAD pointer, from
+        the canvas, so they can be rendered again once refs change
+        """
+        for item in self._label_items:
+            self.removeItem(item)
+        for g_commit_node in self._labelled_nodes:
+            g_commit_node.labels = []
+        self._label_items = []
+        self._labelled_nodes = []
+        self._branch_name_to_label = {}
+
+    def render_branch_labels(self, branches):
+        """
+        Render labels for the given branches, once the commits they
+        point to have been added progressively
+
+        :param branches: The branches whose labels are to be rendered
+        """
+        self._render_branch_labels([branch for branch in branches
+                                    if self._has_commit(branch.commit_sha)])
+
+    def render_tag_labels(self, tags):
+        """
+        Render labels for the given tags that point to commits on the
+        canvas (tags of trees, blobs or commits that were not loaded are
+        left out)
+
+        :param tags: The Tags and AnnotatedTags to be rendered
+        """
+        for tag in tags:
+            corresponding_commit = self._find_node(tag.commit_sha)
+            if corresponding_commit is None:
+                continue
+            if isinstance(tag, AnnotatedTag):
+                new_tag_label = GAnnotatedTag(tag)
+            else:
+                new_tag_label = GLightWeightTag(tag)
+            self._attach_label(new_tag_label, corresponding_commit)
+
+    def render_head_pointer(self, head):
+        """
+        Render the HEAD pointer above the label of the checked out
+        branch, or above the checked out commit if HEAD is detached
+
+        :param head: The HeadPointer to be rendered, or None
+        """
+        if head is None:
+            return
+        corresponding_commit = self._find_node(head.commit_sha)
+        if corresponding_commit is None:
+            return
+        g_head_pointer = GHeadPointer(head)
+        self._position_node(corresponding_commit)
+        branch_label = self._branch_name_to_label.get(head.branch_name)
+        target = branch_label if branch_label is not None else corresponding_commit
+        g_head_pointer.setPos(target.pos().x(), target.pos().y() + HEAD_POINTER_Y_OFFSET)
+        new_connection_line = GConnectionLine(target,
+                                              GConnectionLine.ATTACH_MODE_TOP,
+                                              g_head_pointer,
+                                              GConnectionLine.ATTACH_MODE_BOTTOM)
+
+        # Move the HEAD pointer along with the commit
+        corresponding_commit.add_label(g_head_pointer)
+        self._labelled_nodes.append(corresponding_commit)
+        self._label_items.extend([g_head_pointer, new_connection_line])
+        self.addItem(g_head_pointer)
+        self.addItem(new_connection_line)
+        self._grow_scene_rect(g_head_pointer.sceneBoundingRect())
+
+    def _add_to_layout(self, commits, xs, ys, edges=()):
+        """
+        Create a GCommitNode for each of the given commits, to be moved
+        to the given coordinates and added to the scene once in view,
+        and an arrow for each of the given edges
+
+        :param commits: The Commits to add
+        :param xs: A NumPy array of the x coordinate of each commit
+        :param ys: A NumPy array of the y coordinate of each commit
+        :param edges: (parent SHA-1, child SHA-1) tuples of the edges to
+            draw arrows for, between commits on the canvas
+        """
+        first_index = len(self._layout_nodes)
+        self._extend_layout([self._get_commit_node(commit) for commit in commits], xs, ys)
+        for parent_sha, child_sha in edges:
+            self._add_progressive_arrow(self._sha_to_node[parent_sha],
+                                        self._sha_to_node[child_sha])
+        self.apply_visible_layout(first_index)
+
+    def _has_commit(self, sha):
+        """
+        Return True if the commit with the given SHA-1 is on the canvas
+
+        :param sha: The Sha1 of the commit
+        """
+        return sha in self._sha_to_node
+
+    def _find_node(self, sha):
+        """
+        Return the GCommitNode to attach labels to for the commit with
+        the given SHA-1, or None if the commit is not on the canvas
 
-        # Render branches onto the canvas
-        self._render_branch_labels(branches)
+        :param sha: The Sha1 of the commit
+        """
+        return self._sha_to_node.get(sha)
 
-    def _render_commit_tree(self, g_commit_node):
+    def _add_progressive_arrow(self, g_parent_node, g_child_node):
+        """
+        Link two GCommitNodes and render an arrow from child to parent
+        """
+        g_parent_node.children.append(g_child_node)
+        g_child_node.parents.append(g_parent_node)
+        self._add_arrow(g_parent_node, g_child_node)
+
+    def _add_arrow(self, g_parent_node, g_child_node):
+        """
+        Render an arrow from child to parent, once either of them has
+        been added to the scene
+        """
+        commit_arrow = GCommitArrow(g_parent_node,
+                                    GConnectionLine.ATTACH_MODE_SMOOTH,
+                                    g_child_node,
+                                    GConnectionLine.ATTACH_MODE_AUTO_CENTER)
+        if g_parent_node.scene() is self or g_child_node.scene() is self:
+            self._position_node(g_parent_node)
+            self._position_node(g_child_node)
+            self.addItem(commit_arrow)
+        else:
+            self._pending_arrows.setdefault(id(g_parent_node), []).append(
+                (commit_arrow, g_child_node))
+            self._pending_arrows.setdefault(id(g_child_node), []).append(
+                (commit_arrow, g_parent_node))
+
+    def _extend_layout(self, g_commit_nodes, xs, ys):
+        """
+        Add GCommitNodes to the layout, to be moved into place and added
+        to the scene once they are in view
+
+        :param g_commit_nodes: The GCommitNodes to add
+        :param xs: A NumPy array of the x coordinate of each node
+        :param ys: A NumPy array of the y coordinate of each node
+        """
+        for g_commit_node in g_commit_nodes:
+            self._layout_indices[id(g_commit_node)] = len(self._layout_nodes)
+            self._layout_nodes.append(g_commit_node)
+        self._layout_xs.extend(xs.tolist())
+        self._layout_ys.extend(ys.tolist())
+        self._layout_applied.extend(bytes(len(g_commit_nodes)))
+        if len(g_commit_nodes):
+            left, top = xs.min(), ys.min()
+            self._grow_scene_rect(QRectF(left, top, xs.max() - left + NODE_WIDTH,
+                                         ys.max() - top + NODE_HEIGHT))
+
+    def _get_layout_commits(self):
+        """
+        Return a list of the Commits on the canvas, in the order of the
+        layout
+        """
+        return [g_commit_node.commit for g_commit_node in self._layout_nodes]
+
+    def _set_layout(self, xs, ys):
+        """
+        Replace the coordinates of every commit on the canvas, moving
+        the GCommitNodes already on the scene
+
+        :param xs: A NumPy array of the x coordinate of each commit, in
+            the order of the layout
+        :param ys: A NumPy array of the y coordinate of each commit
+        """
+        self._layout_xs = array("d", xs.tolist())
+        self._layout_ys = array("d", ys.tolist())
+        applied = numpy.flatnonzero(numpy.frombuffer(self._layout_applied,
+                                                     dtype=numpy.bool_)).tolist()
+        for index in applied:
+            self._layout_nodes[index].setPos(self._layout_xs[index], self._layout_ys[index])
+        left, top = xs.min(), ys.min()
+        self._grow_scene_rect(QRectF(left, top, xs.max() - left + NODE_WIDTH,
+                                     ys.max() - top + NODE_HEIGHT))
+        self.apply_visible_layout()
+
+    def _apply_node(self, index):
+        """
+        Move the laid out GCommitNode with the given index into place,
+        and add it to the scene, along with its arrows
+
+        :param index: The index of the node in the layout
+        """
+        g_commit_node = self._layout_nodes[index]
+        self._layout_applied[index] = 1
+        g_commit_node.setPos(self._layout_xs[index], self._layout_ys[index])
+        self.addItem(g_commit_node)
+        for commit_arrow, g_other_node in self._pending_arrows.pop(id(g_commit_node), ()):
+            if commit_arrow.scene() is None:
+                # Put the node at the other end in place too, so the arrow points the right way
+                self._position_node(g_other_node)
+                self.addItem(commit_arrow)
+
+    def _position_node(self, g_commit_node):
+        """
+        Move the given GCommitNode to its place in the layout, if it has
+        not been added to the scene yet (and so has not been moved)
+
+        :param g_commit_node: A GCommitNode
+        """
+        index = self._layout_indices.get(id(g_commit_node))
+        if index is not None and not self._layout_applied[index]:
+            g_commit_node.setPos(self._layout_xs[index], self._layout_ys[index])
+
+    def _grow_scene_rect(self, rect):
+        """
+        Extend the scene to include the given region, which may hold
+        commits not yet added to it
+
+        :param rect: A QRectF in scene coordinates
+        """
+        self._layout_rect = self._layout_rect.united(rect)
+        self.setSceneRect(self._layout_rect)
+
+    def _render_commit_tree(self, root_g_commit_node):
         """
         Render a tree/graph of commits onto the canvas
 
@@ -83,29 +542,37 @@ class GGraphicsScene(QtGui.QGraphicsScene):
         encapsulate commit nodes. Previously our tree of Commit objects
         has been traversed and each node converted to a GCommitNode and
         assigned coordinates based on the particular tree drawing
-        algorithm chosen. This method simple renders each node at its
-        given x and y coordinates in a preorder traversal.
+        algorithm chosen. The nodes themselves are added to the scene
+        as they come into view (see apply_layout); this method renders
+        arrows to indicate a parent child relationship between nodes.
+
+        Each node is visited once, in preorder, with an explicit stack,
+        so a node shared by several parents (after a merge) only has
+        its arrows rendered once, and long histories cannot exceed the
+        recursion limit.
 
-        While drawing nodes, we also draw arrows to indicate a parent
-        child relationship between nodes.
+        :param root_g_commit_node: The GCommitNode at the root of the
+            graph
         """
 
-        # Add this node to the scene
-        self.addItem(g_commit_node)
+        visited = {id(root_g_commit_node)}
+        stack = [root_g_commit_node]
+        while stack:
+            g_commit_node = stack.pop()
 
-        # For each child node
-        for child in g_commit_node.children:
-            # Render an arrow from child to parent
-            commit_arrow = GCommitArrow(g_commit_node,
-                                        GConnectionLine.ATTACH_MODE_SMOOTH,
-                                        child,
-                                        GConnectionLine.ATTACH_MODE_AUTO_CENTER)
-            self.addItem(commit_arrow)
+            # For each child node
+            unvisited_children = []
+            for child in g_commit_node.children:
+                # Render an arrow from child to parent
+                self._add_arrow(g_commit_node, child)
 
-            # And recursively render child
-            self._render_commit_tree(child)
+                # And render the child's arrows, if they have not been already
+                if id(child) not in visited:
+                    visited.add(id(child))
+                    unvisited_children.append(child)
+            stack.extend(reversed(unvisited_children))
 
-    def _node_tree_from_commit(self, commit, parent=None):
+    def _node_tree_from_commit(self, root_commit):
         """
         Converts a Commit tree into a GCommitNode tree
 
@@ -115,35 +582,54 @@ class GGraphicsScene(QtGui.QGraphicsScene):
 
         This method traverses a tree rooted at the provided Commit and
         constructs a GCommitNode tree of the same structure, preserving
-        parent-child relationships.
-        """
+        parent-child relationships. Each commit is visited once, in
+        preorder, with an explicit stack, so a commit with several
+        parents gets one GCommitNode, linked once to each parent, and
+        its descendants are only traversed once.
 
-        num_of_children = len(commit.children)
+        :param root_commit: The Commit at the root of the tree
+        :return: The GCommitNode of the root commit
+        """
 
-        # Make sure we haven't already processed this commit (via
-        # another parent)
-        # Grab the existing one if present
-        if commit.sha in self._sha_to_node:
+        root_g_commit_node = self._get_commit_node(root_commit)
+        visited = {root_commit.sha}
+        # The (parent, child) GCommitNode ids already linked, so each link is made once
+        links = set()
+        stack = [root_commit]
+        while stack:
+            commit = stack.pop()
             g_commit_node = self._sha_to_node[commit.sha]
-        # Otherwise we need a new one
-        else:
-            g_commit_node = GCommitNode(commit)
 
-        # If this is a recursive call, attach calling parent
-        if parent:
-            g_commit_node.parents.append(parent)
-
-        # If our commit has children, recursively call ourselves
-        # on each child and add the gcommitnode returned to our
-        # children set
-        for commit_child in commit.children:
-            new_g_commit_node = self._node_tree_from_commit(commit_child, g_commit_node)
-            g_commit_node.children.append(new_g_commit_node)
-
-        # Add this to our global mapping of shas to gcommitnodes
-        self._sha_to_node[commit.sha] = g_commit_node
+            # Link each child's GCommitNode to this one, creating it on
+            # the first visit from any of its parents
+            unvisited_children = []
+            for commit_child in commit.children:
+                g_child_node = self._get_commit_node(commit_child)
+                link = (id(g_commit_node), id(g_child_node))
+                if link not in links:
+                    links.add(link)
+                    g_commit_node.children.append(g_child_node)
+                    g_child_node.parents.append(g_commit_node)
+                if commit_child.sha not in visited:
+                    visited.add(commit_child.sha)
+                    unvisited_children.append(commit_child)
+
+            # Visit the children leftmost first
+            stack.extend(reversed(unvisited_children))
+
+        return root_g_commit_node
+
+    def _get_commit_node(self, commit):
+        """
+        Return the GCommitNode of the given commit, creating it if it
+        has not been created yet
 
-        # Return newly converted gcommitnode
+        :param commit: The Commit the GCommitNode represents
+        """
+        g_commit_node = self._sha_to_node.get(commit.sha)
+        if g_commit_node is None:
+            g_commit_node = GCommitNode(commit)
+            self._sha_to_node[commit.sha] = g_commit_node
         return g_commit_node
 
     def _render_branch_labels(self, branches):
@@ -158,19 +644,36 @@ class GGraphicsScene(QtGui.QGraphicsScene):
         for branch in branches:
             # Create a representing branch label
             new_branch_label = GBranchLabel(branch)
+            self._branch_name_to_label[branch.name] = new_branch_label
 
             # Attach it to its commit via arrow
-            corresponding_commit = self._sha_to_node[branch.commit_sha]
-            new_branch_label.setPos(corresponding_commit.pos().x() + 150,
-                                    corresponding_commit.pos().y())
-            new_connection_line = GConnectionLine(corresponding_commit,
-                                                  GConnectionLine.ATTACH_MODE_SMOOTH,
-                                                  new_branch_label,
-                                                  GConnectionLine.ATTACH_MODE_LEFT)
-
-            # Associate it with its commit corresponding_commit
-            corresponding_commit.add_branch_label(new_branch_label)
-
-            # Render connection line and label
-            self.addItem(new_branch_label)
-            self.addItem(new_connection_line)
\ No newline at end of file
+            corresponding_commit = self._find_node(branch.commit_sha)
+            self._attach_label(new_branch_label, corresponding_commit)
+
+    def _attach_label(self, label, g_commit_node):
+        """
+        Render a label to the right of the given commit's other labels,
+        connected to the commit with a line
+
+        :param label: The branch or tag label to be rendered
+        :param g_commit_node: The GCommitNode of the commit the label
+            points to
+        """
+        self._position_node(g_commit_node)
+        label.setPos(g_commit_node.pos().x() + LABEL_X_OFFSET +
+                     len(g_commit_node.labels) * LABEL_X_SPACING,
+                     g_commit_node.pos().y())
+        new_connection_line = GConnectionLine(g_commit_node,
+                                              GConnectionLine.ATTACH_MODE_SMOOTH,
+                                              label,
+                                              GConnectionLine.ATTACH_MODE_LEFT)
+
+        # Associate it with its commit
+        g_commit_node.add_label(label)
+        self._labelled_nodes.append(g_commit_node)
+
+        # Render connection line and label
+        self._label_items.extend([label, new_connection_line])
+        self.addItem(label)
+        self.addItem(new_connection_line)
+        self._grow_scene_rect(label.sceneBoundingRect())
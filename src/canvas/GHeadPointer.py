@@ -1,5 +1,16 @@
 from PyQt4 import QtGui
 
+# Graphics Properties
+from PyQt4.QtCore import QRectF, QPointF
+from PyQt4.QtGui import QColor, QFont, QFontMetrics
+
+NODE_WIDTH = 60
+NODE_HEIGHT = 30
+NODE_SELECTED_COLOR = QColor(128, 0, 0)
+NODE_UNSELECTED_COLOR = QColor(192, 32, 32)
+NODE_TEXT_COLOR = QColor(255, 255, 255)
+NODE_TEXT_FONT_SIZE = 9
+
 
 class GHeadPointer(QtGui.QGraphicsItem):
     """
@@ -11,5 +22,83 @@ class GHeadPointer(QtGui.QGraphicsItem):
 
     The GHeadPointer is a rectangle containing the word HEAD, and
     maintains a connection to its commit or branch with a line.
+
+    Attributes:
+        head_pointer: The HeadPointer this item represents.
     """
-    pass
\ No newline at end of file
+
+    def __init__(self, head_pointer):
+        """
+        Constructor
+
+        :param head_pointer: The git HEAD pointer to be represented
+        """
+
+        super().__init__()
+        self.head_pointer = head_pointer
+
+        # Ensure that object can be selected and dragged around
+        self.setFlag(QtGui.QGraphicsItem.ItemIsMovable, True)
+        self.setFlag(QtGui.QGraphicsItem.ItemIsSelectable, True)
+        self.setFlag(QtGui.QGraphicsItem.ItemSendsGeometryChanges, True)
+
+    def boundingRect(self):
+        """
+        Define the boundary of this object
+
+        This will determine collision events as well as redrawing
+        responsibilities
+        """
+
+        return QRectF(0, 0, NODE_WIDTH, NODE_HEIGHT)
+
+    def paint(self, QPainter, QStyleOptionGraphicsItem, QWidget_widget=None):
+        """
+        Performs the rendering of the object
+
+        This node will appear as a rectangle containing the word HEAD
+        """
+
+        # Determine background color based on state of selection
+        if self.isSelected():
+            QPainter.setBrush(NODE_SELECTED_COLOR)
+        else:
+            QPainter.setBrush(NODE_UNSELECTED_COLOR)
+
+        # Render the rectangle
+        QPainter.drawRect(0, 0, NODE_WIDTH, NODE_HEIGHT)
+
+        # Set up font and text settings
+        text_font = QFont()
+        text_font.setPointSize(NODE_TEXT_FONT_SIZE)
+        QPainter.setFont(text_font)
+        QPainter.setPen(NODE_TEXT_COLOR)
+
+        # Measure size of strings so they can be centered properly
+        font_metrics = QFontMetrics(text_font)
+        label_text = self.head_pointer.NAME
+        label_text_width = font_metrics.width(label_text)
+        label_text_height = font_metrics.height()
+
+        # Position and render text
+        label_margin_left = (NODE_WIDTH - label_text_width) / 2
+        label_margin_top = (NODE_HEIGHT - label_text_height) / 2
+        label_position = QPointF(label_margin_left, label_margin_top / 2 + label_text_height)
+        QPainter.drawText(label_position, label_text)
+
+    def itemChange(self, change, p_object):
+        """
+        Called when there is a change of some sort to this item
+
+        GraphicsItemChange contains a value indicating the nature of
+        the change
+        """
+
+        # If we've been moved
+        if change == QtGui.QGraphicsItem.ItemPositionChange:
+            # Update the scene (if it is ready)
+            if self.scene():
+                self.scene().update()
+
+        # Propagate along the event
+        return super().itemChange(change, p_object)
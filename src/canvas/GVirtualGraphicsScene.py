@@ -0,0 +1,396 @@
+from array import array
+
+import numpy
+from PyQt4 import QtGui
+from PyQt4.QtCore import QRectF, QTimer
+from canvas import rendering_algorithms
+from canvas.GBranchLabel import GBranchLabel
+from canvas.GCommitArrow import GCommitArrow
+from canvas.GCommitNode import GCommitNode, NODE_HEIGHT, NODE_WIDTH
+from canvas.GConnectionLine import GConnectionLine
+from canvas.GGraphicsScene import GGraphicsScene
+
+# How far past each side of the visible region items are kept, as a fraction of its size, so
+# small scrolls do not create or destroy anything
+VIEWPORT_MARGIN = 0.5
+# The most unused GCommitNodes and GCommitArrows kept for reuse; any more are destroyed
+MAX_POOLED_ITEMS = 1000
+
+
+class GVirtualGraphicsScene(GGraphicsScene):
+    """
+    A GGraphicsScene that only holds items for the commits in view
+
+    The layout of every commit on the canvas is kept in compact arrays:
+    the x and y coordinates of each commit, and the indices of the
+    parent and child of each edge. GCommitNodes and GCommitArrows are
+    only created for the commits and edges within (or just outside of)
+    the region the views of the scene show. The position of a node the
+    user drags is written back to the arrays once it leaves the view. As the views scroll and
+    zoom, the items that leave that region are removed from the scene
+    and kept in a pool, and reused for the commits and edges that come
+    into it, so memory and drawing time depend on what is on screen,
+    not on the size of the repository.
+
+    The labels of each commit (branches, tags and HEAD) are recorded by
+    the index of the commit, and are only created along with its node,
+    and released with it, so a repository with thousands of tags costs
+    no more to draw than one without. GCommitNodes in this scene are
+    not linked to their parents and children, and commits are only
+    drawn as they are loaded (with add_commits and insert_commits), not
+    with render_scene.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        super().__init__()
+
+        # The commit, and the coordinates, of every commit laid out
+        self._commits = []
+        self._sha_to_index = {}
+        self._xs = array("d")
+        self._ys = array("d")
+
+        # The indices of the parent and child commits of every edge
+        self._edge_parents = array("I")
+        self._edge_children = array("I")
+
+        # The items on the scene, by the index of their commit or edge,
+        # and the unused items kept for reuse
+        self._live_nodes = {}
+        self._live_arrows = {}
+        self._node_pool = []
+        self._arrow_pool = []
+
+        # The labels of each labelled commit, by its index, as the base
+        # class method rendering each label and its argument, and the
+        # items of the labels on the scene
+        self._node_labels = {}
+        self._live_labels = {}
+
+        # The region the items on the scene cover, and whether it is
+        # about to be refreshed
+        self._covered_rect = QRectF()
+        self._refresh_pending = False
+
+    def render_branch_labels(self, branches):
+        """
+        Render labels for the given branches, now for the commits in
+        view, and for the others once they come into view
+
+        :param branches: The branches whose labels are to be rendered
+        """
+        for branch in branches:
+            self._add_node_label(branch.commit_sha, GGraphicsScene._render_branch_labels,
+                                 [branch])
+
+    def render_tag_labels(self, tags):
+        """
+        Render labels for the given tags that point to commits on the
+        canvas, now for the commits in view, and for the others once
+        they come into view
+
+        :param tags: The Tags and AnnotatedTags to be rendered
+        """
+        for tag in tags:
+            self._add_node_label(tag.commit_sha, GGraphicsScene.render_tag_labels, [tag])
+
+    def render_head_pointer(self, head):
+        """
+        Render the HEAD pointer, now if its commit is in view, or once
+        it comes into view
+
+        :param head: The HeadPointer to be rendered, or None
+        """
+        if head is not None:
+            self._add_node_label(head.commit_sha, GGraphicsScene.render_head_pointer, head)
+
+    def clear_labels(self):
+        """
+        Remove every branch and tag label, and the HEAD pointer, from
+        the canvas, and forget the labels of the commits out of view
+        """
+        for label_items in self._live_labels.values():
+            for item in label_items:
+                self.removeItem(item)
+        for index in self._live_labels:
+            self._live_nodes[index].labels = []
+        self._node_labels = {}
+        self._live_labels = {}
+        super().clear_labels()
+
+    def refresh_viewport(self):
+        """
+        Create (or reuse) the items for the commits and edges within the
+        region the views show, and release the items outside of it
+
+        Finding the commits and edges in view is a handful of NumPy
+        operations over the layout arrays; only the items that change
+        touch the scene.
+        """
+        self._refresh_pending = False
+        visible_rect = self._get_visible_rect()
+        if visible_rect is None:
+            return
+        margin_x = visible_rect.width() * VIEWPORT_MARGIN
+        margin_y = visible_rect.height() * VIEWPORT_MARGIN
+        rect = visible_rect.adjusted(-margin_x, -margin_y, margin_x, margin_y)
+        self._covered_rect = rect
+        left, top, right, bottom = rect.left(), rect.top(), rect.right(), rect.bottom()
+
+        xs = numpy.frombuffer(self._xs)
+        ys = numpy.frombuffer(self._ys)
+        edge_parents = numpy.asarray(self._edge_parents)
+        edge_children = numpy.asarray(self._edge_children)
+
+        # The commits in the region, and the edges whose bounding boxes cross it (with the commits
+        # at both of their ends, so they can be drawn)
+        needed_nodes = set(rendering_algorithms.find_visible(
+            xs, ys, left, top, right, bottom, max(NODE_WIDTH, NODE_HEIGHT)).tolist())
+        needed_edges = []
+        if len(edge_parents):
+            parent_xs, parent_ys = xs[edge_parents], ys[edge_parents]
+            child_xs, child_ys = xs[edge_children], ys[edge_children]
+            needed_edges = numpy.flatnonzero(
+                (numpy.minimum(parent_xs, child_xs) <= right) &
+                (numpy.maximum(parent_xs, child_xs) + NODE_WIDTH >= left) &
+                (numpy.minimum(parent_ys, child_ys) <= bottom) &
+                (numpy.maximum(parent_ys, child_ys) + NODE_HEIGHT >= top))
+            needed_nodes.update(edge_parents[needed_edges].tolist())
+            needed_nodes.update(edge_children[needed_edges].tolist())
+            needed_edges = needed_edges.tolist()
+        del xs, ys, edge_parents, edge_children
+
+        # Release the items that are no longer needed (arrows first, as they point to nodes)
+        needed_edge_set = set(needed_edges)
+        for edge in [edge for edge in self._live_arrows if edge not in needed_edge_set]:
+            self._release_arrow(edge)
+        for index in [index for index in self._live_nodes if index not in needed_nodes]:
+            self._release_node(index)
+
+        # And create (or reuse) the ones that are
+        for index in needed_nodes:
+            if index not in self._live_nodes:
+                self._materialize_node(index)
+        for edge in needed_edges:
+            if edge not in self._live_arrows:
+                self._materialize_arrow(edge)
+
+    def drawBackground(self, painter, rect):
+        """
+        Draw the background of the given region, and refresh the items
+        on the scene once this paint is done if the views have scrolled
+        or zoomed out of the region they cover
+
+        :param painter: The QPainter to draw with
+        :param rect: The exposed QRectF, in scene coordinates
+        """
+        if not self._refresh_pending:
+            visible_rect = self._get_visible_rect()
+            if visible_rect is not None and not self._covered_rect.contains(visible_rect):
+                # Items are not added or removed in the middle of painting
+                self._refresh_pending = True
+                QTimer.singleShot(0, self.refresh_viewport)
+        QtGui.QGraphicsScene.drawBackground(self, painter, rect)
+
+    def _add_to_layout(self, commits, xs, ys, edges=()):
+        """
+        Add the given commits and edges to the layout arrays, and create
+        items for any of them that are in view
+
+        :param commits: The Commits to add
+        :param xs: A NumPy array of the x coordinate of each commit
+        :param ys: A NumPy array of the y coordinate of each commit
+        :param edges: (parent SHA-1, child SHA-1) tuples of the edges to
+            draw arrows for, between commits on the canvas
+        """
+        in_view = False
+        for commit in commits:
+            self._sha_to_index[commit.sha] = len(self._commits)
+            self._commits.append(commit)
+        self._xs.extend(xs.tolist())
+        self._ys.extend(ys.tolist())
+        for parent_sha, child_sha in edges:
+            parent = self._sha_to_index[parent_sha]
+            child = self._sha_to_index[child_sha]
+            self._edge_parents.append(parent)
+            self._edge_children.append(child)
+            in_view = in_view or parent in self._live_nodes or child in self._live_nodes
+        if len(commits):
+            left, top = xs.min(), ys.min()
+            batch_rect = QRectF(left, top, xs.max() - left + NODE_WIDTH,
+                                ys.max() - top + NODE_HEIGHT)
+            self._grow_scene_rect(batch_rect)
+            in_view = in_view or self._covered_rect.intersects(batch_rect)
+
+        # Commits added out of view (e.g., while loading the rest of a long history) cost nothing
+        # until they are scrolled to
+        if in_view or self._covered_rect.isNull():
+            self.refresh_viewport()
+
+    def _get_layout_commits(self):
+        """
+        Return a list of the Commits on the canvas, in the order of the
+        layout
+        """
+        return self._commits
+
+    def _set_layout(self, xs, ys):
+        """
+        Replace the coordinates of every commit on the canvas, moving
+        the GCommitNodes on the scene, and refresh the items in view
+
+        :param xs: A NumPy array of the x coordinate of each commit, in
+            the order of the layout
+        :param ys: A NumPy array of the y coordinate of each commit
+        """
+        self._xs = array("d", xs.tolist())
+        self._ys = array("d", ys.tolist())
+        for index, g_commit_node in self._live_nodes.items():
+            g_commit_node.setPos(self._xs[index], self._ys[index])
+        left, top = xs.min(), ys.min()
+        self._grow_scene_rect(QRectF(left, top, xs.max() - left + NODE_WIDTH,
+                                     ys.max() - top + NODE_HEIGHT))
+        self._covered_rect = QRectF()
+        self.refresh_viewport()
+
+    def _has_commit(self, sha):
+        """
+        Return True if the commit with the given SHA-1 is on the canvas
+
+        :param sha: The Sha1 of the commit
+        """
+        return sha in self._sha_to_index
+
+    def _find_node(self, sha):
+        """
+        Return the GCommitNode of the commit with the given SHA-1, or
+        None if the commit is not on the scene
+
+        :param sha: The Sha1 of the commit
+        """
+        index = self._sha_to_index.get(sha)
+        if index is None:
+            return None
+        return self._live_nodes.get(index)
+
+    def _add_node_label(self, sha, render, argument):
+        """
+        Record a label of the commit with the given SHA-1, and render it
+        if the commit's node is on the scene
+
+        :param sha: The Sha1 of the commit
+        :param render: The GGraphicsScene method rendering the label
+        :param argument: The argument to pass to render
+        """
+        index = self._sha_to_index.get(sha)
+        if index is None:
+            return
+        self._node_labels.setdefault(index, []).append((render, argument))
+        if index in self._live_nodes:
+            self._create_label(index, render, argument)
+
+    def _create_label(self, index, render, argument):
+        """
+        Render a label of the commit with the given index, whose node is
+        on the scene, keeping its items to release along with the node
+
+        :param index: The index of the commit in the layout
+        :param render: The GGraphicsScene method rendering the label
+        :param argument: The argument to pass to render
+        """
+        first_item = len(self._label_items)
+        first_node = len(self._labelled_nodes)
+        render(self, argument)
+        self._live_labels.setdefault(index, []).extend(self._label_items[first_item:])
+        del self._label_items[first_item:]
+        del self._labelled_nodes[first_node:]
+
+    def _materialize_node(self, index):
+        """
+        Add a GCommitNode for the commit with the given index to the
+        scene, reusing a pooled node if there is one, and return it
+
+        :param index: The index of the commit in the layout
+        """
+        if self._node_pool:
+            g_commit_node = self._node_pool.pop()
+            g_commit_node.set_commit(self._commits[index])
+        else:
+            g_commit_node = GCommitNode(self._commits[index])
+        g_commit_node.setPos(self._xs[index], self._ys[index])
+        self.addItem(g_commit_node)
+        self._live_nodes[index] = g_commit_node
+        for render, argument in self._node_labels.get(index, ()):
+            self._create_label(index, render, argument)
+        return g_commit_node
+
+    def _materialize_arrow(self, edge):
+        """
+        Add a GCommitArrow for the edge with the given index to the
+        scene, between the nodes at its ends, reusing a pooled arrow if
+        there is one
+
+        :param edge: The index of the edge in the layout
+        """
+        g_parent_node = self._live_nodes[self._edge_parents[edge]]
+        g_child_node = self._live_nodes[self._edge_children[edge]]
+        if self._arrow_pool:
+            commit_arrow = self._arrow_pool.pop()
+            commit_arrow.set_endpoints(g_parent_node, g_child_node)
+        else:
+            commit_arrow = GCommitArrow(g_parent_node,
+                                        GConnectionLine.ATTACH_MODE_SMOOTH,
+                                        g_child_node,
+                                        GConnectionLine.ATTACH_MODE_AUTO_CENTER)
+        self.addItem(commit_arrow)
+        self._live_arrows[edge] = commit_arrow
+
+    def _release_node(self, index):
+        """
+        Remove the GCommitNode of the commit with the given index from
+        the scene, keeping it for reuse if the pool is not full
+
+        :param index: The index of the commit in the layout
+        """
+        g_commit_node = self._live_nodes.pop(index)
+        self.removeItem(g_commit_node)
+        for item in self._live_labels.pop(index, ()):
+            self.removeItem(item)
+            if (isinstance(item, GBranchLabel) and
+                    self._branch_name_to_label.get(item.branch.name) is item):
+                del self._branch_name_to_label[item.branch.name]
+
+        # Keep the commit wherever the user may have dragged it
+        self._xs[index] = g_commit_node.pos().x()
+        self._ys[index] = g_commit_node.pos().y()
+        if len(self._node_pool) < MAX_POOLED_ITEMS:
+            g_commit_node.set_commit(None)
+            self._node_pool.append(g_commit_node)
+
+    def _release_arrow(self, edge):
+        """
+        Remove the GCommitArrow of the edge with the given index from
+        the scene, keeping it for reuse if the pool is not full
+
+        :param edge: The index of the edge in the layout
+        """
+        commit_arrow = self._live_arrows.pop(edge)
+        self.removeItem(commit_arrow)
+        if len(self._arrow_pool) < MAX_POOLED_ITEMS:
+            commit_arrow.set_endpoints(None, None)
+            self._arrow_pool.append(commit_arrow)
+
+    def _get_visible_rect(self):
+        """
+        Return the QRectF of the region shown by the views of this scene
+        (the union of the regions, if there are several), in scene
+        coordinates, or None if it has no views
+        """
+        visible_rect = None
+        for view in self.views():
+            view_rect = view.mapToScene(view.viewport().rect()).boundingRect()
+            visible_rect = view_rect if visible_rect is None else visible_rect.united(view_rect)
+        return visible_rect
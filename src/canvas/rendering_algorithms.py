@@ -19,7 +19,37 @@ above, and we must apply modifications to the algorithms used. However,
 because git repos are usually mostly tree-like, and many people prefer
 to visualize them in a hierarchy, we still opt to use tree-drawing
 strategies and make the necessary corrections.
+
+For large histories, a lane layout in the style of git log --graph
+(see LaneAllocator) scales far better than any tree layout: each commit
+gets its own row, and the lines of history run down reusable columns.
+
+The layout algorithms know nothing of Qt. Each works on plain arrays,
+indexed by node: the indices of each node's parents go in, and the row
+(or layer) and column of each node come out. compute_coordinates() then
+turns rows and columns into x and y coordinates as NumPy arrays, all at
+once, and apply_layout() moves the scene items, only for the nodes that
+find_visible() says are in view if need be. minimum_width() and
+layered() do all of this for a graph of GCommitNodes.
 """
+import heapq
+from array import array
+from collections import namedtuple
+
+import numpy
+
+
+# The distance between columns and rows of nodes
+X_SPACING = 100
+Y_SPACING = 100
+
+# The number of times the layers are swept, down then up, to reduce edge crossings
+CROSSING_MINIMIZATION_SWEEPS = 4
+# The number of times nodes are pulled towards their neighbours once ordered
+COORDINATE_ASSIGNMENT_PASSES = 2
+# The most layers an edge may span and still be broken up by dummy nodes; longer edges (e.g., a
+# topic branch merged long after it forked) link their ends directly
+MAX_DUMMY_SPAN = 8
 
 
 def minimum_width(root_commit):
@@ -38,33 +68,523 @@ def minimum_width(root_commit):
 
     :param root_commit: the root commit of the tree to be rendered
     """
-    _minimum_width(root_commit)
+    nodes, parent_indices = graph_from_nodes(root_commit)
+    rows, columns = minimum_width_layout(parent_indices)
+    xs, ys = compute_coordinates(columns, rows)
+    apply_layout(nodes, xs, ys)
+
+
+def layered(root_commit):
+    """
+    Draw the graph in layers, in the style of Sugiyama et al. (see
+    layered_layout)
+
+    :param root_commit: the GCommitNode at the root of the graph to be
+        rendered
+    """
+    nodes, parent_indices = graph_from_nodes(root_commit)
+    layers, columns = layered_layout(parent_indices)
+    xs, ys = compute_coordinates(columns, layers)
+    apply_layout(nodes, xs, ys)
+
+
+def minimum_width_layout(parent_indices):
+    """
+    Return NumPy arrays of the row and column of each node in a
+    minimally wide tree (see minimum_width)
+
+    Nodes are visited in preorder with an explicit stack (so deep
+    histories cannot exceed the recursion limit), starting from each
+    node without parents, and a node reached through more than one
+    parent is only placed the first time.
+
+    :param parent_indices: The indices of the parents of each node
+    """
+    num_nodes = len(parent_indices)
+    child_indices = _get_child_indices(parent_indices)
+    rows = [0] * num_nodes
+    columns = [0] * num_nodes
+
+    # The next available column in each row, only as many as there are rows
+    next_x_slots = []
+    visited = bytearray(num_nodes)
+    stack = [(node, 0) for node in reversed(range(num_nodes)) if not parent_indices[node]]
+    while stack:
+        node, depth = stack.pop()
+        if visited[node]:
+            continue
+        visited[node] = 1
+        if depth == len(next_x_slots):
+            next_x_slots.append(0)
+
+        # Position based on depth (y) and left-most available column (x)
+        rows[node] = depth
+        columns[node] = next_x_slots[depth]
+
+        # Column at this depth was used, move on to next one
+        next_x_slots[depth] += 1
+
+        # Draw children at next lower level, leftmost first
+        for child in reversed(child_indices[node]):
+            stack.append((child, depth + 1))
+    return numpy.array(rows, dtype=numpy.int64), numpy.array(columns, dtype=numpy.int64)
+
+
+def layered_layout(parent_indices, max_size=None):
+    """
+    Return NumPy arrays of the layer and column of each node in a
+    layered drawing of the graph, in the style of Sugiyama et al.
+
+    Unlike the tree drawing algorithms, this treats the history as the
+    directed acyclic graph it is, so merge-heavy histories stay
+    readable. It works in four steps, each iterative and close to
+    linear in the size of the graph:
+
+    1. Layer assignment: each node is put in the row one below its
+       lowest parent (the longest path to it from the root), so every
+       node is below all of its parents.
+    2. Edges spanning a few rows are broken up by a dummy node in each
+       row they pass through, so they take part in ordering. Edges
+       spanning more than MAX_DUMMY_SPAN rows link their ends directly,
+       so the work done depends on the number of edges, not on their
+       total length.
+    3. Crossing minimization: the rows are swept down and up, ordering
+       each row by the barycenter (mean position) of each node's
+       neighbours in the row just swept.
+    4. Coordinate assignment: each node is pulled towards the mean
+       position of its neighbours, keeping the order of its row and at
+       least one column between nodes.
+
+    Columns may be fractional.
+
+    :param parent_indices: The indices of the parents of each node
+    :param max_size: The most nodes, dummy nodes included, to lay out,
+        or None; if there would be more, None is returned instead
+    """
+    num_nodes = len(parent_indices)
+    layers = _assign_layers(parent_indices)
+    if max_size is not None and num_nodes + _count_dummy_nodes(parent_indices,
+                                                               layers) > max_size:
+        return None
+    ups, downs = _add_dummy_nodes(parent_indices, layers)
+    rows = _order_layers(ups, downs, layers)
+    xs = _assign_coordinates(rows, ups, downs)
+    return numpy.array(layers[:num_nodes], dtype=numpy.int64), xs[:num_nodes]
+
+
+def compute_coordinates(columns, rows, x_spacing=X_SPACING, y_spacing=Y_SPACING):
+    """
+    Return NumPy arrays of the x and y coordinates of each node, given
+    its column and row
+
+    :param columns: A sequence (or buffer) of the column of each node
+    :param rows: A sequence (or buffer) of the row of each node
+    :param x_spacing: The distance between columns
+    :param y_spacing: The distance between rows
+    """
+    return (numpy.asarray(columns, dtype=numpy.float64) * x_spacing,
+            numpy.asarray(rows, dtype=numpy.float64) * y_spacing)
+
+
+def find_visible(xs, ys, left, top, right, bottom, margin=0):
+    """
+    Return a NumPy array of the indices of the nodes whose coordinates
+    are within the given region (extended by margin on every side)
+
+    :param xs: The x coordinate of each node
+    :param ys: The y coordinate of each node
+    :param left, top, right, bottom: The edges of the region
+    :param margin: The distance outside of the region a node may be,
+        e.g., to include nodes whose top left corner is just outside
+    """
+    return numpy.flatnonzero((xs >= left - margin) & (xs <= right + margin) &
+                             (ys >= top - margin) & (ys <= bottom + margin))
+
+
+def apply_layout(items, xs, ys, indices=None):
+    """
+    Move each of the given scene items to its coordinates
+
+    :param items: The item (e.g., GCommitNode) of each node
+    :param xs: The x coordinate of each node
+    :param ys: The y coordinate of each node
+    :param indices: The indices of the nodes to move (e.g., from
+        find_visible), or None to move them all
+    """
+    if indices is None:
+        indices = range(len(items))
+    else:
+        indices = indices.tolist()
+    xs = xs.tolist()
+    ys = ys.tolist()
+    for i in indices:
+        items[i].setPos(xs[i], ys[i])
+
+
+def graph_from_nodes(root_commit, key=id):
+    """
+    Return a list of the nodes reachable from the given node through
+    their children, in preorder, and a list of the indices of each
+    node's parents among them
+
+    :param root_commit: the GCommitNode (or Commit) at the root of the
+        graph
+    :param key: A function returning a hashable identifying each node,
+        e.g., the SHA-1 of a Commit, since there may be more than one
+        CommitView of the same commit
+    """
+    nodes = []
+    indices = {}
+    stack = [root_commit]
+    while stack:
+        node = stack.pop()
+        node_key = key(node)
+        if node_key in indices:
+            continue
+        indices[node_key] = len(nodes)
+        nodes.append(node)
+        stack.extend(reversed(node.children))
+
+    parent_indices = []
+    for node in nodes:
+        parents = []
+        for parent in node.parents:
+            parent_index = indices.get(key(parent))
+            if parent_index is not None and parent_index not in parents:
+                parents.append(parent_index)
+        parent_indices.append(parents)
+    return nodes, parent_indices
+
+
+def _get_child_indices(parent_indices):
+    """
+    Return a list of the indices of each node's children, in order of
+    their indices
+
+    :param parent_indices: The indices of the parents of each node
+    """
+    child_indices = [[] for _ in range(len(parent_indices))]
+    for child, parents in enumerate(parent_indices):
+        for parent in parents:
+            child_indices[parent].append(child)
+    return child_indices
+
+
+def _assign_layers(parent_indices):
+    """
+    Return the layer of each node: the length of the longest path to
+    it from a node without parents
+
+    The nodes are visited in topological order (Kahn's algorithm), so
+    each node's layer is final before any of its children are visited.
+
+    :param parent_indices: The indices of the parents of each node
+    """
+    num_nodes = len(parent_indices)
+    child_indices = _get_child_indices(parent_indices)
+    num_waiting = [len(parents) for parents in parent_indices]
+
+    layers = [0] * num_nodes
+    ready = [i for i in range(num_nodes) if not num_waiting[i]]
+    while ready:
+        parent = ready.pop()
+        for child in child_indices[parent]:
+            if layers[child] <= layers[parent]:
+                layers[child] = layers[parent] + 1
+            num_waiting[child] -= 1
+            if not num_waiting[child]:
+                ready.append(child)
+    return layers
+
+
+def _count_dummy_nodes(parent_indices, layers):
+    """
+    Return the number of dummy nodes _add_dummy_nodes() would add
+
+    :param parent_indices: The indices of the parents of each node
+    :param layers: The layer of each node
+    """
+    num_dummies = 0
+    for child, parents in enumerate(parent_indices):
+        for parent in parents:
+            span = layers[child] - layers[parent]
+            if span <= MAX_DUMMY_SPAN:
+                num_dummies += span - 1
+    return num_dummies
+
+
+def _add_dummy_nodes(parent_indices, layers):
+    """
+    Return the neighbours of each node in the layer above (ups) and the
+    layer below (downs), with a dummy node added to every layer an edge
+    passes through, if it spans no more than MAX_DUMMY_SPAN layers
+
+    The ends of longer edges are each other's neighbours, though they
+    are not in adjacent layers. Dummy nodes are numbered after the real
+    nodes, and their layers are appended to layers.
+
+    :param parent_indices: The indices of the parents of each node
+    :param layers: The layer of each node
+    """
+    num_nodes = len(parent_indices)
+    ups = [[] for _ in range(num_nodes)]
+    downs = [[] for _ in range(num_nodes)]
+    for child, parents in enumerate(parent_indices):
+        for parent in parents:
+            upper = parent
+            if layers[child] - layers[parent] <= MAX_DUMMY_SPAN:
+                for layer in range(layers[parent] + 1, layers[child]):
+                    dummy = len(layers)
+                    layers.append(layer)
+                    ups.append([upper])
+                    downs.append([])
+                    downs[upper].append(dummy)
+                    upper = dummy
+            ups[child].append(upper)
+            downs[upper].append(child)
+    return ups, downs
+
+
+def _order_layers(ups, downs, layers):
+    """
+    Return a list of the nodes in each layer, ordered to reduce edge
+    crossings with the barycenter heuristic
 
+    The initial order is that of a breadth first walk down from the
+    top layer, and each sweep then orders each layer by the mean
+    position of its nodes' neighbours in the layer before it.
 
-def _minimum_width(g_commit_node, next_x_slots=[0], depth=0):
+    :param ups: The neighbours of each node in the layer above
+    :param downs: The neighbours of each node in the layer below
+    :param layers: The layer of each node
     """
-    Helper function for minimum_width()
+    rows = [[] for _ in range(max(layers, default=-1) + 1)]
+    positions = [-1] * len(layers)
+    for node, layer in enumerate(layers):
+        if layer == 0:
+            positions[node] = len(rows[0])
+            rows[0].append(node)
+    for row in rows:
+        for node in row:
+            for below in downs[node]:
+                if positions[below] < 0:
+                    positions[below] = len(rows[layers[below]])
+                    rows[layers[below]].append(below)
+
+    def sort_row(row, neighbours):
+        # Order the row by the barycenters of its nodes' neighbours, keeping nodes without any
+        # neighbours (and ties) where they are. Return True if the order changed
+        if len(row) < 2:
+            return False
+        keyed = []
+        for node in row:
+            adjacent = neighbours[node]
+            if len(adjacent) == 1:
+                key = positions[adjacent[0]]
+            elif adjacent:
+                key = sum(map(positions.__getitem__, adjacent)) / len(adjacent)
+            else:
+                key = positions[node]
+            keyed.append((key, positions[node], node))
+        keyed.sort()
+        changed = False
+        for position, (_, old_position, node) in enumerate(keyed):
+            if position != old_position:
+                positions[node] = position
+                row[position] = node
+                changed = True
+        return changed
 
-    This helper function performs the actual rendering.
+    for _ in range(CROSSING_MINIMIZATION_SWEEPS):
+        changed = False
+        for row in rows[1:]:
+            changed |= sort_row(row, ups)
+        for row in reversed(rows[:-1]):
+            changed |= sort_row(row, downs)
+        if not changed:
+            break
+    # Finish with a downward sweep, so history reads naturally from the top
+    for row in rows[1:]:
+        sort_row(row, ups)
+    return rows
 
-    :param g_commit_node: The current GCommitNode being processed
-    :param next_x_slots: Keeps track of the next available x position
-        for each row
-    :param depth: the depth of the current commit being processed
+
+def _assign_coordinates(rows, ups, downs):
     """
+    Return a NumPy array of the column of each node (which may be
+    fractional), keeping the order of each row, with nodes at least
+    one column apart
+
+    Each pass pulls every node towards the mean column of its
+    neighbours in the layer above, then in the layer below. A row is
+    placed by packing its nodes as far left, then as far right, as
+    their desired columns and spacing allow, and taking the midpoint,
+    so the row is not pushed to either side.
+
+    :param rows: The nodes of each layer, in order
+    :param ups: The neighbours of each node in the layer above
+    :param downs: The neighbours of each node in the layer below
+    """
+    xs = [0.0] * len(ups)
+    for row in rows:
+        for position, node in enumerate(row):
+            xs[node] = float(position)
+
+    def place_row(row, neighbours):
+        desired = []
+        for node in row:
+            adjacent = neighbours[node]
+            if len(adjacent) == 1:
+                desired.append(xs[adjacent[0]])
+            elif adjacent:
+                desired.append(sum(map(xs.__getitem__, adjacent)) / len(adjacent))
+            else:
+                desired.append(xs[node])
+        if len(row) == 1:
+            xs[row[0]] = desired[0]
+            return
+        lefts = list(desired)
+        for i in range(1, len(row)):
+            lefts[i] = max(lefts[i], lefts[i - 1] + 1)
+        rights = desired
+        for i in range(len(row) - 2, -1, -1):
+            rights[i] = min(rights[i], rights[i + 1] - 1)
+        for i, node in enumerate(row):
+            xs[node] = (lefts[i] + rights[i]) / 2
+
+    for _ in range(COORDINATE_ASSIGNMENT_PASSES):
+        for row in rows[1:]:
+            place_row(row, ups)
+        for row in reversed(rows[:-1]):
+            place_row(row, downs)
+
+    # Start the leftmost node at the left edge
+    xs = numpy.array(xs)
+    if len(xs):
+        xs -= xs.min()
+    return xs
+
+
+# An edge from a child to its parent in a lane layout: the edge leaves the child's row and
+# column, runs down lane, and joins the parent's column at the parent's row
+LaneEdge = namedtuple("LaneEdge", ("child", "parent", "child_row", "child_column", "lane",
+                                   "parent_row", "parent_column"))
+
+
+class LaneAllocator():
+    """
+    .. _LaneAllocator:
+
+    Lays out commits in lanes, like git log --graph, one commit at a
+    time as they arrive
+
+    Commits are given to place() children first (e.g., newest first,
+    as they are loaded), and each is put on the next row. A commit is
+    drawn in the leftmost lane that is waiting for it (or the leftmost
+    free lane), and every other lane waiting for it ends there. Its
+    first parent then continues down its lane, and each other parent
+    gets the lane already waiting for it, or a free one. Lanes are
+    recycled as soon as they end, so the layout is only as wide as the
+    number of lines of history running side by side.
+
+    Placing a commit costs time proportional to the number of its
+    parents and children (plus a heap operation per lane taken or
+    freed), however many commits have been placed.
+
+    Attributes:
+        columns: An array of the column of each row's commit.
+        num_lanes: The number of lanes used so far (the width of the
+            layout).
+    """
+
+    def __init__(self):
+        """Constructor"""
+        self.columns = array("I")
+        self.num_lanes = 0
+        # The row of each placed commit
+        self._rows = {}
+        # The edges waiting for each commit that has not been placed, as (child, child row, child
+        # column, lane)
+        self._waiting_edges = {}
+        # A heap of the lanes no longer in use
+        self._free_lanes = []
+
+    def place(self, key, parent_keys):
+        """
+        Place a commit on the next row, and return a tuple of its row,
+        its column, and a list of the LaneEdges that are complete now
+        that it has been placed (the edges from its children, and from
+        it to any parents placed before it)
+
+        :param key: A hashable identifying the commit (e.g., its Sha1)
+        :param parent_keys: The keys of the commit's parents, in order
+        """
+        row = len(self.columns)
+        waiting_edges = self._waiting_edges.pop(key, ())
+        if waiting_edges:
+            # Continue the leftmost lane waiting for this commit, and end the others
+            column = min(edge[3] for edge in waiting_edges)
+            for lane in {edge[3] for edge in waiting_edges}:
+                if lane != column:
+                    heapq.heappush(self._free_lanes, lane)
+        else:
+            column = self._take_lane()
+        edges = [LaneEdge(child, key, child_row, child_column, lane, row, column)
+                 for child, child_row, child_column, lane in waiting_edges]
+        self.columns.append(column)
+        self._rows[key] = row
+
+        # The first parent continues in this commit's lane, and the others share the lane already
+        # waiting for them, or take a new one
+        column_continues = False
+        for i, parent_key in enumerate(parent_keys):
+            parent_row = self._rows.get(parent_key)
+            if parent_row is not None:
+                # The parent was placed first (its clock was ahead), so the edge goes straight to it
+                edges.append(LaneEdge(key, parent_key, row, column, column, parent_row,
+                                      self.columns[parent_row]))
+                continue
+            parent_edges = self._waiting_edges.setdefault(parent_key, [])
+            if i == 0 and not column_continues:
+                lane = column
+                column_continues = True
+            elif parent_edges:
+                lane = parent_edges[0][3]
+            else:
+                lane = self._take_lane()
+            parent_edges.append((key, row, column, lane))
+        if not column_continues:
+            heapq.heappush(self._free_lanes, column)
+        return row, column, edges
+
+    def get_row(self, key):
+        """
+        Return the row of the given commit, or None if it has not been
+        placed
+
+        :param key: The key the commit was placed with
+        """
+        return self._rows.get(key)
 
-    # Position based on depth (y) and left-most available column (x)
-    x_spacing, y_spacing = 100, 100  # TODO accept as setting parameter
-    x_pos = next_x_slots[depth] * x_spacing
-    y_pos = depth * y_spacing
-    g_commit_node.setPos(x_pos, y_pos)
+    def _take_lane(self):
+        """
+        Return the leftmost free lane, adding a new one if none is free
+        """
+        if self._free_lanes:
+            return heapq.heappop(self._free_lanes)
+        self.num_lanes += 1
+        return self.num_lanes - 1
 
-    # Column at this depth was used, move on to next one
-    next_x_slots[depth] += 1
+    def __contains__(self, key):
+        """
+        Return True if the given commit has been placed
 
-    num_of_children = len(g_commit_node.children)
+        :param key: The key of the commit
+        """
+        return key in self._rows
 
-    # Draw children at next lower level
-    for child in g_commit_node.children:
-        next_x_slots.append(0)
-        _minimum_width(child, next_x_slots, depth + 1)
\ No newline at end of file
+    def __len__(self):
+        """
+        Return the number of commits placed (the number of rows)
+        """
+        return len(self.columns)
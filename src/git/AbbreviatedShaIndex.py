@@ -0,0 +1,200 @@
+import binascii
+import bisect
+import functools
+import os
+import string
+
+from git.PackIndex import to_binary_sha
+
+# Git never resolves abbreviations shorter than this
+MINIMUM_ABBREV = 4
+# The shortest abbreviation git uses by default, however small the repository
+DEFAULT_ABBREV = 7
+SHA_HEX_LENGTH = 40
+
+HEX_DIGITS = frozenset(string.hexdigits.lower())
+
+
+class AbbreviatedShaIndex():
+    """
+    .. _AbbreviatedShaIndex:
+
+    A sorted index of every object in a repository, for resolving
+    abbreviated SHA-1s
+
+    The sha table of each pack index is already sorted, so each is
+    binary searched where it is, memory-mapped, without being copied.
+    Loose objects are found by listing the .git/objects/ subdirectories
+    once, into a sorted list, which is rebuilt by refresh(). Resolving
+    an abbreviation, or finding the shortest unique abbreviation of a
+    SHA-1, is a binary search of each of these sorted tables.
+
+    Attributes:
+        path_to_objects_dir: A string representing the absolute path
+            to the repository's .git/objects/ directory.
+        packed_objects: The PackedObjectStore_ holding the repository's
+            pack indexes.
+    """
+
+    def __init__(self, path_to_objects_dir, packed_objects):
+        """Constructor"""
+        self.path_to_objects_dir = path_to_objects_dir
+        self.packed_objects = packed_objects
+        self._loose_binshas = None
+
+    def find_matches(self, prefix, limit=None):
+        """
+        Return a sorted list of the raw 20-byte SHA-1s of every object
+        whose SHA-1 begins with the given hex prefix (at most limit of
+        them, if given)
+
+        :param prefix: A hex string of at least MINIMUM_ABBREV
+            characters
+        :param limit: The maximum number of matches to return
+        """
+        prefix = prefix.strip().lower()
+        if len(prefix) < MINIMUM_ABBREV or len(prefix) > SHA_HEX_LENGTH or \
+                not HEX_DIGITS.issuperset(prefix):
+            raise ValueError("{0!r} is not an abbreviated SHA-1".format(prefix))
+
+        # Search from the smallest SHA-1 beginning with the prefix
+        lower_bound = binascii.unhexlify(prefix + "0" * (len(prefix) % 2))
+        matches = set()
+        for bisect_table, get_sha, table_length in self._get_sorted_tables():
+            position = bisect_table(lower_bound)
+            while position < table_length:
+                binsha = get_sha(position)
+                if not binascii.hexlify(binsha).decode().startswith(prefix):
+                    break
+                matches.add(binsha)
+                if limit is not None and len(matches) >= limit:
+                    return sorted(matches)
+                position += 1
+        return sorted(matches)
+
+    def resolve(self, prefix):
+        """
+        Return the raw 20-byte SHA-1 of the one object whose SHA-1
+        begins with the given hex prefix
+
+        Raise a KeyError if no object matches, or a ValueError listing
+        the candidates if more than one does.
+
+        :param prefix: A hex string of at least MINIMUM_ABBREV
+            characters
+        """
+        matches = self.find_matches(prefix)
+        if not matches:
+            raise KeyError(prefix)
+        if len(matches) > 1:
+            raise ValueError("Short SHA-1 {0} is ambiguous; candidates are: {1}".format(
+                prefix, ", ".join(binascii.hexlify(binsha).decode() for binsha in matches)))
+        return matches[0]
+
+    def get_default_length(self):
+        """
+        Return the length git abbreviates SHA-1s to by default
+        (core.abbrev=auto) for a repository with this many objects
+
+        With about 2^n objects, a collision is expected among the first
+        n/2 bits, so half the bits needed to count the objects, rounded
+        up to whole hex digits, are enough; never less than
+        DEFAULT_ABBREV.
+        """
+        num_objects = self.count_objects()
+        length = (num_objects.bit_length() + 1) // 2
+        return max(length, DEFAULT_ABBREV)
+
+    def get_unique_abbreviation(self, sha, min_length=None):
+        """
+        Return the shortest abbreviation (of at least min_length
+        characters) of the given SHA-1 that no other object shares
+
+        As git does, only the neighbours of the SHA-1 in each sorted
+        table are compared, since they share the longest prefixes.
+
+        :param sha: The Sha1_ (or hex string, or 20 raw bytes) to
+            abbreviate
+        :param min_length: The shortest abbreviation to return, or None
+            to use get_default_length()
+        """
+        if min_length is None:
+            min_length = self.get_default_length()
+        binsha = to_binary_sha(sha)
+        hex_sha = binascii.hexlify(binsha).decode()
+
+        # Find the longest prefix shared with any other object
+        longest_common_length = 0
+        for bisect_table, get_sha, table_length in self._get_sorted_tables():
+            position = bisect_table(binsha)
+            neighbours = [position - 1]
+            if position < table_length and get_sha(position) == binsha:
+                neighbours.append(position + 1)
+            else:
+                neighbours.append(position)
+            for neighbour in neighbours:
+                if 0 <= neighbour < table_length:
+                    longest_common_length = max(longest_common_length, _get_common_hex_length(
+                        binsha, get_sha(neighbour)))
+
+        length = max(longest_common_length + 1, min_length)
+        return hex_sha[:min(length, SHA_HEX_LENGTH)]
+
+    def count_objects(self):
+        """
+        Return the number of objects in the repository (counting objects
+        in more than one pack more than once, as git does)
+        """
+        return sum(len(pack.index) for pack in self.packed_objects.packs) + \
+            len(self._get_loose_binshas())
+
+    def refresh(self):
+        """
+        List the loose objects again, the next time they are needed
+        """
+        self._loose_binshas = None
+
+    def _get_sorted_tables(self):
+        """
+        Return a list of each sorted table of SHA-1s to search (one for
+        each pack index, and one for the loose objects), as tuples of
+        the table's bisect function, get function and length
+        """
+        tables = [(pack.index.bisect, pack.index.get_sha, len(pack.index))
+                  for pack in self.packed_objects.packs]
+        loose_binshas = self._get_loose_binshas()
+        tables.append((functools.partial(bisect.bisect_left, loose_binshas),
+                       loose_binshas.__getitem__, len(loose_binshas)))
+        return tables
+
+    def _get_loose_binshas(self):
+        """
+        Return a sorted list of the raw SHA-1s of every loose object,
+        listing them if they have not been listed yet
+        """
+        if self._loose_binshas is None:
+            loose_binshas = []
+            for subdirectory in os.listdir(self.path_to_objects_dir):
+                if len(subdirectory) != 2 or not HEX_DIGITS.issuperset(subdirectory):
+                    # Not a loose object directory (e.g. pack/ or info/)
+                    continue
+                for file_name in os.listdir(os.path.join(self.path_to_objects_dir, subdirectory)):
+                    if len(file_name) == SHA_HEX_LENGTH - 2 and HEX_DIGITS.issuperset(file_name):
+                        loose_binshas.append(binascii.unhexlify(subdirectory + file_name))
+            loose_binshas.sort()
+            self._loose_binshas = loose_binshas
+        return self._loose_binshas
+
+
+def _get_common_hex_length(binsha, other_binsha):
+    """
+    Return the number of leading hex digits the two SHA-1s share
+
+    :param binsha: A raw 20-byte SHA-1
+    :param other_binsha: Another raw 20-byte SHA-1
+    """
+    for i, (byte, other_byte) in enumerate(zip(binsha, other_binsha)):
+        if byte != other_byte:
+            # The first digit of this byte may still match
+            return i * 2 + (1 if byte >> 4 == other_byte >> 4 else 0)
+    return len(binsha) * 2
@@ -16,6 +16,8 @@ class Branch():
         commit_sha: The Sha1 of the commit this branch is pointing to.
     """
 
+    __slots__ = ("name", "commit_sha")
+
     def __init__(self, name, commit_sha):
         """Constructor"""
         self.name = name
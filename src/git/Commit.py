@@ -28,6 +28,9 @@ class Commit(GitObject):
             for all additional lines.
     """
 
+    __slots__ = ("parents", "children", "author", "date_authored", "committer", "date_committed",
+                 "message")
+
     def __init__(self, sha):
         """Constructor."""
         GitObject.__init__(self, sha)
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import struct
+import sys
+from array import array
+
+from git.CommitStore import CommitStore
+
+# The cache file, relative to the repository's .git/ directory
+PATH_TO_CACHE_FILE = os.path.join("visualgit", "commit-graph-cache")
+
+CACHE_MAGIC = b"VGCG"
+CACHE_VERSION = 2
+
+# magic, version, key, number of commits, number of identities
+HEADER_FORMAT = struct.Struct(">4sI20sII")
+# The number of entries in each array
+ARRAY_LENGTH_FORMAT = struct.Struct(">Q")
+SHA_SIZE = 20
+
+
+class CommitGraphCache():
+    """
+    .. _CommitGraphCache:
+
+    A compact, binary on-disk cache of a repository's parsed commit
+    graph
+
+    Parsing every commit each time a repository is opened is the
+    slowest part of opening it. Commits never change once created, so
+    the graph reachable from a given set of branch tips never changes
+    either. The parsed graph is saved, along with a key identifying the
+    branch tips and pack files it was loaded from, and reopening a
+    repository whose key still matches is a single file read.
+
+    The cache holds the arrays of a CommitStore_ as they are, so
+    loading it costs almost nothing beyond reading the file. The file
+    is laid out as follows (all integers big-endian)::
+
+        header          magic, version, 20-byte key, and the numbers of
+                        commits and identities
+        identities      "name <email>\\0encoding" strings, each preceded
+                        by its 4-byte length
+        shas            the 20-byte SHA-1 of each commit
+        order           the 4-byte number of each commit, in the order
+                        the commits were loaded
+        arrays          each of CommitStore.COLUMNS, as an 8-byte
+                        length followed by the entries
+        messages        the UTF-8 commit messages, back to back
+
+    Attributes:
+        path: A string representing the absolute path to the cache file.
+    """
+
+    def __init__(self, path_to_git_dir):
+        """
+        Constructor
+
+        :param path_to_git_dir: The absolute path to the repository's
+            .git/ directory
+        """
+        self.path = os.path.join(path_to_git_dir, PATH_TO_CACHE_FILE)
+
+    @staticmethod
+    def compute_key(branches, pack_checksums):
+        """
+        Return the 20-byte key identifying the state of a repository's
+        refs and packs
+
+        :param branches: The Branches the commit graph is loaded from
+        :param pack_checksums: The 20-byte checksums of the repository's
+            pack files
+        """
+        key = hashlib.sha1()
+        for branch in sorted(branches, key=lambda branch: branch.name):
+            key.update("{0} {1}\n".format(branch.name, branch.commit_sha).encode())
+        for pack_checksum in sorted(pack_checksums):
+            key.update(pack_checksum)
+        return key.digest()
+
+    def load(self, key, commit_store):
+        """
+        Load the cached commits into the given store, and return an
+        array of their numbers in the order they were saved, or return
+        None if there is no cache matching the given key
+
+        :param key: The key identifying the current state of the
+            repository
+        :param commit_store: The (empty) CommitStore_ to load the
+            commits into
+        """
+        try:
+            with open(self.path, "rb") as cache_file:
+                contents = cache_file.read()
+        except OSError:
+            return None
+        if len(contents) < HEADER_FORMAT.size:
+            return None
+        magic, version, cached_key, num_commits, num_identities = \
+            HEADER_FORMAT.unpack_from(contents)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION or cached_key != key:
+            return None
+
+        try:
+            # Read the identities
+            identities = []
+            position = HEADER_FORMAT.size
+            for _ in range(num_identities):
+                identity_size = int.from_bytes(contents[position:position + 4], byteorder="big")
+                position += 4
+                identity, encoding = contents[position:position + identity_size].rsplit(b"\0", 1)
+                identities.append((identity, encoding.decode()))
+                position += identity_size
+
+            # Read the SHA-1s, the load order, and the arrays of the store
+            binshas = contents[position:position + num_commits * SHA_SIZE]
+            position += num_commits * SHA_SIZE
+            order, position = _read_array("I", contents, position)
+            columns = {}
+            for name, typecode in CommitStore.COLUMNS:
+                columns[name], position = _read_array(typecode, contents, position)
+            messages = contents[position:]
+        except (struct.error, ValueError):
+            # The cache is truncated or corrupt
+            return None
+
+        commit_store.restore(binshas, columns, messages, identities)
+        return order
+
+    def save(self, key, commit_store, order):
+        """
+        Save the given commits to the cache file, replacing any previous
+        cache
+
+        :param key: The key identifying the state of the repository the
+            commits were loaded from
+        :param commit_store: The CommitStore_ holding every commit in
+            the graph, each with its details loaded
+        :param order: An array of the numbers of the commits, in the
+            order they were loaded
+        """
+        identities = bytearray()
+        for identity, encoding in commit_store.identities:
+            encoded = identity + b"\0" + encoding.encode()
+            identities.extend(len(encoded).to_bytes(4, byteorder="big"))
+            identities.extend(encoded)
+
+        header = HEADER_FORMAT.pack(CACHE_MAGIC, CACHE_VERSION, key, len(commit_store),
+                                    len(commit_store.identities))
+
+        # Write to a temporary file first so a partially written cache is never read
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "wb") as cache_file:
+            cache_file.write(header)
+            cache_file.write(identities)
+            cache_file.write(commit_store.binshas)
+            _write_array(cache_file, order)
+            for name, _ in CommitStore.COLUMNS:
+                _write_array(cache_file, getattr(commit_store, name))
+            cache_file.write(commit_store.messages)
+        os.replace(temporary_path, self.path)
+
+
+def _read_array(typecode, contents, position):
+    """
+    Return a tuple with the array at the given position in the cache,
+    and the position following it
+
+    :param typecode: The type code of the array
+    :param contents: The contents of the cache file
+    :param position: The position of the array's length
+    """
+    length, = ARRAY_LENGTH_FORMAT.unpack_from(contents, position)
+    position += ARRAY_LENGTH_FORMAT.size
+    entries = array(typecode)
+    end = position + length * entries.itemsize
+    if end > len(contents):
+        raise ValueError("Truncated array")
+    entries.frombytes(contents[position:end])
+    if sys.byteorder == "little":
+        entries.byteswap()
+    return entries, end
+
+
+def _write_array(cache_file, entries):
+    """
+    Write the given array to the cache, preceded by its length
+
+    :param cache_file: The cache file being written
+    :param entries: The array to write
+    """
+    cache_file.write(ARRAY_LENGTH_FORMAT.pack(len(entries)))
+    if sys.byteorder == "little":
+        entries = array(entries.typecode, entries)
+        entries.byteswap()
+    cache_file.write(entries.tobytes())
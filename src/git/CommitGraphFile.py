@@ -0,0 +1,230 @@
+import binascii
+import mmap
+import os
+
+from git.PackIndex import to_binary_sha
+
+# Paths to the commit-graph file(s), relative to the repository's .git/objects/ directory
+PATH_TO_COMMIT_GRAPH = os.path.join("info", "commit-graph")
+PATH_TO_COMMIT_GRAPH_CHAIN = os.path.join("info", "commit-graphs", "commit-graph-chain")
+PATH_TO_COMMIT_GRAPHS = os.path.join("info", "commit-graphs")
+
+COMMIT_GRAPH_SIGNATURE = b"CGPH"
+HEADER_SIZE = 8
+CHUNK_LOOKUP_ENTRY_SIZE = 12
+SHA_SIZE = 20
+
+# Chunk ids
+CHUNK_OID_FANOUT = b"OIDF"
+CHUNK_OID_LOOKUP = b"OIDL"
+CHUNK_COMMIT_DATA = b"CDAT"
+CHUNK_EXTRA_EDGES = b"EDGE"
+
+# Each commit data entry holds the root tree SHA-1, two parent positions, and the generation
+# number and commit date
+COMMIT_DATA_SIZE = SHA_SIZE + 16
+GRAPH_PARENT_NONE = 0x70000000
+GRAPH_EXTRA_EDGES_NEEDED = 0x80000000
+GRAPH_LAST_EDGE = 0x80000000
+
+
+class CommitGraphFile():
+    """
+    .. _CommitGraphFile:
+
+    A memory-mapped commit-graph file written by git
+
+    Git (with core.commitGraph, or "git commit-graph write") stores the
+    parents, root tree, generation number and commit date of every
+    commit in .git/objects/info/commit-graph, so history can be walked
+    without inflating any commit objects. The graph may instead be
+    split into a chain of files, listed (oldest first) in
+    .git/objects/info/commit-graphs/commit-graph-chain, where each file
+    only holds the commits added since the files before it.
+
+    Commits are identified by their position in the graph, which runs
+    across the whole chain: the commits in the first file come first,
+    followed by those in the next, and so on. Parent positions always
+    refer to positions in the whole chain.
+
+    See the `git documentation <https://git-scm.com/docs/commit-graph-format>`_
+    for detailed information on the data format of commit-graph files.
+
+    Attributes:
+        path: A string representing the absolute path to this file.
+        num_commits: The number of commits in this file.
+        base: The CommitGraphFile for the rest of the chain before this
+            one, or None if this is the first (or only) file.
+        base_num_commits: The number of commits in the files before this
+            one in the chain.
+    """
+
+    def __init__(self, path, base=None):
+        """Constructor"""
+        self.path = path
+        self.base = base
+        self.base_num_commits = len(base) if base is not None else 0
+        with open(path, "rb") as graph_file:
+            self._map = mmap.mmap(graph_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._map[:4] != COMMIT_GRAPH_SIGNATURE:
+            self._map.close()
+            raise ValueError("{0} is not a commit-graph file".format(path))
+        num_chunks = self._map[6]
+
+        # Find the offset of each chunk from the chunk lookup table
+        chunk_offsets = {}
+        for i in range(num_chunks):
+            entry = HEADER_SIZE + i * CHUNK_LOOKUP_ENTRY_SIZE
+            chunk_offsets[self._map[entry:entry + 4]] = int.from_bytes(
+                self._map[entry + 4:entry + 12], byteorder="big")
+        self._fanout_offset = chunk_offsets[CHUNK_OID_FANOUT]
+        self._oid_offset = chunk_offsets[CHUNK_OID_LOOKUP]
+        self._commit_data_offset = chunk_offsets[CHUNK_COMMIT_DATA]
+        self._extra_edges_offset = chunk_offsets.get(CHUNK_EXTRA_EDGES)
+        self.num_commits = self._get_fanout_entry(255)
+
+    @classmethod
+    def open(cls, path_to_objects_dir):
+        """
+        Return the repository's commit graph (the last file of the
+        chain, if it is split), or None if git has not written one
+
+        :param path_to_objects_dir: The absolute path to the
+            repository's .git/objects/ directory
+        """
+        chain_path = os.path.join(path_to_objects_dir, PATH_TO_COMMIT_GRAPH_CHAIN)
+        if os.path.exists(chain_path):
+            with open(chain_path) as chain_file:
+                graph_hashes = chain_file.read().split()
+            graph = None
+            for graph_hash in graph_hashes:
+                graph = cls(os.path.join(path_to_objects_dir, PATH_TO_COMMIT_GRAPHS,
+                                         "graph-{0}.graph".format(graph_hash)), graph)
+            return graph
+        graph_path = os.path.join(path_to_objects_dir, PATH_TO_COMMIT_GRAPH)
+        if os.path.exists(graph_path):
+            return cls(graph_path)
+        return None
+
+    def find_position(self, sha):
+        """
+        Return the position of the commit with the given SHA-1 in the
+        graph, or None if it is not in the graph
+
+        :param sha: The Sha1_ (or hex string, or 20 raw bytes) of the
+            commit
+        """
+        binsha = to_binary_sha(sha)
+        graph = self
+        while graph is not None:
+            position = graph._find_local_position(binsha)
+            if position is not None:
+                return graph.base_num_commits + position
+            graph = graph.base
+        return None
+
+    def get_sha(self, position):
+        """
+        Return the 40-character hex SHA-1 of the commit at the given
+        position in the graph
+
+        :param position: The position of the commit in the graph
+        """
+        graph, position = self._get_graph_for(position)
+        start = graph._oid_offset + position * SHA_SIZE
+        return binascii.hexlify(graph._map[start:start + SHA_SIZE]).decode()
+
+    def get_commit_data(self, position):
+        """
+        Return a tuple with the parent positions, generation number and
+        commit date (in seconds since the epoch) of the commit at the
+        given position in the graph
+
+        :param position: The position of the commit in the graph
+        """
+        graph, position = self._get_graph_for(position)
+        graph_map = graph._map
+        start = graph._commit_data_offset + position * COMMIT_DATA_SIZE + SHA_SIZE
+        first_parent = int.from_bytes(graph_map[start:start + 4], byteorder="big")
+        second_parent = int.from_bytes(graph_map[start + 4:start + 8], byteorder="big")
+        generation_and_date_high = int.from_bytes(graph_map[start + 8:start + 12], byteorder="big")
+        date_low = int.from_bytes(graph_map[start + 12:start + 16], byteorder="big")
+
+        parents = []
+        if first_parent != GRAPH_PARENT_NONE:
+            parents.append(first_parent)
+        if second_parent & GRAPH_EXTRA_EDGES_NEEDED:
+            # The second and later parents are listed in the extra edges chunk
+            edge = graph._extra_edges_offset + (second_parent & ~GRAPH_EXTRA_EDGES_NEEDED) * 4
+            while True:
+                parent = int.from_bytes(graph_map[edge:edge + 4], byteorder="big")
+                parents.append(parent & ~GRAPH_LAST_EDGE)
+                if parent & GRAPH_LAST_EDGE:
+                    break
+                edge += 4
+        elif second_parent != GRAPH_PARENT_NONE:
+            parents.append(second_parent)
+
+        generation = generation_and_date_high >> 2
+        commit_date = ((generation_and_date_high & 0x03) << 32) | date_low
+        return parents, generation, commit_date
+
+    def close(self):
+        """
+        Release the memory mappings of every file in the chain
+        """
+        graph = self
+        while graph is not None:
+            graph._map.close()
+            graph = graph.base
+
+    def _get_graph_for(self, position):
+        """
+        Return a tuple with the file in the chain holding the commit at
+        the given position, and the commit's position within that file
+
+        :param position: The position of the commit in the graph
+        """
+        graph = self
+        while position < graph.base_num_commits:
+            graph = graph.base
+        return graph, position - graph.base_num_commits
+
+    def _find_local_position(self, binsha):
+        """
+        Return the position of the given SHA-1 within this file only,
+        or None if it is not in this file
+
+        :param binsha: The raw 20-byte SHA-1 of the commit
+        """
+        first_byte = binsha[0]
+        low = self._get_fanout_entry(first_byte - 1) if first_byte else 0
+        high = self._get_fanout_entry(first_byte) - 1
+        while low <= high:
+            mid = (low + high) // 2
+            start = self._oid_offset + mid * SHA_SIZE
+            mid_sha = self._map[start:start + SHA_SIZE]
+            if mid_sha < binsha:
+                low = mid + 1
+            elif mid_sha > binsha:
+                high = mid - 1
+            else:
+                return mid
+        return None
+
+    def _get_fanout_entry(self, index):
+        """
+        Return the value of the fanout table at the given index
+
+        :param index: The first byte of a SHA-1 (0 - 255)
+        """
+        start = self._fanout_offset + index * 4
+        return int.from_bytes(self._map[start:start + 4], byteorder="big")
+
+    def __len__(self):
+        """
+        Return the number of commits in the whole chain, up to and
+        including this file
+        """
+        return self.base_num_commits + self.num_commits
@@ -0,0 +1,268 @@
+from git.GitUser import GitUser
+
+# The encoding of commit messages and identities that have no encoding header
+DEFAULT_COMMIT_ENCODING = "utf-8"
+
+# Times and timezones outside these bounds are malformed, and treated as missing
+MAX_TIME = 2 ** 63
+MAX_TIMEZONE = 9999
+
+
+class CommitHeader():
+    """
+    .. _CommitHeader:
+
+    The headers of a commit object, parsed from its raw bytes in a
+    single pass
+
+    Commit object contents are in the form::
+
+        tree 2bddce7d093dfc7ce7911b5e8ae4ccbdf048b7d3
+        parent a6407f4a8a2bef57ed84d4853a89e940f2834c11
+        author Kahmali Rose <kahmali@mail.com> 1400873968 -0400
+        committer Kahmali Rose <kahmali@mail.com> 1400924303 -0400
+        encoding ISO-8859-1
+        gpgsig -----BEGIN PGP SIGNATURE-----
+         <signature lines, each continued with a leading space>
+         -----END PGP SIGNATURE-----
+
+        Commit message begins after the first blank line.
+
+    The end of the headers is found with a single search for the blank
+    line, and each header is sliced directly out of the contents. Only
+    the tree and parents are decoded up front; identities and the
+    message are kept as bytes until asked for, and are then decoded
+    with the commit's encoding header (git's default is UTF-8), so
+    commits in other encodings, or with invalid bytes, never fail to
+    load.
+
+    Attributes:
+        contents: The raw bytes of the commit object.
+        tree: The 40-character hex SHA-1 string of the commit's root
+            tree, or None.
+        parents: A list of the 40-character hex SHA-1 strings of the
+            commit's parents, in order.
+        author: The raw bytes of the author header, or None.
+        committer: The raw bytes of the committer header, or None.
+        encoding: The name of the encoding of the message and
+            identities.
+        gpgsig: The raw bytes of the signature header, or None.
+        mergetag: A list of the raw bytes of each mergetag header (the
+            annotated tags merged by this commit).
+        message_start: The offset of the message in the contents.
+    """
+
+    def __init__(self, contents):
+        """
+        Constructor
+
+        :param contents: The raw bytes (or a memoryview of the bytes) of
+            a commit object, without the loose object header
+        """
+        if not isinstance(contents, bytes):
+            contents = bytes(contents)
+        self.contents = contents
+        self.tree = None
+        self.parents = parents = []
+        self.author = None
+        self.committer = None
+        self.encoding = DEFAULT_COMMIT_ENCODING
+        self.gpgsig = None
+        self.mergetag = []
+
+        # Find the blank line ending the headers, so that every header line, including the last,
+        # ends with a newline at or before headers_end
+        find = contents.find
+        starts_with = contents.startswith
+        headers_end = find(b"\n\n")
+        if headers_end != -1:
+            self.message_start = headers_end + 2
+        else:
+            # There is no message
+            if not contents.endswith(b"\n"):
+                self.contents = contents = contents + b"\n"
+                find = contents.find
+                starts_with = contents.startswith
+            headers_end = len(contents) - 1
+            self.message_start = len(contents)
+        search_end = headers_end + 1
+
+        # Git always writes the tree, parents, author and committer first, in that order, so
+        # those are read directly, as git itself does
+        position = 0
+        if starts_with(b"tree "):
+            position = find(b"\n", 5, search_end) + 1
+            self.tree = contents[5:position - 1].decode("ascii")
+        while starts_with(b"parent ", position):
+            line_end = find(b"\n", position, search_end)
+            parents.append(contents[position + 7:line_end].decode("ascii"))
+            position = line_end + 1
+        if starts_with(b"author ", position):
+            line_end = find(b"\n", position, search_end)
+            self.author = contents[position + 7:line_end]
+            position = line_end + 1
+        if starts_with(b"committer ", position):
+            line_end = find(b"\n", position, search_end)
+            self.committer = contents[position + 10:line_end]
+            position = line_end + 1
+
+        # Any other headers follow, in no particular order
+        while position < headers_end:
+            line_end = find(b"\n", position, search_end)
+            # Multi-line headers (signatures and merged tags) continue on lines beginning with a
+            # space
+            while line_end < headers_end and contents[line_end + 1:line_end + 2] == b" ":
+                line_end = find(b"\n", line_end + 1, search_end)
+
+            key_end = find(b" ", position, line_end)
+            if key_end != -1:
+                key = contents[position:key_end]
+                if key == b"encoding":
+                    self.encoding = contents[key_end + 1:line_end].decode("ascii", "replace")
+                elif key == b"gpgsig":
+                    self.gpgsig = contents[key_end + 1:line_end]
+                elif key == b"mergetag":
+                    self.mergetag.append(contents[key_end + 1:line_end])
+                elif key == b"parent":
+                    parents.append(contents[key_end + 1:line_end].decode("ascii"))
+                elif key == b"author":
+                    self.author = contents[key_end + 1:line_end]
+                elif key == b"committer":
+                    self.committer = contents[key_end + 1:line_end]
+            position = line_end + 1
+
+    def get_author(self):
+        """
+        Return a tuple with the author's raw "name <email>" bytes, the
+        time the commit was authored (in seconds since the epoch), and
+        the author's timezone offset (in minutes), or (None, 0, 0) if
+        there is no author
+
+        The identity can be decoded with decode_identity().
+        """
+        return _split_identity(self.author)
+
+    def get_committer(self):
+        """
+        Return a tuple with the committer's raw "name <email>" bytes,
+        the time the commit was committed (in seconds since the epoch),
+        and the committer's timezone offset (in minutes), or
+        (None, 0, 0) if there is no committer
+        """
+        return _split_identity(self.committer)
+
+    def get_commit_time(self):
+        """
+        Return the time the commit was committed, in seconds since the
+        epoch, without splitting out the committer's name and email, or
+        0 if there is no committer
+        """
+        if self.committer is None:
+            return 0
+        return _parse_time(self.committer[self.committer.rfind(b">") + 1:])[0]
+
+    def get_message(self):
+        """
+        Return the decoded commit message
+        """
+        return _decode(self.contents[self.message_start:], self.encoding)
+
+    def get_message_bytes(self):
+        """
+        Return the commit message, encoded as UTF-8
+
+        Messages are returned as is, without being decoded, unless the
+        commit has a different encoding.
+        """
+        message = self.contents[self.message_start:]
+        if self.encoding.lower().replace("_", "-") in ("utf-8", "utf8"):
+            return message
+        return _decode(message, self.encoding).encode(DEFAULT_COMMIT_ENCODING)
+
+    @staticmethod
+    def split_identity(identity):
+        """
+        Return a tuple with the raw "name <email>" bytes, time (in
+        seconds since the epoch) and timezone offset (in minutes) of the
+        given raw identity header, or (None, 0, 0) if it is None
+
+        :param identity: The raw bytes of an identity header (e.g., a
+            commit's author or a tag's tagger)
+        """
+        return _split_identity(identity)
+
+    @staticmethod
+    def decode_identity(identity, encoding=DEFAULT_COMMIT_ENCODING):
+        """
+        Return the GitUser for the given raw identity, e.g.::
+
+            Kahmali Rose <kahmali@mail.com>
+
+        :param identity: The raw "name <email>" bytes of an identity
+        :param encoding: The encoding of the commit the identity is from
+        """
+        name, separator, email = identity.rpartition(b"<")
+        if not separator:
+            # Malformed identity with no email address
+            return GitUser(_decode(identity.strip(), encoding), "")
+        return GitUser(_decode(name.strip(), encoding), _decode(email.rstrip(b">"), encoding))
+
+
+def _split_identity(identity):
+    """
+    Return a tuple with the raw "name <email>" bytes, time and timezone
+    offset of the given identity header, e.g.::
+
+        Kahmali Rose <kahmali@mail.com> 1400873968 -0400
+
+    :param identity: The raw bytes of the identity header, or None
+    """
+    if identity is None:
+        return None, 0, 0
+    email_end = identity.rfind(b">") + 1
+    if not email_end:
+        # Malformed identity with no email address
+        return identity, 0, 0
+    time, offset = _parse_time(identity[email_end:])
+    return identity[:email_end], time, offset
+
+
+def _parse_time(date):
+    """
+    Return a tuple with the time (in seconds since the epoch) and
+    timezone offset (in minutes) in the given "<time> <timezone>" part
+    of an identity header, with 0 for either if it is missing
+
+    :param date: The raw bytes following the identity's email address
+    """
+    words = date.split()
+    try:
+        time = int(words[0])
+    except (IndexError, ValueError):
+        return 0, 0
+    if not -MAX_TIME <= time < MAX_TIME:
+        return 0, 0
+    try:
+        timezone = int(words[1])
+    except (IndexError, ValueError):
+        return time, 0
+    if not -MAX_TIMEZONE <= timezone <= MAX_TIMEZONE:
+        return time, 0
+    # The timezone is written as [+-]HHMM
+    sign = -1 if timezone < 0 else 1
+    timezone = abs(timezone)
+    return time, sign * (timezone // 100 * 60 + timezone % 100)
+
+
+def _decode(raw, encoding):
+    """
+    Return the given bytes decoded with the given commit encoding
+
+    :param raw: The bytes to decode
+    :param encoding: The name of the commit's encoding
+    """
+    try:
+        return raw.decode(encoding, "replace")
+    except LookupError:
+        # The encoding is unknown, so fall back to git's default
+        return raw.decode(DEFAULT_COMMIT_ENCODING, "replace")
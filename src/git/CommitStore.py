@@ -0,0 +1,712 @@
+import binascii
+import heapq
+import threading
+from array import array
+from collections.abc import Mapping
+
+from git.CommitHeader import CommitHeader
+from git.CommitView import CommitView
+from git.PackIndex import to_binary_sha
+from git.Sha1Pool import Sha1Pool
+
+SHA_SIZE = 20
+
+# Marks the end of a list of child edges, or a missing identity
+NONE = 0xFFFFFFFF
+
+# Flags recording what has been loaded for each commit
+PARENTS_LOADED = 0x01
+DETAILS_LOADED = 0x02
+# Set once the history walk has reached a commit (so it is in the loaded window of history)
+WALKED = 0x04
+
+# Marks used when painting history down from two commits (see get_merge_bases and get_range)
+_FROM_FIRST = 0x01
+_FROM_SECOND = 0x02
+_STALE = 0x04
+
+
+class CommitStore(Mapping):
+    """
+    .. _CommitStore:
+
+    A compact, column-oriented store of every commit in a repository's
+    history
+
+    Each commit is identified by its number: the order it was first
+    seen in (as a branch tip, or as the parent of a loaded commit). Rather
+    than a Python object per commit, each detail of every commit is
+    held in a flat array indexed by commit number, so a commit costs a
+    few dozen bytes (plus its message) instead of several hundred:
+
+        binshas         the 20-byte SHA-1s, back to back
+        flags           what has been loaded (PARENTS_LOADED,
+                        DETAILS_LOADED and WALKED)
+        commit_times    commit and author times, in seconds since the
+        author_times    epoch, and their timezone offsets, in minutes
+        commit_offsets
+        author_offsets
+        author_ids      indices into the table of interned identities
+        committer_ids
+        message_starts  the position and length of each UTF-8 message
+        message_sizes   in one shared buffer
+
+    Parents are held in compressed sparse row form: a commit's parents
+    are the parent_counts[n] commit numbers starting at
+    parent_starts[n] in parent_numbers. A commit's parents are all
+    known once it is parsed, but its children are found one at a time
+    as history is loaded, so each commit's children are instead a
+    linked list of edges, from first_child_edges[n] to
+    last_child_edges[n], following next_child_edges, with each edge's
+    child in child_numbers.
+
+    Each commit's generation number (one more than the greatest
+    generation of its parents, or 1 for a commit with no known parents)
+    and topological index (its position in an order that puts every
+    commit after all of its parents) are derived from the parents in
+    one linear pass, by compute_generations(). A commit can only be an
+    ancestor of commits with a greater generation and topological
+    index, so ancestry queries stop walking history as soon as they
+    pass below the generation of the commits they are looking for.
+
+    The store is a mapping of 40-character SHA-1 strings (or Sha1s) to
+    CommitView_s, thin Commit objects that read from the store, so it
+    can be used wherever a dict of Commits was.
+
+    Attributes:
+        binshas, flags, commit_times, ...: The arrays described above
+            (see COLUMNS for the complete list).
+        generations: The generation number of each commit.
+        topo_indices: The topological index of each commit.
+        messages: The buffer holding every commit's UTF-8 message.
+        identities: A list of each distinct (raw "name <email>" bytes,
+            encoding) identity, in order of their ids.
+    """
+
+    # The arrays holding the store, in the order they are saved, with their array type codes
+    COLUMNS = (("flags", "B"),
+               ("commit_times", "q"),
+               ("commit_offsets", "h"),
+               ("author_times", "q"),
+               ("author_offsets", "h"),
+               ("author_ids", "I"),
+               ("committer_ids", "I"),
+               ("message_starts", "Q"),
+               ("message_sizes", "I"),
+               ("parent_starts", "I"),
+               ("parent_counts", "H"),
+               ("parent_numbers", "I"),
+               ("first_child_edges", "I"),
+               ("last_child_edges", "I"),
+               ("next_child_edges", "I"),
+               ("child_numbers", "I"))
+
+    def __init__(self, load_details=None, sha_pool=None):
+        """
+        Constructor
+
+        :param load_details: A function taking a commit number, which
+            loads the details of that commit into this store (with
+            set_details) when they were not loaded with its parents
+        :param sha_pool: The Sha1Pool_ of the repository, or None to
+            use a new one
+        """
+        self.binshas = bytearray()
+        for name, typecode in CommitStore.COLUMNS:
+            setattr(self, name, array(typecode))
+        self.messages = bytearray()
+        self.identities = []
+        # Derived from the parents, so never saved
+        self.generations = array("I")
+        self.topo_indices = array("I")
+        self._identity_ids = {}
+        self._decoded_identities = {}
+        self._numbers = {}
+        self._load_details = load_details
+        self._sha_pool = sha_pool if sha_pool is not None else Sha1Pool()
+        self._generations_valid = False
+        # Details may be loaded on the GUI thread while history is loaded in the background
+        self._lock = threading.RLock()
+
+    def add(self, sha):
+        """
+        Return the number of the commit with the given SHA-1, adding it
+        to the store (with nothing loaded) if it is not already in it
+
+        :param sha: The Sha1_ (or hex string, or 20 raw bytes) of the
+            commit
+        """
+        binsha = to_binary_sha(sha)
+        number = self._numbers.get(binsha)
+        if number is None:
+            number = len(self._numbers)
+            self._numbers[binsha] = number
+            self.binshas += binsha
+            self.flags.append(0)
+            self.commit_times.append(0)
+            self.commit_offsets.append(0)
+            self.author_times.append(0)
+            self.author_offsets.append(0)
+            self.author_ids.append(NONE)
+            self.committer_ids.append(NONE)
+            self.message_starts.append(0)
+            self.message_sizes.append(0)
+            self.parent_starts.append(0)
+            self.parent_counts.append(0)
+            self.first_child_edges.append(NONE)
+            self.last_child_edges.append(NONE)
+        return number
+
+    def find(self, sha):
+        """
+        Return the number of the commit with the given SHA-1, or None if
+        it is not in the store
+
+        :param sha: The Sha1_ (or hex string, or 20 raw bytes) of the
+            commit
+        """
+        try:
+            return self._numbers.get(to_binary_sha(sha))
+        except (ValueError, TypeError):
+            # Not a SHA-1
+            return None
+
+    def set_parents(self, number, parent_numbers, commit_time):
+        """
+        Set the parents and commit time of the given commit, and add it
+        to the children of each of its parents
+
+        :param number: The number of the commit
+        :param parent_numbers: The numbers of the commit's parents, in
+            order
+        :param commit_time: The time the commit was committed, in
+            seconds since the epoch
+        """
+        self.parent_starts[number] = len(self.parent_numbers)
+        self.parent_counts[number] = len(parent_numbers)
+        self.parent_numbers.extend(parent_numbers)
+        for parent_number in parent_numbers:
+            self.add_child(parent_number, number)
+        if not self.flags[number] & DETAILS_LOADED:
+            self.commit_times[number] = commit_time
+        self.flags[number] |= PARENTS_LOADED
+        if number < len(self.generations):
+            # The generations of this commit and its descendants may have changed
+            self._generations_valid = False
+
+    def add_parent(self, number, parent_number):
+        """
+        Append a parent to the parents of the given commit (without
+        adding the commit to the parent's children)
+
+        The commit's parents are moved to the end of parent_numbers
+        first, unless they are already there, so they stay contiguous.
+
+        :param number: The number of the commit
+        :param parent_number: The number of the parent
+        """
+        start = self.parent_starts[number]
+        count = self.parent_counts[number]
+        if start + count != len(self.parent_numbers):
+            self.parent_starts[number] = len(self.parent_numbers)
+            self.parent_numbers.extend(self.parent_numbers[start:start + count])
+        self.parent_numbers.append(parent_number)
+        self.parent_counts[number] = count + 1
+        # The generations of this commit and its descendants may have changed
+        self._generations_valid = False
+
+    def add_child(self, number, child_number):
+        """
+        Append a child to the children of the given commit (without
+        adding the commit to the child's parents)
+
+        :param number: The number of the commit
+        :param child_number: The number of the child
+        """
+        edge = len(self.child_numbers)
+        self.child_numbers.append(child_number)
+        self.next_child_edges.append(NONE)
+        last_edge = self.last_child_edges[number]
+        if last_edge == NONE:
+            self.first_child_edges[number] = edge
+        else:
+            self.next_child_edges[last_edge] = edge
+        self.last_child_edges[number] = edge
+
+    def set_details(self, number, header):
+        """
+        Set the author, committer, dates and message of the given commit
+
+        :param number: The number of the commit
+        :param header: The CommitHeader_ of the commit
+        """
+        author, author_time, author_offset = header.get_author()
+        committer, commit_time, commit_offset = header.get_committer()
+        message = header.get_message_bytes()
+        with self._lock:
+            self.author_ids[number] = self._intern_identity(author, header.encoding)
+            self.author_times[number] = author_time
+            self.author_offsets[number] = author_offset
+            self.committer_ids[number] = self._intern_identity(committer, header.encoding)
+            self.commit_times[number] = commit_time
+            self.commit_offsets[number] = commit_offset
+            self.message_starts[number] = len(self.messages)
+            self.message_sizes[number] = len(message)
+            self.messages += message
+            self.flags[number] |= DETAILS_LOADED
+
+    def load_details(self, number):
+        """
+        Load the details of the given commit, if they have not been
+        loaded yet
+
+        :param number: The number of the commit
+        """
+        if not self.flags[number] & DETAILS_LOADED and self._load_details is not None:
+            with self._lock:
+                if not self.flags[number] & DETAILS_LOADED:
+                    self._load_details(number)
+
+    def has_parents(self, number):
+        """
+        Return True if the parents and commit time of the given commit
+        have been loaded
+
+        :param number: The number of the commit
+        """
+        return bool(self.flags[number] & PARENTS_LOADED)
+
+    def set_walked(self, number):
+        """
+        Record that the history walk has reached the given commit
+
+        :param number: The number of the commit
+        """
+        self.flags[number] |= WALKED
+
+    def is_truncated(self, number):
+        """
+        Return True if the history walk has reached the given commit,
+        but not all of its parents (so only a window of history has
+        been loaded, and the commit is at the bottom of it)
+
+        :param number: The number of the commit
+        """
+        flags = self.flags
+        return bool(flags[number] & WALKED) and any(
+            not flags[parent] & WALKED for parent in self.get_parents(number))
+
+    def has_details(self, number):
+        """
+        Return True if the author, committer, dates and message of the
+        given commit have been loaded
+
+        :param number: The number of the commit
+        """
+        return bool(self.flags[number] & DETAILS_LOADED)
+
+    def get_sha(self, number):
+        """
+        Return the Sha1_ of the given commit
+
+        :param number: The number of the commit
+        """
+        return self._sha_pool.get(self.get_binsha(number))
+
+    def get_hex(self, number):
+        """
+        Return the 40-character hex SHA-1 of the given commit
+
+        :param number: The number of the commit
+        """
+        return binascii.hexlify(self.get_binsha(number)).decode()
+
+    def get_binsha(self, number):
+        """
+        Return the raw 20-byte SHA-1 of the given commit
+
+        :param number: The number of the commit
+        """
+        start = number * SHA_SIZE
+        return bytes(self.binshas[start:start + SHA_SIZE])
+
+    def get_parents(self, number):
+        """
+        Return the numbers of the parents of the given commit, in order
+
+        :param number: The number of the commit
+        """
+        start = self.parent_starts[number]
+        return self.parent_numbers[start:start + self.parent_counts[number]].tolist()
+
+    def get_children(self, number):
+        """
+        Return the numbers of the children of the given commit, in the
+        order they were found
+
+        :param number: The number of the commit
+        """
+        children = []
+        edge = self.first_child_edges[number]
+        while edge != NONE:
+            children.append(self.child_numbers[edge])
+            edge = self.next_child_edges[edge]
+        return children
+
+    def compute_generations(self):
+        """
+        Compute the generation number and topological index of every
+        commit in the store, in one pass over the commits and their
+        parents
+
+        Commits whose parents have not been loaded yet are treated as
+        having none, so the results only hold for the history loaded so
+        far; they are computed again (by any ancestry query) once the
+        parents of a numbered commit are loaded.
+        """
+        with self._lock:
+            count = len(self._numbers)
+            self.generations = array("I", bytes(4 * count))
+            self.topo_indices = array("I", bytes(4 * count))
+            self._number_commits(range(count), 0)
+            self._generations_valid = True
+
+    def update_generations(self):
+        """
+        Number the commits added to the store since the generation
+        numbers and topological indices were computed, so the cost
+        depends on the number of new commits
+
+        New commits that only descend from (or are unrelated to) the
+        commits already numbered, such as those added to a branch since
+        the history was loaded, leave the existing numbers valid. If
+        the parents of a numbered commit have been loaded since (e.g.,
+        when older history is loaded), every number is computed again,
+        but only once an ancestry query needs them. If nothing has been
+        numbered yet, every commit is numbered now.
+        """
+        with self._lock:
+            if not len(self.generations):
+                self.compute_generations()
+                return
+            if not self._generations_valid:
+                return
+            first_new = len(self.generations)
+            num_new = len(self._numbers) - first_new
+            self.generations.frombytes(bytes(4 * num_new))
+            self.topo_indices.frombytes(bytes(4 * num_new))
+            self._number_commits(range(first_new, first_new + num_new), first_new)
+
+    def _number_commits(self, numbers, next_topo_index):
+        """
+        Compute the generation number and topological index of each of
+        the given commits that does not have them yet (a generation of
+        0), and of their ancestors that do not either
+
+        :param numbers: The numbers of the commits
+        :param next_topo_index: The topological index to give the first
+            commit numbered
+        """
+        parent_starts = self.parent_starts
+        parent_counts = self.parent_counts
+        parent_numbers = self.parent_numbers
+        # A generation of 0 marks a commit that has not been reached yet
+        generations = self.generations
+        topo_indices = self.topo_indices
+        for start_number in numbers:
+            if generations[start_number]:
+                continue
+            # Walk down to the commits whose parents are all done, with an explicit stack so long
+            # histories cannot exceed the recursion limit
+            stack = [start_number]
+            while stack:
+                number = stack[-1]
+                if generations[number]:
+                    stack.pop()
+                    continue
+                generation = 1
+                waiting = False
+                first_parent = parent_starts[number]
+                for parent in parent_numbers[first_parent:first_parent + parent_counts[number]]:
+                    parent_generation = generations[parent]
+                    if not parent_generation:
+                        stack.append(parent)
+                        waiting = True
+                    elif parent_generation >= generation:
+                        generation = parent_generation + 1
+                if not waiting:
+                    stack.pop()
+                    generations[number] = generation
+                    topo_indices[number] = next_topo_index
+                    next_topo_index += 1
+
+    def get_generation(self, number):
+        """
+        Return the generation number of the given commit
+
+        :param number: The number of the commit
+        """
+        self._ensure_generations()
+        return self.generations[number]
+
+    def get_topo_index(self, number):
+        """
+        Return the topological index of the given commit
+
+        :param number: The number of the commit
+        """
+        self._ensure_generations()
+        return self.topo_indices[number]
+
+    def is_ancestor(self, ancestor, descendant):
+        """
+        Return True if the first commit is the second, or can be reached
+        from it by following parents
+
+        Only commits with a greater generation than the ancestor are
+        walked, so asking about recent commits costs little however
+        long the history is.
+
+        :param ancestor: The number of the possible ancestor
+        :param descendant: The number of the possible descendant
+        """
+        self._ensure_generations()
+        if ancestor == descendant:
+            return True
+        generations = self.generations
+        ancestor_generation = generations[ancestor]
+        if ancestor_generation >= generations[descendant] or \
+                self.topo_indices[ancestor] >= self.topo_indices[descendant]:
+            return False
+        seen = {descendant}
+        stack = [descendant]
+        while stack:
+            for parent in self.get_parents(stack.pop()):
+                if parent == ancestor:
+                    return True
+                if parent not in seen and generations[parent] > ancestor_generation:
+                    seen.add(parent)
+                    stack.append(parent)
+        return False
+
+    def get_merge_bases(self, first, second):
+        """
+        Return the numbers of the best common ancestors of the two
+        commits (those that are not ancestors of any other common
+        ancestor), highest generation first
+
+        As with git merge-base, history is painted down from both
+        commits, highest generation first, until every commit left to
+        visit is below a common ancestor already found.
+
+        :param first: The number of one commit
+        :param second: The number of the other commit
+        """
+        if first == second:
+            return [first]
+        merge_bases = []
+        for number, marks in self._paint_down(first, second):
+            if marks & (_FROM_FIRST | _FROM_SECOND | _STALE) == _FROM_FIRST | _FROM_SECOND:
+                merge_bases.append(number)
+        return merge_bases
+
+    def get_range(self, exclude, include):
+        """
+        Return the numbers of the commits that can be reached from one
+        commit but not from another (as with git log exclude..include),
+        highest generation first
+
+        :param exclude: The number of the commit whose history is
+            excluded
+        :param include: The number of the commit whose history is
+            included
+        """
+        return [number for number, marks in self._paint_down(include, exclude)
+                if marks == _FROM_FIRST]
+
+    def _paint_down(self, first, second):
+        """
+        Walk the history of the two commits, highest generation first,
+        yielding each commit reached with the marks it was reached with
+        (_FROM_FIRST, _FROM_SECOND, and _STALE once below a commit
+        reached from both)
+
+        Each commit is yielded once all of its loaded descendants in
+        the walk have been, so its marks are complete. The walk stops
+        once every commit left to visit is stale (or reached from the
+        second commit only, since nothing below it can be reached from
+        the first commit alone).
+
+        :param first: The number of one commit
+        :param second: The number of the other commit
+        """
+        self._ensure_generations()
+        generations = self.generations
+        topo_indices = self.topo_indices
+        marks = {first: _FROM_FIRST, second: _FROM_SECOND}
+        done = {}
+        # Each entry records whether it was interesting when pushed, so the count stays exact
+        heap = [(-generations[number], -topo_indices[number], number,
+                 _is_interesting(marks[number])) for number in marks]
+        heapq.heapify(heap)
+        # The number of entries in the heap that were interesting when pushed
+        num_interesting = sum(1 for entry in heap if entry[3])
+        while heap and num_interesting:
+            _, _, number, interesting = heapq.heappop(heap)
+            if interesting:
+                num_interesting -= 1
+            number_marks = marks[number]
+            if done.get(number) == number_marks:
+                # A duplicate entry, pushed before the last of its marks arrived
+                continue
+            done[number] = number_marks
+            yield number, number_marks
+            if number_marks & (_FROM_FIRST | _FROM_SECOND | _STALE) == \
+                    _FROM_FIRST | _FROM_SECOND:
+                # Everything below a common ancestor is stale
+                number_marks |= _STALE
+                marks[number] = number_marks
+            for parent in self.get_parents(number):
+                parent_marks = marks.get(parent, 0)
+                if parent_marks | number_marks == parent_marks:
+                    continue
+                parent_marks |= number_marks
+                marks[parent] = parent_marks
+                interesting = _is_interesting(parent_marks)
+                heapq.heappush(heap, (-generations[parent], -topo_indices[parent], parent,
+                                      interesting))
+                if interesting:
+                    num_interesting += 1
+
+    def _ensure_generations(self):
+        """
+        Compute the generation numbers and topological indices again if
+        the parents of numbered commits have been loaded since they were
+        last computed, or number the commits added since
+        """
+        if not self._generations_valid:
+            self.compute_generations()
+        elif len(self.generations) < len(self._numbers):
+            self.update_generations()
+
+    def get_identity(self, identity_id):
+        """
+        Return the GitUser for the given identity id, or None
+
+        Each identity is only decoded once, and shared by every commit
+        it appears in.
+
+        :param identity_id: The id of an interned identity
+        """
+        if identity_id == NONE:
+            return None
+        git_user = self._decoded_identities.get(identity_id)
+        if git_user is None:
+            identity, encoding = self.identities[identity_id]
+            git_user = CommitHeader.decode_identity(identity, encoding)
+            self._decoded_identities[identity_id] = git_user
+        return git_user
+
+    def get_message(self, number):
+        """
+        Return the message of the given commit, loading its details if
+        needed
+
+        :param number: The number of the commit
+        """
+        self.load_details(number)
+        start = self.message_starts[number]
+        return self.messages[start:start + self.message_sizes[number]].decode("utf-8", "replace")
+
+    def commit(self, number):
+        """
+        Return a CommitView_ of the given commit
+
+        :param number: The number of the commit
+        """
+        return CommitView(self, number)
+
+    def restore(self, binshas, columns, messages, identities):
+        """
+        Replace the contents of this store with previously saved columns
+
+        :param binshas: The 20-byte SHA-1s of every commit, back to back
+        :param columns: A dict of the arrays named in COLUMNS
+        :param messages: The buffer of UTF-8 messages
+        :param identities: A list of (raw identity, encoding) tuples
+        """
+        self.binshas = bytearray(binshas)
+        for name, _ in CommitStore.COLUMNS:
+            setattr(self, name, columns[name])
+        # The restored commits have not been walked yet
+        self.flags = array(self.flags.typecode, (flags & ~WALKED for flags in self.flags))
+        self.messages = bytearray(messages)
+        self.identities = list(identities)
+        self._identity_ids = {identity: i for i, identity in enumerate(self.identities)}
+        self._decoded_identities = {}
+        self._numbers = {bytes(self.binshas[start:start + SHA_SIZE]): number
+                         for number, start in enumerate(range(0, len(self.binshas), SHA_SIZE))}
+        self._generations_valid = False
+
+    def _intern_identity(self, identity, encoding):
+        """
+        Return the id of the given identity, adding it to the identity
+        table if it is new
+
+        :param identity: The raw "name <email>" bytes of the identity,
+            or None
+        :param encoding: The encoding of the commit it is from
+        """
+        if identity is None:
+            return NONE
+        key = (identity, encoding)
+        identity_id = self._identity_ids.get(key)
+        if identity_id is None:
+            identity_id = len(self.identities)
+            self.identities.append(key)
+            self._identity_ids[key] = identity_id
+        return identity_id
+
+    def __getitem__(self, sha):
+        """
+        Return a CommitView_ of the commit with the given SHA-1
+
+        :param sha: The Sha1_ (or hex string) of the commit
+        """
+        number = self.find(sha)
+        if number is None:
+            raise KeyError(sha)
+        return CommitView(self, number)
+
+    def __contains__(self, sha):
+        """
+        Return True if the commit with the given SHA-1 is in the store
+
+        :param sha: The Sha1_ (or hex string) of the commit
+        """
+        return self.find(sha) is not None
+
+    def __iter__(self):
+        """
+        Iterate over the 40-character SHA-1s of every commit, in order
+        of their numbers
+        """
+        for number in range(len(self._numbers)):
+            yield self.get_hex(number)
+
+    def __len__(self):
+        """
+        Return the number of commits in the store
+        """
+        return len(self._numbers)
+
+
+def _is_interesting(marks):
+    """
+    Return True if a commit reached with the given marks may still
+    lead to commits reached from the first commit only, or from both
+    commits but not below a common ancestor
+
+    :param marks: The marks the commit was reached with
+    """
+    return not marks & _STALE and bool(marks & _FROM_FIRST)
@@ -0,0 +1,195 @@
+from datetime import datetime
+
+from git.Commit import Commit
+
+
+class CommitView(Commit):
+    """
+    .. _CommitView:
+
+    A Commit whose details are read from a CommitStore_
+
+    Views hold nothing but their store and commit number, so they are
+    created whenever a commit is needed and discarded after use. Each
+    attribute of a Commit is read from the store when it is accessed;
+    the author, committer, date authored and message are loaded into the
+    store the first time any of them is used, if they were not loaded
+    with the rest of the history.
+
+    Two views are equal if they are views of the same commit.
+
+    Attributes:
+        store: The CommitStore_ holding the commit.
+        number: The number of the commit in the store.
+        (all other attributes are the same as those of a Commit, but
+        are read only)
+    """
+
+    __slots__ = ("store", "number")
+
+    def __init__(self, store, number):
+        """Constructor"""
+        self.store = store
+        self.number = number
+
+    @property
+    def sha(self):
+        """
+        The Sha1 of the commit
+        """
+        return self.store.get_sha(self.number)
+
+    @property
+    def parents(self):
+        """
+        A list of CommitViews of the commit's parents
+        """
+        return [CommitView(self.store, parent) for parent in self.store.get_parents(self.number)]
+
+    @property
+    def children(self):
+        """
+        A list of CommitViews of the commit's children (that have been
+        loaded)
+        """
+        return [CommitView(self.store, child) for child in self.store.get_children(self.number)]
+
+    @property
+    def author(self):
+        """
+        The GitUser that originally created the commit
+        """
+        self.store.load_details(self.number)
+        return self.store.get_identity(self.store.author_ids[self.number])
+
+    @property
+    def committer(self):
+        """
+        The GitUser that last applied the commit
+        """
+        self.store.load_details(self.number)
+        return self.store.get_identity(self.store.committer_ids[self.number])
+
+    @property
+    def date_authored(self):
+        """
+        The local date and time the commit was originally created
+        """
+        self.store.load_details(self.number)
+        return _get_date(self.store.author_times[self.number])
+
+    @property
+    def date_committed(self):
+        """
+        The local date and time the commit was last applied, or None if
+        the commit has not been loaded
+        """
+        if not self.store.has_parents(self.number):
+            self.store.load_details(self.number)
+            if not self.store.has_details(self.number):
+                return None
+        return _get_date(self.store.commit_times[self.number])
+
+    @property
+    def commit_time(self):
+        """
+        The time the commit was last applied, in seconds since the epoch
+        """
+        return self.store.commit_times[self.number]
+
+    @property
+    def message(self):
+        """
+        The commit message
+        """
+        return self.store.get_message(self.number)
+
+    @property
+    def truncated(self):
+        """
+        True if only a window of history has been loaded, and the
+        commit is at the bottom of it, so some of its parents have not
+        been loaded yet
+        """
+        return self.store.is_truncated(self.number)
+
+    @property
+    def generation(self):
+        """
+        The generation number of the commit: 1 for a commit with no
+        loaded parents, otherwise one more than the greatest generation
+        of its parents
+        """
+        return self.store.get_generation(self.number)
+
+    @property
+    def topo_index(self):
+        """
+        The position of the commit in a topological order of the loaded
+        history, which puts every commit after all of its parents
+        """
+        return self.store.get_topo_index(self.number)
+
+    @property
+    def details_loaded(self):
+        """
+        True if the author, committer, dates and message of the commit
+        have been loaded
+        """
+        return self.store.has_details(self.number)
+
+    def add_parent(self, parent_commit):
+        """
+        Add the given commit to the list of parents for this commit, in
+        the store (adding the parent to the store if it is not in it)
+
+        :param parent_commit: A commit that directly preceded this one
+        """
+        self.store.add_parent(self.number, self.store.add(parent_commit.sha))
+
+    def add_child(self, child_commit):
+        """
+        Add the given commit to the list of children for this commit, in
+        the store (adding the child to the store if it is not in it)
+
+        :param child_commit: A commit that directly followed this one
+        """
+        self.store.add_child(self.number, self.store.add(child_commit.sha))
+
+    def __eq__(self, other):
+        """
+        Return True if this is a view of the same commit as the other
+
+        :param other: The Commit to compare this to
+        """
+        if isinstance(other, CommitView) and other.store is self.store:
+            return self.number == other.number
+        return Commit.__eq__(self, other)
+
+    def __ne__(self, other):
+        """
+        Return True if this is a view of a different commit than the
+        other
+
+        :param other: The Commit to compare this to
+        """
+        if isinstance(other, CommitView) and other.store is self.store:
+            return self.number != other.number
+        return Commit.__ne__(self, other)
+
+    def __hash__(self):
+        # The same as the hash of the commit's Sha1
+        return hash(self.store.get_binsha(self.number))
+
+
+def _get_date(time):
+    """
+    Return the local date and time for the given time, or None if it is
+    out of range
+
+    :param time: A number of seconds since the epoch
+    """
+    try:
+        return datetime.fromtimestamp(time)
+    except (OverflowError, OSError, ValueError):
+        return None
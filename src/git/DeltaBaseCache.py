@@ -0,0 +1,106 @@
+from collections import OrderedDict
+
+# The default budget for cached delta bases, matching git's core.deltaBaseCacheLimit
+DEFAULT_DELTA_BASE_CACHE_LIMIT = 96 * 1024 * 1024
+
+
+class DeltaBaseCache():
+    """
+    .. _DeltaBaseCache:
+
+    A least-recently-used cache of reconstructed pack objects that
+    serve as delta bases
+
+    Deltified objects in a pack form chains (up to 50 deep, by default),
+    and neighbouring objects in history usually share most of their
+    chain. Caching the reconstructed bases means each one is inflated
+    once, rather than once for every object built on top of it. This
+    mirrors git's own core.deltaBaseCacheLimit.
+
+    The cache is keyed by (pack path, offset), holds (type name,
+    contents) tuples, and is bounded by the total size of the cached
+    contents rather than the number of entries.
+
+    Attributes:
+        limit: The maximum total size of the cached contents, in bytes.
+        size: The current total size of the cached contents, in bytes.
+        hits: The number of lookups that found a cached object.
+        misses: The number of lookups that did not find a cached object.
+        evictions: The number of objects evicted to stay within the
+            limit.
+    """
+
+    def __init__(self, limit=DEFAULT_DELTA_BASE_CACHE_LIMIT):
+        """Constructor"""
+        self.limit = limit
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """
+        Return the cached (type name, contents) for the given key, or
+        None if it is not cached
+
+        :param key: A tuple of the pack path and the object's offset
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, obj_type_name, contents):
+        """
+        Cache a reconstructed object, evicting the least recently used
+        objects as needed to stay within the limit
+
+        Objects larger than the whole limit are not cached.
+
+        :param key: A tuple of the pack path and the object's offset
+        :param obj_type_name: The type of the object (e.g., "commit")
+        :param contents: The inflated contents of the object
+        """
+        obj_size = len(contents)
+        if obj_size > self.limit:
+            return
+        if key in self._entries:
+            self.size -= len(self._entries.pop(key)[1])
+        while self.size + obj_size > self.limit:
+            evicted_type_name, evicted_contents = self._entries.popitem(last=False)[1]
+            self.size -= len(evicted_contents)
+            self.evictions += 1
+        self._entries[key] = (obj_type_name, contents)
+        self.size += obj_size
+
+    def clear(self):
+        """
+        Remove every object from the cache
+        """
+        self._entries.clear()
+        self.size = 0
+
+    def __len__(self):
+        """
+        Return the number of objects in the cache
+        """
+        return len(self._entries)
+
+    def __contains__(self, key):
+        """
+        Return True if an object is cached for the given key
+
+        :param key: A tuple of the pack path and the object's offset
+        """
+        return key in self._entries
+
+    def __str__(self):
+        """
+        Return a string representation of this cache and its counters
+        """
+        return ("DeltaBaseCache({0} objects, {1}/{2} bytes, {3} hits, {4} misses, {5} evictions)"
+                .format(len(self), self.size, self.limit, self.hits, self.misses, self.evictions))
@@ -0,0 +1,140 @@
+import subprocess
+
+# The number of requests written to git before reading their responses. Small enough that the
+# requests always fit in the pipe to git, so writing never blocks while git waits for us to read.
+PIPELINE_DEPTH = 64
+
+
+class GitCatFileBatch():
+    """
+    .. _GitCatFileBatch:
+
+    A long-lived "git cat-file --batch" (or "--batch-check") process
+    for a repository
+
+    Rather than starting a new git process for each object, requests
+    for any number of objects are written, one SHA-1 per line, to a
+    single git process, and the framed responses are read back::
+
+        <sha> <type> <size>
+        <contents>
+
+    or "<sha> missing" for objects that do not exist. With
+    "--batch-check", only the first line of each response is written.
+
+    Attributes:
+        path_to_local_repository: A string representing the absolute
+            path to the git directory.
+        check_only: True if only object types and sizes are requested
+            (--batch-check), rather than their contents (--batch).
+    """
+
+    def __init__(self, path_to_local_repository, check_only=False):
+        """Constructor"""
+        self.path_to_local_repository = path_to_local_repository
+        self.check_only = check_only
+        self._process = None
+
+    def get_object(self, sha):
+        """
+        Return a tuple with the type name and contents (or size, if
+        check_only) of the git object with the given SHA-1, or None if
+        the object does not exist
+
+        :param sha: The Sha1_ (or name) of a git object
+        """
+        return self.get_objects([sha])[0]
+
+    def get_objects(self, shas):
+        """
+        Return a list with a (type name, contents) tuple for each of the
+        given SHA-1s, in the same order, with None for objects that do
+        not exist
+
+        If check_only, each tuple holds the object's size rather than
+        its contents. Requests are pipelined to git, so this costs one
+        round trip per PIPELINE_DEPTH objects rather than one process
+        per object.
+
+        If the git process dies, an OSError is raised, and the process
+        is stopped, so the next request starts a new one.
+
+        :param shas: The Sha1s_ (or names) of git objects
+        """
+        process = self._get_process()
+        shas = list(shas)
+        results = []
+        try:
+            for start in range(0, len(shas), PIPELINE_DEPTH):
+                requests = shas[start:start + PIPELINE_DEPTH]
+                process.stdin.write("".join(str(sha).strip() + "\n"
+                                            for sha in requests).encode())
+                process.stdin.flush()
+                for _ in requests:
+                    results.append(self._read_response(process.stdout))
+        except OSError:
+            self._kill()
+            raise
+        return results
+
+    def close(self):
+        """
+        Stop the git process, if it is running
+        """
+        if self._process is not None:
+            self._process.stdin.close()
+            self._process.wait()
+            self._process.stdout.close()
+            self._process = None
+
+    def _kill(self):
+        """
+        Stop the git process, without waiting for it to read what was
+        written to it, after it died or its pipes broke
+        """
+        process = self._process
+        self._process = None
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        for pipe in (process.stdin, process.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                # Unwritten requests to a dead process
+                pass
+
+    def _get_process(self):
+        """
+        Return the running git process, starting it if needed
+        """
+        if self._process is None or self._process.poll() is not None:
+            mode = "--batch-check" if self.check_only else "--batch"
+            self._process = subprocess.Popen(["git", "cat-file", mode],
+                                             cwd=self.path_to_local_repository,
+                                             stdin=subprocess.PIPE,
+                                             stdout=subprocess.PIPE,
+                                             stderr=subprocess.DEVNULL)
+        return self._process
+
+    def _read_response(self, stdout):
+        """
+        Read and return the next response from the git process
+
+        :param stdout: The stdout pipe of the git process
+        """
+        header = stdout.readline()
+        if not header:
+            raise IOError("git cat-file exited unexpectedly in {0}"
+                          .format(self.path_to_local_repository))
+        words = header.split()
+        if len(words) != 3:
+            # The object is missing (or the name is ambiguous)
+            return None
+        obj_type_name, obj_size = words[1].decode(), int(words[2])
+        if self.check_only:
+            return obj_type_name, obj_size
+        contents = stdout.read(obj_size)
+        # Skip the newline following the contents
+        stdout.read(1)
+        return obj_type_name, contents
@@ -0,0 +1,48 @@
+class GitCommandResult():
+    """
+    .. _GitCommandResult:
+
+    The outcome of a git command run by a GitCommandRunner_
+
+    Attributes:
+        args: The list of arguments passed to git (e.g., ["merge", "dev"]).
+        returncode: The exit status of the git process, or None if it
+            was killed before exiting on its own.
+        stdout: A string containing everything git wrote to stdout.
+        stderr: A string containing everything git wrote to stderr.
+        timed_out: True if the command was killed after exceeding its
+            timeout.
+        cancelled: True if the command was killed because it was
+            cancelled.
+    """
+
+    def __init__(self, args, returncode=None, stdout="", stderr="", timed_out=False,
+                 cancelled=False):
+        """Constructor"""
+        self.args = args
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timed_out = timed_out
+        self.cancelled = cancelled
+
+    @property
+    def succeeded(self):
+        """
+        Return True if the git command exited successfully
+        """
+        return self.returncode == 0
+
+    @property
+    def output(self):
+        """
+        Return everything git wrote to stdout, followed by everything it
+        wrote to stderr
+        """
+        return self.stdout + self.stderr
+
+    def __str__(self):
+        """
+        Return a string representation of this result
+        """
+        return "GitCommandResult(git {0}: {1})".format(" ".join(self.args), self.returncode)
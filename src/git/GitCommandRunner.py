@@ -0,0 +1,146 @@
+import asyncio
+
+from git.GitCommandResult import GitCommandResult
+
+# The number of bytes read from the output of a git command at a time
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class GitCommandRunner():
+    """
+    .. _GitCommandRunner:
+
+    Runs git commands in a repository as asyncio subprocesses
+
+    Commands are passed to git as argument lists (never through a
+    shell), their stdout and stderr are read incrementally as git
+    writes them, and any number of commands can run concurrently on one
+    event loop. A command that exceeds its timeout, or whose task is
+    cancelled, has its git process killed.
+
+    Attributes:
+        path_to_local_repository: A string representing the absolute
+            path to the git directory.
+    """
+
+    def __init__(self, path_to_local_repository):
+        """Constructor"""
+        self.path_to_local_repository = path_to_local_repository
+
+    async def run(self, args, timeout=None, on_stdout=None, on_stderr=None):
+        """
+        Run a git command and return its GitCommandResult_
+
+        :param args: A list of arguments to pass to git (e.g.,
+            ["merge", "dev"])
+        :param timeout: The number of seconds to wait for the command,
+            or None to wait indefinitely
+        :param on_stdout: A function called with each line of stdout as
+            it is read
+        :param on_stderr: A function called with each line of stderr as
+            it is read
+        """
+        process = await asyncio.create_subprocess_exec("git", *args,
+                                                       cwd=self.path_to_local_repository,
+                                                       stdin=asyncio.subprocess.DEVNULL,
+                                                       stdout=asyncio.subprocess.PIPE,
+                                                       stderr=asyncio.subprocess.PIPE)
+        result = GitCommandResult(list(args))
+        stdout_lines = []
+        stderr_lines = []
+        try:
+            await asyncio.wait_for(asyncio.gather(_read_lines(process.stdout, stdout_lines,
+                                                              on_stdout),
+                                                  _read_lines(process.stderr, stderr_lines,
+                                                              on_stderr),
+                                                  process.wait()),
+                                   timeout)
+            result.returncode = process.returncode
+        except asyncio.TimeoutError:
+            result.timed_out = True
+            await _kill(process)
+        except asyncio.CancelledError:
+            await _kill(process)
+            raise
+        result.stdout = "".join(stdout_lines)
+        result.stderr = "".join(stderr_lines)
+        return result
+
+    async def run_all(self, list_of_args, timeout=None):
+        """
+        Run several git commands concurrently and return a list of their
+        GitCommandResults_, in the same order
+
+        :param list_of_args: A list of argument lists, one per command
+        :param timeout: The number of seconds to wait for each command,
+            or None to wait indefinitely
+        """
+        return list(await asyncio.gather(*(self.run(args, timeout) for args in list_of_args)))
+
+    def run_sync(self, args, timeout=None):
+        """
+        Run a git command to completion on a new event loop and return
+        its GitCommandResult_
+
+        For use outside of a running event loop (e.g., from scripts or
+        worker threads); the GUI should use a GitCommandWorker instead.
+
+        :param args: A list of arguments to pass to git
+        :param timeout: The number of seconds to wait for the command,
+            or None to wait indefinitely
+        """
+        return asyncio.run(self.run(args, timeout))
+
+
+async def _read_lines(stream, lines, on_line=None):
+    """
+    Read a stream line by line until it is closed, collecting the
+    decoded lines and passing each one to on_line
+
+    The stream is read in chunks and split into lines here, so lines of
+    any length (e.g., from a diff of a minified file) are read whole.
+
+    :param stream: The asyncio StreamReader to read from
+    :param lines: The list to append each decoded line to
+    :param on_line: A function called with each line as it is read
+    """
+    # The chunks of the line not yet ended
+    partial_line = []
+    while True:
+        chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        *complete_lines, rest = chunk.split(b"\n")
+        for line in complete_lines:
+            partial_line.append(line)
+            _add_line(b"".join(partial_line) + b"\n", lines, on_line)
+            partial_line = []
+        if rest:
+            partial_line.append(rest)
+    if partial_line:
+        _add_line(b"".join(partial_line), lines, on_line)
+
+
+def _add_line(line, lines, on_line):
+    """
+    Decode a line read from a stream, collect it, and pass it to on_line
+
+    :param line: The bytes of the line
+    :param lines: The list to append the decoded line to
+    :param on_line: A function called with the decoded line, or None
+    """
+    line = line.decode(errors="replace")
+    lines.append(line)
+    if on_line is not None:
+        on_line(line)
+
+
+async def _kill(process):
+    """
+    Kill a git process (if it is still running) and wait for it to exit
+
+    :param process: The asyncio Process to kill
+    """
+    if process.returncode is None:
+        process.kill()
+    await process.wait()
@@ -18,6 +18,8 @@ class GitObject():
         sha: The SHA-1 hash string used to identify this git object.
     """
 
+    __slots__ = ("sha",)
+
     def __init__(self, sha):
         """Constructor"""
         self.sha = sha
@@ -1,8 +1,6 @@
 
-import subprocess
-from git.Sha1 import Sha1
-
-SUCCESS = 0  # used to check if a command was executed successfully.
+from git.GitCatFileBatch import GitCatFileBatch
+from git.GitCommandRunner import GitCommandRunner
 
 
 class GitTerminal:
@@ -10,9 +8,13 @@ class GitTerminal:
     Represents a git terminal where git commands can be executed
     as if they where being manually ran on the shell/terminal.
 
-    The core of this class is the "execute_comand" method, which uses
-    the python subprocess.popen library to execute commands through
-    the shell.
+    The core of this class is the "execute_command" method, which runs
+    git with a list of arguments through a GitCommandRunner (no shell
+    is involved). To keep the GUI responsive, a terminal given a
+    GitCommandWorker submits the commands listed below to it instead,
+    and they run in the background: each of them then returns the
+    request id of its command, and its output and result are delivered
+    by the worker's output_received and command_finished signals.
 
     List of supported commands:
 
@@ -22,14 +24,24 @@ class GitTerminal:
         * git commit
         * git branch
 
+    Git objects are read through long-lived "git cat-file --batch"
+    and "--batch-check" processes, started on first use and shared by
+    every object read until the terminal is closed.
+
     Attributes:
         path_to_local_repository: A string representing the
                                   absolute path to the git directory.
+        command_worker: The GitCommandWorker the commands listed above
+                        are run on, or None to run them here.
     """
 
-    def __init__(self, path_to_local_repository):
+    def __init__(self, path_to_local_repository, command_worker=None):
         """Constructor"""
         self.path_to_local_repository = path_to_local_repository
+        self.command_worker = command_worker
+        self._cat_file_batch = GitCatFileBatch(path_to_local_repository)
+        self._cat_file_batch_check = GitCatFileBatch(path_to_local_repository, check_only=True)
+        self._runner = GitCommandRunner(path_to_local_repository)
 
     def git_init(self):
         """
@@ -37,10 +49,12 @@ class GitTerminal:
 
         Returns a boolean value representing whether a git command
         was successfully executed (True)
-        or a failure happened (False).
+        or a failure happened (False), or the request id of the
+        command if it was submitted to the command_worker.
         """
-        command = "cd " + self.path_to_local_repository + ";git init"
-        output = GitTerminal.execute_command(command)
+        if self.command_worker is not None:
+            return self.submit_command(["init"])
+        output = self.execute_command(["init"])
         return output[0]
 
     def git_merge(self, list_of_branches):
@@ -55,17 +69,19 @@ class GitTerminal:
                 * a string containing the output message from the git
                   command executed ("git merge").
 
+        or the request id of the command if it was submitted to the
+        command_worker.
+
         :param list_of_branches: contains branches to be merged
                                  together
         """
 
         # Grab the name of the branches to be merged together.
-        branch_names = ""
-        for branch in list_of_branches:
-            branch_names += branch.name + " "
+        branch_names = [branch.name for branch in list_of_branches]
 
-        command = "cd " + self.path_to_local_repository + ";git merge " + branch_names
-        output = GitTerminal.execute_command(command)
+        if self.command_worker is not None:
+            return self.submit_command(["merge"] + branch_names)
+        output = self.execute_command(["merge"] + branch_names)
         return output
 
     def git_commit(self, commit_message):
@@ -74,13 +90,15 @@ class GitTerminal:
 
         Returns a boolean value representing whether a git command
         was successfully executed (True value)
-        or a failure happened (False value).
+        or a failure happened (False value), or the request id of the
+        command if it was submitted to the command_worker.
 
         :param commit_message: a descriptive message containing
                                information about changes made.
         """
-        command = "cd " + self.path_to_local_repository + ";git commit -m \"" + commit_message + "\""
-        output = GitTerminal.execute_command(command)
+        if self.command_worker is not None:
+            return self.submit_command(["commit", "-m", commit_message])
+        output = self.execute_command(["commit", "-m", commit_message])
         return output[1]
 
     def git_branch(self):
@@ -92,26 +110,69 @@ class GitTerminal:
 
                 * a string containing a list of branches
                   in a git repository.
+
+        or the request id of the command if it was submitted to the
+        command_worker.
         """
-        command = "cd " + self.path_to_local_repository + ";git branch"
-        output = GitTerminal.execute_command(command)
+        if self.command_worker is not None:
+            return self.submit_command(["branch"])
+        output = self.execute_command(["branch"])
         return output
 
     def show_git_objects_contents(self, sha):
         """
         Returns a string containing the contents of compressed file
-        stored by git. The contents of compressed git files can be displayed by running the git command:
-        "git cat-file -p <sha1>"
+        stored by git, or None if there is no such object. The contents
+        of compressed git files can be displayed by running the git
+        command: "git cat-file -p <sha1>"
 
-        :par
-        am sha: The SHA-1 hash of a git object.
+        :param sha: The SHA-1 hash of a git object.
         """
-        command = "cd " + self.path_to_local_repository + ";git cat-file -p " + sha.name
-        output = GitTerminal.execute_command(command)
-        return output[1]
+        git_obj = self._cat_file_batch.get_object(sha)
+        if git_obj is None:
+            return None
+        return git_obj[1].decode(errors="replace")
+
+    def get_git_object(self, sha):
+        """
+        Returns a (type, contents) tuple for the given git object, or
+        None if there is no such object. The contents are the raw bytes
+        of the object.
+
+        :param sha: The SHA-1 hash of a git object.
+        """
+        return self._cat_file_batch.get_object(sha)
+
+    def get_git_objects(self, shas):
+        """
+        Returns a list containing a (type, contents) tuple for each of
+        the given git objects, or None for objects that do not exist.
+        The contents are the raw bytes of each object.
+
+        All of the objects are read through one "git cat-file --batch"
+        process.
+
+        :param shas: The SHA-1 hashes of git objects.
+        """
+        return self._cat_file_batch.get_objects(shas)
 
-    @staticmethod
-    def execute_command(command):
+    def check_git_objects(self, shas):
+        """
+        Returns a list containing a (type, size) tuple for each of the
+        given git objects, or None for objects that do not exist.
+
+        :param shas: The SHA-1 hashes of git objects.
+        """
+        return self._cat_file_batch_check.get_objects(shas)
+
+    def close(self):
+        """
+        Stops the git processes used to read git objects.
+        """
+        self._cat_file_batch.close()
+        self._cat_file_batch_check.close()
+
+    def execute_command(self, args, timeout=None):
         """
         Executes a git command.
 
@@ -123,44 +184,31 @@ class GitTerminal:
                 * a string containing the output message from the git
                   command executed.
 
-        :param command: a string containing the absolute path to the
-                        local repo and the git command to be executed.
+        :param args: a list of arguments to be passed to git, e.g.
+                     ["merge", "dev"] to execute "git merge dev".
+        :param timeout: the number of seconds to wait for the command,
+                        or None to wait until it finishes.
 
-        command to be executed are in the form:
-            cd /home/username/dir/another_dir ; git init
-
-
-        we use popen from the python subprocess library to execute
-        a git command on the terminal.
-
-        "shell=True" is necessary in order for popen to run a command
-        passed in as a string other options like stdout=PIPE are
-        necessary in order to grab the output of the command that was
-        executed note that we redirect "stderr=STOUT", this way we
-        treat errors as normal output.
+        The command is run in the local repo, without a shell, so
+        arguments never need quoting. Errors (stderr) are treated as
+        normal output and follow the rest of the output. A command
+        that times out is killed, and is reported as a failure.
         """
-        command_line_process = subprocess.Popen(command,
-                                                shell=True,
-                                                universal_newlines=True,
-                                                stdout=subprocess.PIPE,
-                                                stderr=subprocess.STDOUT,
-                                                stdin=subprocess.PIPE)
+        result = self._runner.run_sync(args, timeout)
+        return result.succeeded, result.output
 
-        # verifies if it is safe to grab the output from a git command before we call ".communicate"
-        # which will close the process. ".read" can not be called after the process is closed.
-        while True:
-            # returns None while subprocess is running.
-            if command_line_process.poll() is None:
-                break
-
-        # read the output before closing the process.
-        output = command_line_process.stdout.read()
+    def submit_command(self, args, timeout=None):
+        """
+        Submits a git command to the command_worker, to run in the
+        background, and returns its request id.
 
-        # closes the process.
-        command_line_process.communicate()
+        The output of the command, and its GitCommandResult once it
+        finishes, are delivered by the worker's output_received and
+        command_finished signals, tagged with the request id.
 
-        # check if the git command was executed properly
-        if command_line_process.returncode == SUCCESS:
-            return True, output  # tuple
-        else:
-            return False, output  # tuple
\ No newline at end of file
+        :param args: a list of arguments to be passed to git, e.g.
+                     ["merge", "dev"] to execute "git merge dev".
+        :param timeout: the number of seconds to wait for the command,
+                        or None to wait until it finishes.
+        """
+        return self.command_worker.submit(self.path_to_local_repository, args, timeout)
@@ -9,6 +9,8 @@ class GitUser():
         email: User's email address (format not verified).
     """
 
+    __slots__ = ("name", "email")
+
     def __init__(self, name="", email=""):
         """Constructor"""
         self.name = name
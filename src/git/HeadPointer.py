@@ -10,13 +10,16 @@ class HeadPointer():
     Attributes:
         NAME: "HEAD"
         commit_sha: The Sha1 of the commit this HEAD pointer is referencing
+        branch_name: The name of the checked out branch (e.g.,
+            "master"), or None if HEAD is detached
     """
 
     NAME = "HEAD"
 
-    def __init__(self, commit_sha):
+    def __init__(self, commit_sha, branch_name=None):
         """Constructor"""
         self.commit_sha = commit_sha
+        self.branch_name = branch_name
 
     def __str__(self):
         """
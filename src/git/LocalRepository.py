@@ -1,23 +1,40 @@
-import binascii
-import glob
+import heapq
+import itertools
 import logging
 import os
 import sys
+import threading
 import zlib
+from array import array
+from datetime import datetime
 
+from git.AbbreviatedShaIndex import AbbreviatedShaIndex
+from git.AnnotatedTag import AnnotatedTag
 from git.Branch import Branch
-from git.Commit import Commit
+from git.CommitGraphCache import CommitGraphCache
+from git.CommitGraphFile import CommitGraphFile
+from git.CommitHeader import CommitHeader
+from git.CommitStore import CommitStore
 from git.GitObject import GitObject
 from git.GitTerminal import GitTerminal
-from git.GitUser import GitUser
-from git.Sha1 import Sha1
-from datetime import datetime
+from git.HeadPointer import HeadPointer
+from git.PackedObjectStore import PackedObjectStore
+from git.RefDatabase import HEAD, PREFIX_BRANCHES, PREFIX_TAGS, RefDatabase
+from git.Sha1Pool import Sha1Pool
+from git.Tag import Tag
+from git.TagHeader import TagHeader
 from profilehooks import profile
 
-PATH_TO_BRANCHES = ".git/refs/heads/"
+PATH_TO_GIT_DIR = ".git/"
 PATH_TO_GIT_OBJECTS = ".git/objects/"
 PATH_TO_PACKFILES = ".git/objects/pack/"
 
+# Tags of tags are peeled no deeper than this
+MAX_TAG_DEPTH = 16
+
+# The default number of commits yielded at a time while loading the commit graph
+COMMIT_BATCH_SIZE = 500
+
 app_logger = logging.getLogger()
 app_logger.setLevel(logging.DEBUG)
 ch = logging.StreamHandler(sys.stdout)
@@ -47,16 +64,38 @@ class LocalRepository():
             containing the complete commit history via it's children.
         branches: A list of all local Branches (references to commits)
             contained in this repository.
-        commits: A map of SHA-1 hash strings to the CommitObjects they
-            identify in this repository.
+        tags: A list of all Tags and AnnotatedTags in this repository.
+        head: The HeadPointer_ of this repository, or None.
+        commits: A CommitStore_ mapping SHA-1 hash strings to the
+            Commits they identify in this repository.
+        shas: The Sha1Pool_ interning every Sha1 in this repository.
+        refs: The RefDatabase_ holding the refs of this repository.
+        git_terminal: The GitTerminal running git commands in this
+            repository, on the given GitCommandWorker if there is one.
     """
 
-    def __init__(self, path):
+    def __init__(self, path, command_worker=None):
         """Constructor"""
         self.path = path
         self.rootcommit = None
         self.branches = []
-        self.commits = {}
+        self.tags = []
+        self.head = None
+        self.shas = Sha1Pool()
+        self.commits = CommitStore(self._get_commit_details, self.shas)
+        self.refs = RefDatabase(os.path.join(path, PATH_TO_GIT_DIR))
+        self._packed_objects = None
+        self._commit_graph_file = None
+        self._abbreviated_sha_index = None
+        # The state of the history walk: the commits whose parents still need to be walked, and
+        # the order every walked commit was loaded in
+        self._commit_heap = []
+        self._commit_order = itertools.count()
+        self._loaded_order = array("I")
+        self._loaded_all_details = True
+        self._cache_key = None
+        self.git_terminal = GitTerminal(path, command_worker)
+        self._object_lock = threading.RLock()
 
     @profile
     def get_commit_graph(self):
@@ -73,66 +112,373 @@ class LocalRepository():
         :return The Commit_ at the root of the commit graph
         """
 
-        # A stack of "empty" commits (only containing SHA-1s) that we need to get complete info for
-        commit_stack = []
+        for _ in self.iter_commit_graph():
+            pass
+
+        return self.rootcommit
+
+    def iter_commit_graph(self, batch_size=COMMIT_BATCH_SIZE, max_count=None, since=None):
+        """
+        Assemble the commit history for this local repository, yielding
+        lists of newly loaded commits as it goes
+
+        Commits are loaded newest first (by commit date, like git log),
+        starting from the commits the local branches point to. Every
+        commit yielded is a CommitView_ linked to all of its children,
+        and to all of its parents (which may not have been yielded
+        yet). Once the iteration is complete, rootcommit and commits
+        hold the complete commit graph.
+
+        The history can be limited to a window of the most recent
+        commits, as with git log's --max-count and --since options. The
+        commits at the bottom of the window are then truncated (see
+        CommitView.truncated), and the window can be extended with
+        iter_older_history().
+
+        If the commit graph cache matches the current branches and pack
+        files, the commits are read from the cache instead. Otherwise,
+        the complete graph is saved to the cache once it is loaded.
+
+        :param batch_size: The number of commits to yield at a time
+        :param max_count: The most commits to load, or None
+        :param since: The datetime of the oldest commit to load, or None
+        """
+
+        # Start a new store, so reloading the history never links commits twice
+        self.commits = CommitStore(self._get_commit_details, self.shas)
+        self.rootcommit = None
+        self._commit_heap = []
+        self._commit_order = itertools.count()
+        self._loaded_order = array("I")
+        self._loaded_all_details = True
+        self._cache_key = None
 
-        # Assemble the commit history for each local branch
+        # Use the cached commit graph if nothing has changed since it was saved
         self.branches = self._get_all_local_branches()
-        for branch in self.branches:
-            # Add the branch's (empty) commit to the stack if we haven't already encountered it
-            if branch.commit_sha.name not in self.commits:
-                commit_stack.append(Commit(branch.commit_sha))
-                # Get complete details for each commit in the branch's history
-                while commit_stack:
-                    # Get a Commit off the stack and add it to the list of commits we've encountered
-                    current_commit = commit_stack.pop()
-                    self.commits[current_commit.sha.name] = current_commit
-
-                    # Get complete details for the commit
-                    current_commit = self._get_commit_object(current_commit)
-                    app_logger.debug("Getting history for commit {0}"
-                                     .format(current_commit.sha[:8]))
-
-                    if current_commit.parents:
-                        # Place each parent on the stack if we haven't encountered it before
-                        for parent in current_commit.parents:
-                            if parent.sha.name not in self.commits:
-                                commit_stack.append(parent)
-                    else:
-                        # This commit is the root of this git graph
-                        self.rootcommit = current_commit
-                        app_logger.debug("Found root commit {0}".format(self.rootcommit.sha[:8]))
+        self.tags = self._get_all_tags()
+        self.head = self._get_head()
+        commit_graph_cache = CommitGraphCache(os.path.join(self.path, PATH_TO_GIT_DIR))
+        cache_key = self._compute_cache_key()
+        cached_order = commit_graph_cache.load(cache_key, self.commits)
+        if cached_order is not None:
+            app_logger.debug("Loaded {0} commits from the commit graph cache"
+                             .format(len(cached_order)))
+            self._cache_key = cache_key
+            # Walk the cached commits again, without loading anything, keeping commits with the
+            # same time in the order they were cached
+            commit_times = self.commits.commit_times
+            self._commit_heap = [(-commit_times[number], next(self._commit_order), number)
+                                 for number in cached_order]
+            heapq.heapify(self._commit_heap)
+
+        # Load the history from the commit each local branch points to
+        yield from self._walk_commit_graph([branch.commit_sha for branch in self.branches],
+                                           batch_size, max_count, since)
 
         # Log the number of commits found and the root commit
         app_logger.debug("Found {0} commits with root commit {1}"
-                         .format(str(len(self.commits)), self.rootcommit.sha[:8]))
+                         .format(str(len(self._loaded_order)),
+                                 self.rootcommit.sha[:8] if self.rootcommit else None))
+        app_logger.debug("Delta base cache usage: {0}"
+                         .format(self._get_packed_objects().delta_base_cache))
 
-        return self.rootcommit
+    def iter_older_history(self, max_count=None, since=None, batch_size=COMMIT_BATCH_SIZE):
+        """
+        Extend the window of history loaded by iter_commit_graph() to
+        older commits, yielding lists of newly loaded commits as it
+        goes, newest first
+
+        :param max_count: The most commits to add to the window, or
+            None
+        :param since: The datetime of the oldest commit to load, or None
+        :param batch_size: The number of commits to yield at a time
+        """
+        yield from self._walk_commit_graph([], batch_size, max_count, since)
+
+    def is_history_complete(self):
+        """
+        Return True if the complete history of every branch has been
+        loaded (rather than a window of recent history)
+        """
+        return not self._commit_heap
+
+    def iter_commit_graph_updates(self, batch_size=COMMIT_BATCH_SIZE):
+        """
+        Load the commits added to this repository since its history was
+        loaded, yielding lists of the new commits as it goes, newest
+        first
+
+        The refs are read again (updating branches, tags and head), and
+        new pack files are opened. History is then walked from each
+        branch that points to a commit that has not been loaded, only
+        as far as the commits that have, so the cost depends on the
+        number of new commits rather than the size of the history. If
+        only a window of history has been loaded, new commits older
+        than the window are left for iter_older_history(). Commits that
+        are no longer reachable (e.g., after a branch is deleted or
+        force pushed) are kept.
+
+        :param batch_size: The number of commits to yield at a time
+        """
+        self._refresh_objects()
+        self.branches = self._get_all_local_branches()
+        self.tags = self._get_all_tags()
+        self.head = self._get_head()
+
+        # Stop at the bottom of the window, if the history is truncated
+        since = None
+        if self._commit_heap and self._loaded_order:
+            since = self.commits.commit_times[self._loaded_order[-1]]
+
+        num_loaded = len(self._loaded_order)
+        yield from self._walk_commit_graph([branch.commit_sha for branch in self.branches],
+                                           batch_size, since=since)
+        app_logger.debug("Found {0} new commits".format(len(self._loaded_order) - num_loaded))
+
+    def resolve_abbreviated_sha(self, prefix):
+        """
+        Return the Sha1 of the one git object whose SHA-1 begins with
+        the given hex prefix
+
+        Raise a KeyError if no object matches, or a ValueError if the
+        prefix is not a valid abbreviation or more than one object
+        matches.
+
+        :param prefix: An abbreviated SHA-1 (at least 4 characters)
+        """
+        return self.shas.get(self._get_abbreviated_sha_index().resolve(prefix))
+
+    def get_abbreviated_sha(self, sha, min_length=None):
+        """
+        Return the shortest unique abbreviation of the given SHA-1, at
+        least as long as git's default for this repository (as with
+        core.abbrev=auto)
+
+        :param sha: The Sha1_ to abbreviate
+        :param min_length: The shortest abbreviation to return, or None
+            for git's default
+        """
+        return self._get_abbreviated_sha_index().get_unique_abbreviation(sha, min_length)
+
+    def is_ancestor(self, ancestor_sha, descendant_sha):
+        """
+        Return True if the first commit is the second, or an ancestor of
+        it, in the history loaded so far (as with git merge-base
+        --is-ancestor)
+
+        Raise a KeyError if either commit has not been loaded.
+
+        :param ancestor_sha: The Sha1_ of the possible ancestor
+        :param descendant_sha: The Sha1_ of the possible descendant
+        """
+        return self.commits.is_ancestor(self._find_commit(ancestor_sha),
+                                        self._find_commit(descendant_sha))
+
+    def merge_base(self, sha, other_sha):
+        """
+        Return the CommitView_ of a best common ancestor of the two
+        commits (as with git merge-base), or None if they have none in
+        the history loaded so far
+
+        Raise a KeyError if either commit has not been loaded.
+
+        :param sha: The Sha1_ of one commit
+        :param other_sha: The Sha1_ of the other commit
+        """
+        merge_bases = self.commits.get_merge_bases(self._find_commit(sha),
+                                                   self._find_commit(other_sha))
+        return self.commits.commit(merge_bases[0]) if merge_bases else None
+
+    def commits_between(self, since_sha, until_sha):
+        """
+        Return a list of CommitViews_ of the commits that can be reached
+        from one commit but not from another (as with git log
+        since..until), newest generation first
+
+        Raise a KeyError if either commit has not been loaded.
+
+        :param since_sha: The Sha1_ of the commit whose history is
+            excluded
+        :param until_sha: The Sha1_ of the commit whose history is
+            included
+        """
+        return [self.commits.commit(number) for number in self.commits.get_range(
+            self._find_commit(since_sha), self._find_commit(until_sha))]
+
+    def close(self):
+        """
+        Release the pack files and git processes held open by this
+        repository
+        """
+        if self._packed_objects is not None:
+            self._packed_objects.close()
+            self._packed_objects = None
+        self._abbreviated_sha_index = None
+        if self._commit_graph_file:
+            self._commit_graph_file.close()
+        self._commit_graph_file = None
+        self.git_terminal.close()
+
+    def _walk_commit_graph(self, tip_shas, batch_size, max_count=None, since=None):
+        """
+        Load the history reachable from the given commits (and from the
+        commits left over from previous walks) that has not been loaded
+        yet, newest first, yielding lists of the newly loaded commits
+        as it goes
+
+        The commits whose parents still need to be walked are kept
+        between walks, so a walk stopped by max_count or since (or by
+        no longer being iterated) can be continued later. The commit
+        graph cache is saved once the complete history is loaded.
+
+        :param tip_shas: The Sha1s_ of the commits to start from
+        :param batch_size: The number of commits to yield at a time
+        :param max_count: The most commits to walk, or None
+        :param since: The oldest commit time to walk, as a datetime or
+            in seconds since the epoch, or None
+        """
+        if isinstance(since, datetime):
+            since = since.timestamp()
+
+        # A heap of the numbers of loaded commits whose parents still need to be loaded, ordered
+        # newest first (with a counter to keep ties in the order they were found)
+        commit_heap = self._commit_heap
+
+        def load_commit(number):
+            # Get the commit's parents and date (and, if its object is read, complete details), and
+            # add it to the heap. Commits found in git's commit-graph file are loaded without
+            # reading their objects, so caching them would mean reading every one
+            if self._load_commit_from_commit_graph_file(number):
+                self._loaded_all_details = False
+            else:
+                self._get_commit_object(number)
+            app_logger.debug("Getting history for commit {0}"
+                             .format(self.commits.get_hex(number)[:8]))
+            heapq.heappush(commit_heap, (-self.commits.commit_times[number],
+                                         next(self._commit_order), number))
+
+        # Start from each of the given commits that has not been loaded
+        for tip_sha in tip_shas:
+            number = self.commits.add(tip_sha)
+            if not self.commits.has_parents(number):
+                load_commit(number)
+
+        num_walked = 0
+        batch = []
+        while commit_heap:
+            if max_count is not None and num_walked >= max_count:
+                break
+            if since is not None and -commit_heap[0][0] < since:
+                break
+            number = heapq.heappop(commit_heap)[2]
+            current_commit = self.commits.commit(number)
+            self.commits.set_walked(number)
+            batch.append(current_commit)
+            self._loaded_order.append(number)
+            num_walked += 1
+
+            parent_numbers = self.commits.get_parents(number)
+            if parent_numbers:
+                # Load each parent if we haven't encountered it before
+                for parent_number in parent_numbers:
+                    if not self.commits.has_parents(parent_number):
+                        load_commit(parent_number)
+            else:
+                # This commit is the root of this git graph
+                self.rootcommit = current_commit
+                app_logger.debug("Found root commit {0}".format(self.rootcommit.sha[:8]))
+
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+        # Number the generations of the commits just loaded, for ancestry queries and layout
+        self.commits.update_generations()
+
+        # Save the complete commit graph for the next time this repository is opened
+        if not commit_heap:
+            self._save_commit_graph_cache()
+
+    def _find_commit(self, sha):
+        """
+        Return the number of the loaded commit with the given SHA-1, or
+        raise a KeyError if it has not been loaded
+
+        :param sha: The Sha1_ (or hex string) of the commit
+        """
+        number = self.commits.find(sha)
+        if number is None:
+            raise KeyError(sha)
+        return number
+
+    def _compute_cache_key(self):
+        """
+        Return the key of the commit graph cache for the current
+        branches and pack files
+        """
+        return CommitGraphCache.compute_key(
+            self.branches, [pack.index.pack_checksum for pack in self._get_packed_objects().packs])
+
+    def _save_commit_graph_cache(self):
+        """
+        Save the loaded commit graph to the commit graph cache, unless
+        it is already saved under the current key, or git's commit-graph
+        file (which is faster still) was used to load it
+        """
+        cache_key = self._compute_cache_key()
+        if not self._loaded_all_details or cache_key == self._cache_key:
+            return
+        try:
+            CommitGraphCache(os.path.join(self.path, PATH_TO_GIT_DIR)).save(
+                cache_key, self.commits, self._loaded_order)
+            self._cache_key = cache_key
+        except OSError as error:
+            app_logger.warning("Could not save the commit graph cache: {0}".format(error))
+
+    def _refresh_objects(self):
+        """
+        Open any pack files (and git commit-graph file) written since
+        the objects of this repository were first read, and forget any
+        that have been removed
+        """
+        with self._object_lock:
+            if self._packed_objects is not None:
+                self._packed_objects.refresh()
+            if self._abbreviated_sha_index is not None:
+                self._abbreviated_sha_index.refresh()
+            if self._commit_graph_file:
+                self._commit_graph_file.close()
+            self._commit_graph_file = None
 
     def _get_all_local_branches(self):
         """
-        Return a list of all local branches in this repository
+        Return a list of all local branches in this repository, whether
+        loose or packed
         """
-        branches = []
-        for branch_filename in os.listdir(os.path.join(self.path, PATH_TO_BRANCHES)):
-            branch = self._get_local_branch(branch_filename)
-            branches.append(branch)
+        branches = [Branch(ref_name[len(PREFIX_BRANCHES):], self.shas.get(sha))
+                    for ref_name, sha in self.refs.get_refs(PREFIX_BRANCHES).items()]
+
+        # Log the branches we found
+        app_logger.debug("Found {0} local branches".format(len(branches)))
 
         return branches
 
     def _get_local_branch(self, branch_name):
         """
-        Return the local Branch with the given name
+        Return the local Branch with the given name, or None if there is
+        no such branch
 
-        :param branch_name: The name of the branch to be retrieved
+        :param branch_name: The name of the branch to be retrieved (e.g.,
+            "master" or "feature/foo")
         """
-        # Get the SHA-1 of the commit the given branch points to (full contents of the branch file)
-        branch_file = open(os.path.join(self.path, PATH_TO_BRANCHES, branch_name))
-        branch_file_contents = branch_file.read()
-        branch_file.close()
+        sha = self.refs.resolve(PREFIX_BRANCHES + branch_name)
+        if sha is None:
+            return None
 
         # Create a Branch pointing to the commit with the SHA-1 we find
-        branch = Branch(branch_name, Sha1(branch_file_contents))
+        branch = Branch(branch_name, self.shas.get(sha))
 
         # Log the branch we found
         app_logger.debug("Found a local branch {0} pointing to commit {1}"
@@ -140,77 +486,194 @@ class LocalRepository():
 
         return branch
 
-    def _get_commit_object(self, commit):
+    def _get_all_tags(self):
+        """
+        Return a list of all tags in this repository: a Tag for each
+        lightweight tag, and an AnnotatedTag for each annotated tag
+
+        Annotated tags are peeled to the commits they tag in batches,
+        reading all of the tag objects at each level (tags of tags are
+        rare) in one pass. Tags that packed-refs records the peeled
+        commit of, or records as lightweight, are not read more than
+        needed.
+        """
+        tags = []
+        # The tags that may be annotated, with the SHA-1s they point to and are peeled to, if known
+        tag_refs_to_read = {}
+        tag_object_shas = set()
+        peeled_refs = self.refs.get_peeled_refs(PREFIX_TAGS)
+        for ref_name, sha in self.refs.get_refs(PREFIX_TAGS).items():
+            tag_name = ref_name[len(PREFIX_TAGS):]
+            if ref_name in peeled_refs and peeled_refs[ref_name] is None:
+                # A lightweight tag, pointing directly to a commit
+                tags.append(Tag(tag_name, self.shas.get(sha)))
+            else:
+                tag_refs_to_read[tag_name] = (sha, peeled_refs.get(ref_name))
+                tag_object_shas.add(sha)
+
+        # Read the tag objects, then any tags they point to, until every tag is peeled
+        objects = {}
+        for _ in range(MAX_TAG_DEPTH):
+            if not tag_object_shas:
+                break
+            objects.update(zip(tag_object_shas, self._get_git_objects(tag_object_shas)))
+            tag_object_shas = set()
+            for sha, peeled_sha in tag_refs_to_read.values():
+                if peeled_sha is None:
+                    unread_sha = self._peel_tag(sha, objects)[1]
+                    if unread_sha is not None:
+                        tag_object_shas.add(unread_sha)
+
+        for tag_name, (sha, peeled_sha) in tag_refs_to_read.items():
+            git_object = objects.get(sha)
+            if git_object is None or git_object[0] != "tag":
+                # The tag ref points directly to a commit after all
+                tags.append(Tag(tag_name, self.shas.get(sha)))
+                continue
+            tag_header = TagHeader(git_object[1])
+            if peeled_sha is None:
+                peeled_sha = self._peel_tag(sha, objects)[0]
+            tagger, tag_time, _ = tag_header.get_tagger()
+            tags.append(AnnotatedTag(
+                self.shas.get(sha), tag_name,
+                self.shas.get(peeled_sha) if peeled_sha is not None else None,
+                CommitHeader.decode_identity(tagger) if tagger is not None else None,
+                _get_date(tag_time) if tagger is not None else None,
+                tag_header.get_message()))
+
+        tags.sort(key=lambda tag: tag.name)
+
+        # Log the tags we found
+        app_logger.debug("Found {0} tags ({1} annotated)".format(
+            len(tags), sum(1 for tag in tags if isinstance(tag, AnnotatedTag))))
+
+        return tags
+
+    def _get_head(self):
+        """
+        Return the HeadPointer_ of this repository, or None if HEAD does
+        not point to a commit (e.g., in a new repository)
+        """
+        sha = self.refs.resolve(HEAD)
+        if sha is None:
+            return None
+        branch_ref_name = self.refs.get_symbolic_ref(HEAD)
+        if branch_ref_name is not None and branch_ref_name.startswith(PREFIX_BRANCHES):
+            branch_name = branch_ref_name[len(PREFIX_BRANCHES):]
+        else:
+            branch_name = None
+        return HeadPointer(self.shas.get(sha), branch_name)
+
+    @staticmethod
+    def _peel_tag(sha, objects):
+        """
+        Return a tuple with the 40-character hex SHA-1 of the object at
+        the end of the given tag's chain of tags (or None if it cannot
+        be found), and the SHA-1 of the tag object that must be read to
+        follow the chain further (or None)
+
+        The type of the object each tag points to is in its header, so
+        only tag objects are ever read.
+
+        :param sha: The SHA-1 of an annotated tag object
+        :param objects: A dict of the SHA-1s of the tag objects read so
+            far to their (type, contents)
         """
-        Deserialize the given commit object file contents
+        for _ in range(MAX_TAG_DEPTH):
+            if sha not in objects:
+                return None, sha
+            git_object = objects[sha]
+            if git_object is None:
+                return None, None
+            if git_object[0] != "tag":
+                return sha, None
+            tag_header = TagHeader(git_object[1])
+            if tag_header.type != "tag":
+                return tag_header.object, None
+            sha = tag_header.object
+        return None, None
+
+    def _load_commit_from_commit_graph_file(self, number):
+        """
+        Load the parents and commit date of the given commit from git's
+        commit-graph file, without reading the commit object
 
-        Commit object file contents are in the form::
+        Return True if the commit was found in the commit-graph file, or
+        False if there is no such file or the commit is not in it (e.g.,
+        it was created since the file was written).
 
-            tree 2bddce7d093dfc7ce7911b5e8ae4ccbdf048b7d3
-            parent a6407f4a8a2bef57ed84d4853a89e940f2834c11
-            parent db5920fe02784ac83b2fe829a172383bb48c3027
-            author Kahmali Rose <kahmali@mail.com> 1400873968 -0400
-            committer Kahmali Rose <kahmali@mail.com> 1400924303 -0400
+        :param number: The number of the commit to load
+        """
+        commit_graph_file = self._get_commit_graph_file()
+        if commit_graph_file is None:
+            return False
+        position = commit_graph_file.find_position(self.commits.get_binsha(number))
+        if position is None:
+            return False
+        parent_positions, generation, commit_date = commit_graph_file.get_commit_data(position)
+        parent_numbers = [self.commits.add(commit_graph_file.get_sha(parent_position))
+                          for parent_position in parent_positions]
+        self.commits.set_parents(number, parent_numbers, commit_date)
+        return True
+
+    def _get_commit_graph_file(self):
+        """
+        Return git's CommitGraphFile_ for this repository, or None if
+        git has not written one
 
-            Commit message begins after a blank line.
+        The file is opened and memory-mapped on first use.
+        """
+        if self._commit_graph_file is None:
+            try:
+                self._commit_graph_file = CommitGraphFile.open(
+                    os.path.join(self.path, PATH_TO_GIT_OBJECTS))
+            except (OSError, ValueError, KeyError) as error:
+                app_logger.warning("Could not read the commit-graph file: {0}".format(error))
+            if self._commit_graph_file is None:
+                # Remember that there is no (usable) commit-graph file
+                self._commit_graph_file = False
+        return self._commit_graph_file or None
+
+    def _get_commit_object(self, number):
+        """
+        Deserialize the given commit from its commit object file
+        contents (see CommitHeader_)
 
+        The parents and commit date are needed to load the commit
+        graph. The author, committer, dates and message are stored
+        compactly while the contents are at hand, and only decoded when
+        they are used.
 
-        :param commit: The commit object to retrieve
-        :return The CommitObject with the given SHA-1
+        :param number: The number of the commit to retrieve
         """
 
         # Get the decompressed contents of the commit object file
-        commit_obj_file_contents = self._get_git_object_contents(commit.sha)
-
-        # Deserialize the contents of the commit file
-        # commit = Commit(commit)
-        commit_message = ""
-        reading_commit_message = False
-        for line in commit_obj_file_contents.splitlines(True):
-            if reading_commit_message:
-                commit_message += str(line)
-            else:
-                if not line.isspace():
-                    # Get the details about the commit
-                    words = line.split()
-                    keyword = words[0]
-                    if keyword == "parent":
-                        # Add a parent to the commit
-                        parent_sha_str = words[1]
-                        if parent_sha_str in self.commits:
-                            # Link the current commit with it's existing parent commit
-                            commit.add_parent(self.commits[parent_sha_str])
-                            self.commits[parent_sha_str].add_child(commit)
-                        else:
-                            # Link the current commit with a new parent commit
-                            parent = Commit(Sha1(parent_sha_str))
-                            commit.add_parent(parent)
-                            parent.add_child(commit)
-                    if keyword == "author":
-                        # Get the author and date authored
-                        author_name = " ".join(words[1:-3])
-                        author_email = words[-3].strip("<>")
-                        date_authored = datetime.fromtimestamp(int(words[-2]))
-                        commit.author = GitUser(author_name, author_email)
-                        commit.date_authored = date_authored
-                    if keyword == "committer":
-                        # Get the committer and date committed
-                        committer_name = " ".join(words[1:-3])
-                        committer_email = words[-3].strip("<>")
-                        date_committed = datetime.fromtimestamp(int(words[-2]))
-                        commit.committer = GitUser(committer_name, committer_email)
-                        commit.date_committed = date_committed
-                else:
-                    # An empty line signifies the commit message is about to begin
-                    reading_commit_message = True
-        # Add the message to the commit
-        commit.message = commit_message
-
-        return commit
+        commit_obj_file_contents = self._get_git_object_contents(self.commits.get_sha(number))
+
+        # Deserialize the headers of the commit file, up to the blank line before the message
+        commit_header = CommitHeader(commit_obj_file_contents)
+        parent_numbers = [self.commits.add(parent_sha_str)
+                          for parent_sha_str in commit_header.parents]
+        self.commits.set_parents(number, parent_numbers, commit_header.get_commit_time())
+        self.commits.set_details(number, commit_header)
+
+    def _get_commit_details(self, number):
+        """
+        Deserialize the author, committer, dates and message of the
+        given commit
+
+        Called the first time any of those details of a commit loaded
+        from git's commit-graph file is used.
+
+        :param number: The number of the commit to deserialize the
+            details of
+        """
+        commit_obj_file_contents = self._get_git_object_contents(self.commits.get_sha(number))
+        self.commits.set_details(number, CommitHeader(commit_obj_file_contents))
 
     def _get_git_object_contents(self, git_obj_sha):
         """
-         Return the decompressed contents of the git object with the
+         Return the decompressed bytes of the git object with the
          given SHA-1, or None if the object is not found
 
          Git objects are stored either loose or packed. Loose objects
@@ -237,175 +700,183 @@ class LocalRepository():
         loose_obj_path = os.path.join(self.path, PATH_TO_GIT_OBJECTS,
                                       git_obj.get_subdirectory_name(), git_obj.get_file_name())
 
-        # Get the decompressed contents of the git object with the given SHA-1
-        if os.path.exists(loose_obj_path):
-            # Object is loose, so just decompress it
-            git_obj_file = open(os.path.join(self.path, PATH_TO_GIT_OBJECTS,
-                                             git_obj.get_subdirectory_name(),
-                                             git_obj.get_file_name()), "rb")
-            git_obj_contents = git_obj_file.read()
-            git_obj_contents = zlib.decompress(git_obj_contents).decode()
-            git_obj_file.close()
-
-            # Log the decompressed object
-            app_logger.debug("Loose git object {0} contents:\n{1}"
-                             .format(git_obj_sha[:8], git_obj_contents))
-        elif os.path.exists(os.path.join(self.path, PATH_TO_PACKFILES)):
-            # Check for the object in the pack file
-            packfiles_path = os.path.join(self.path, PATH_TO_PACKFILES)
-            packfile_name = glob.glob(packfiles_path + "*.pack")[0]
-            packfile = open(packfile_name, "rb")
-
-            # Get the packfile version number
-            packfile.seek(4)
-            packfile_version = int.from_bytes(packfile.read(4), byteorder="big")
-            # Get the number of git objects in the packfile
-            packfile_numobjects = int.from_bytes(packfile.read(4), byteorder="big")
-
-            # Get the pack index file
-            packindex_filename = glob.glob(packfiles_path + "*.idx")[0]
-            packindex = open(packindex_filename, "rb")
-
-            # Use the index fanout table to find the range within the sha/offset table to search
-            lowerbound, upperbound = _get_fanout_range(git_obj_sha, packindex, packfile_version)
-
-            # Find the offset of git object within the pack file, if it exists
-            offset = _get_pack_offset_v2(git_obj_sha, packindex, lowerbound, upperbound,
-                                         packfile_numobjects)
-
-            if offset:  # Git object found in pack index
-                # Unpack the git object at the given offset
-                git_obj_contents = self._unpack_git_object_v2(packfile, offset, git_obj_sha)
-                app_logger.debug("Packed git object {0} contents:\n{1}"
-                                 .format(git_obj_sha[:8], git_obj_contents))
-            else:   # Git object not found in pack index
-                app_logger.error("Git object {0} not found".format(git_obj_sha[:10]))
-
-            # Close packfiles
-            packfile.close()
-            packindex.close()
-        else:   # Git object not found in git directory
-            # Make a last ditch effort to find the object via command line
-            git_terminal = GitTerminal(self.path)
-            git_obj_contents = git_terminal.show_git_objects_contents(git_obj_sha)
-            if git_obj_contents:
+        # Commit details may be loaded on the GUI thread while the history is still being loaded
+        # in the background, and pack files and the git terminal are not safe to share between
+        # threads
+        with self._object_lock:
+            # Get the decompressed contents of the git object with the given SHA-1
+            if os.path.exists(loose_obj_path):
+                # Object is loose, so just decompress it
+                git_obj_file = open(os.path.join(self.path, PATH_TO_GIT_OBJECTS,
+                                                 git_obj.get_subdirectory_name(),
+                                                 git_obj.get_file_name()), "rb")
+                git_obj_contents = git_obj_file.read()
+                git_obj_contents = zlib.decompress(git_obj_contents)
+                git_obj_file.close()
+                # Strip the "<type> <size>\0" header loose objects begin with
+                git_obj_contents = git_obj_contents[git_obj_contents.find(b"\0") + 1:]
+
                 # Log the decompressed object
                 app_logger.debug("Loose git object {0} contents:\n{1}"
                                  .format(git_obj_sha[:8], git_obj_contents))
-            else:   # Git object not found anywhere
-                app_logger.error("Git object {0} not found".format(git_obj_sha[:10]))
+            else:
+                # Find the pack file containing the object, if it is packed
+                packed_obj_location = self._get_packed_objects().find(git_obj_sha)
+                if packed_obj_location:
+                    # Object is packed, so unpack it from the pack file containing it
+                    pack, offset = packed_obj_location
+                    git_obj_contents = self._unpack_git_object_v2(pack, offset, git_obj_sha)
+                    app_logger.debug("Packed git object {0} contents:\n{1}"
+                                     .format(git_obj_sha[:8], git_obj_contents))
+                else:   # Git object not found in git directory
+                    # Make a last ditch effort to find the object via command line
+                    cat_file_obj = self._cat_file_object(git_obj_sha)
+                    if cat_file_obj:
+                        git_obj_contents = cat_file_obj[1]
+                        # Log the decompressed object
+                        app_logger.debug("Loose git object {0} contents:\n{1}"
+                                         .format(git_obj_sha[:8], git_obj_contents))
+                    else:   # Git object not found anywhere
+                        app_logger.error("Git object {0} not found".format(git_obj_sha[:10]))
 
         return git_obj_contents
 
-    def _unpack_git_object_v2(self, packfile, offset, git_obj_sha):
+    def _get_git_objects(self, git_obj_shas):
         """
-        Return the decompressed contents of the git object from the
-        pack file
+        Return a list containing a (type, contents) tuple for each of
+        the given git objects, or None for objects that are not found
 
-        :param packfile: The pack file for this local repo
-        :param offset: The offset of the git object in the pack file, in number of bytes from the
-            start of the file
-        :param git_obj_sha: The Sha1_ of the git object we're looking for
-        :return: A string with the decompressed contents of the git object
+        Packed objects are read in the order they appear in their pack
+        files, and any objects that cannot be read directly are read
+        through one "git cat-file --batch" process, so reading many
+        objects costs no more than one pass over the packs.
+
+        :param git_obj_shas: The SHA-1 hashes of the git objects
+        """
+        git_obj_shas = list(git_obj_shas)
+        git_objects = [None] * len(git_obj_shas)
+        packed_objects = self._get_packed_objects()
+        packed_locations = []
+        missing = []
+
+        with self._object_lock:
+            for i, git_obj_sha in enumerate(git_obj_shas):
+                packed_obj_location = packed_objects.find(git_obj_sha)
+                if packed_obj_location is not None:
+                    pack, offset = packed_obj_location
+                    packed_locations.append((pack.path, offset, pack, i))
+                    continue
+                git_obj = GitObject(git_obj_sha)
+                loose_obj_path = os.path.join(self.path, PATH_TO_GIT_OBJECTS,
+                                              git_obj.get_subdirectory_name(),
+                                              git_obj.get_file_name())
+                try:
+                    with open(loose_obj_path, "rb") as git_obj_file:
+                        git_obj_contents = zlib.decompress(git_obj_file.read())
+                except (OSError, zlib.error):
+                    missing.append(i)
+                    continue
+                # Split the "<type> <size>\0" header loose objects begin with from the contents
+                header_end = git_obj_contents.find(b"\0")
+                git_obj_type = git_obj_contents[:header_end].split(b" ")[0].decode("ascii")
+                git_objects[i] = (git_obj_type, git_obj_contents[header_end + 1:])
+
+            packed_locations.sort(key=lambda location: location[:2])
+            for _, offset, pack, i in packed_locations:
+                try:
+                    git_objects[i] = packed_objects.read_object_at(pack, offset)
+                except (zlib.error, ValueError, KeyError):
+                    missing.append(i)
+
+            if missing:
+                # Make a last ditch effort to find the objects via command line
+                for i, cat_file_obj in zip(missing, self._cat_file_objects(
+                        [git_obj_shas[i] for i in missing])):
+                    git_objects[i] = cat_file_obj
+
+        return git_objects
+
+    def _cat_file_object(self, git_obj_sha):
         """
+        Return a (type, contents) tuple for the given git object, read
+        through git cat-file, or None if it does not exist or could not
+        be read
 
-        # Move the file cursor to the beginning of the packed git object
-        packfile.seek(offset)
+        :param git_obj_sha: The Sha1_ of the git object
+        """
+        return self._cat_file_objects([git_obj_sha])[0]
 
-        # Scan past the object header
-        while (int.from_bytes(packfile.read(1), byteorder="big") & 0x80) != 0:
-            pass
+    def _cat_file_objects(self, git_obj_shas):
+        """
+        Return a list with a (type, contents) tuple for each of the given
+        git objects, read through git cat-file, with None for objects
+        that do not exist
+
+        If the git process dies, every object is reported as not found
+        (the process is started again by the next read).
 
-        # TODO: Calculate the size of the compressed object (default to 2kb for now - over is okay)
-        objsize = 2048
-        # Decompress the git object contents
+        :param git_obj_shas: The Sha1s_ of the git objects
+        """
         try:
-            objcontents = zlib.decompress(packfile.read(objsize)).decode()
-        except (zlib.error, UnicodeDecodeError):
-            git_term = GitTerminal(self.path)
-            objcontents = git_term.show_git_objects_contents(git_obj_sha)
+            return self.git_terminal.get_git_objects(git_obj_shas)
+        except OSError as error:
+            app_logger.error("Could not read git objects with git cat-file: {0}".format(error))
+            return [None] * len(git_obj_shas)
 
-        return objcontents
+    def _get_abbreviated_sha_index(self):
+        """
+        Return the AbbreviatedShaIndex_ of every object in this
+        repository, creating it on first use
+        """
+        if self._abbreviated_sha_index is None:
+            self._abbreviated_sha_index = AbbreviatedShaIndex(
+                os.path.join(self.path, PATH_TO_GIT_OBJECTS), self._get_packed_objects())
+        return self._abbreviated_sha_index
 
+    def _get_packed_objects(self):
+        """
+        Return the PackedObjectStore_ for this repository
 
-def _get_fanout_range(git_obj_sha, packindex, packindex_version):
-    """
-    Return the range within the sha/offset table to search
+        All pack files are indexed on first use, and reused for every
+        subsequent lookup.
+        """
+        if self._packed_objects is None:
+            self._packed_objects = PackedObjectStore(os.path.join(self.path, PATH_TO_PACKFILES))
+        return self._packed_objects
 
-    :param git_obj_sha: The Sha1_ of the git object to search for
-    :param packindex: The pack index file to search
-    :param packindex_version: The version of the pack index (currently 1 or 2)
-    :return: A tuple with the lower and upper bound to search for the given git object in the
-        pack index
-    """
+    def _unpack_git_object_v2(self, pack, offset, git_obj_sha):
+        """
+        Return the decompressed contents of the git object from the
+        pack file
 
-    if packindex_version == 1:
-        fanout_start = 0
-    else:
-        fanout_start = 8
-    sha_index = int(git_obj_sha[:2], 16)
-    fanout_index = fanout_start + ((sha_index - 1) * 4)
-    packindex.seek(fanout_index)
-    # Set the lower bound to the value at fanout[sha_index - 1] (e.g., if sha_index = 0x3c,
-    # the lower bound will be at fanout[0x3b])
-    if sha_index != 0x00:
-        lowerbound = int.from_bytes(packindex.read(4), byteorder="big")
-    else:
-        # Set the lower bound manually since there is no entry before fanout_table[0]
-        lowerbound = 0
-        packindex.seek(4, 1)
-    # The upper bound is given by the value at fanout_table[sha_index]
-    upperbound = int.from_bytes(packindex.read(4), byteorder="big")
-
-    return lowerbound, upperbound
-
-
-def _get_pack_offset_v2(git_obj_sha, packindex, low, high, size):
-    """
-    Return a tuple with the range of the given git object in the
-    packfile (version 2), in bytes, or None if the object is not found
+        Deltified objects are reconstructed from their delta chain in
+        process. The command line is only used if the packed object
+        cannot be decoded.
 
-    Uses a binary search, so it is O(log n) on average, where n is
-    the number of objects in the packfile with the same first two
-    characters in their SHA-1 identifier.
+        :param pack: The PackFile_ containing the git object
+        :param offset: The offset of the git object in the pack file, in number of bytes from the
+            start of the file
+        :param git_obj_sha: The Sha1_ of the git object we're looking for
+        :return: The decompressed bytes of the git object
+        """
 
-    See the `Git Community Book by Scott Chacon<http://schacon.github.io/gitbook/7_the_packfile.html>`_ or the `git
-    documentation<http://repo.or.cz/w/git.git/blob_plain/HEAD:/Documentation/technical/pack-format.txt>`_ for detailed information on the data format of
-    packfiles.
+        try:
+            objtype, objcontents = self._get_packed_objects().read_object_at(pack, offset)
+        except (zlib.error, ValueError, KeyError):
+            cat_file_obj = self._cat_file_object(git_obj_sha)
+            objcontents = cat_file_obj[1] if cat_file_obj else None
 
+        return objcontents
 
 
-    :param git_obj_sha: The Sha1_ identifier of the git object
-        we're looking for
-    :param packindex:
-    :param low:
-    :param high:
-    :param size: The total number of git objects stored in the
-        packfile
+def _get_date(time):
     """
+    Return the local date and time for the given time, or None if it is
+    out of range
 
-    # Each entry in the sha table is a SHA-1 (20 bytes)
-    sha_size = 20
-    # Each entry in the offset table is a 4 byte integer
-    offset_size = 4
-    #  The sha table begins after the header (2 * 4 bytes) and fanout table (256 * 4 bytes)
-    sha_table_start = 1032
-    # The offset table begins after the sha table (size * 20 bytes) and the crc checksum table
-    # (size * 4 bytes)
-    offset_table_start = sha_table_start + (size * 24)
-
-    # Use a binary search to find the sha and it's offset in the packfile
-    while low <= high:
-        mid = (low + high) // 2
-        # Check the given sha against the sha at sha_table[mid]
-        packindex.seek(sha_table_start + (mid * sha_size))
-        mid_sha = Sha1(binascii.hexlify(packindex.read(sha_size)).decode())
-        if mid_sha < git_obj_sha:
-            low = mid + 1
-        elif mid_sha > git_obj_sha:
-            high = mid - 1
-        else:   # We've found the matching sha
-            # Get the offset of the object in the pack file at offset_table[mid]
-            packindex.seek(offset_table_start + (mid * offset_size))
-            return int.from_bytes(packindex.read(offset_size), byteorder="big")
-    return None
+    :param time: A number of seconds since the epoch
+    """
+    try:
+        return datetime.fromtimestamp(time)
+    except (OverflowError, OSError, ValueError):
+        return None
@@ -0,0 +1,327 @@
+import binascii
+import mmap
+import zlib
+
+from git.PackIndex import PackIndex
+
+# Packed object types, as encoded in the packed object header
+OBJ_COMMIT = 1
+OBJ_TREE = 2
+OBJ_BLOB = 3
+OBJ_TAG = 4
+OBJ_OFS_DELTA = 6
+OBJ_REF_DELTA = 7
+
+OBJECT_TYPE_NAMES = {
+    OBJ_COMMIT: "commit",
+    OBJ_TREE: "tree",
+    OBJ_BLOB: "blob",
+    OBJ_TAG: "tag",
+}
+
+# Deflate adds at most a few bytes per block and a small header and trailer to stored data, so
+# this much slack past the inflated size almost always covers the whole compressed stream
+DEFLATE_OVERHEAD = 64
+
+
+class PackFile():
+    """
+    .. _PackFile:
+
+    A git pack file (.pack) and its pack index (.idx)
+
+    Git compresses loose objects into pack files when a repository
+    grows too large, or garbage collection is run. Every pack file is
+    accompanied by a pack index with the same name, which maps the
+    SHA-1 of each packed object to its offset in the pack file.
+
+    Each packed object begins with a header encoding its type and
+    inflated size, followed by its zlib-compressed data. Objects may be
+    stored whole, or as a delta against a base object, identified
+    either by its offset earlier in the pack (OFS_DELTA) or by its
+    SHA-1 (REF_DELTA). See the `git documentation <https://git-scm.com/docs/pack-format>`_
+    for detailed information on the data format of pack files.
+
+    Attributes:
+        path: A string representing the absolute path to the .pack
+            file.
+        index: The PackIndex_ of this pack file.
+        delta_base_cache: The DeltaBaseCache_ used to store delta bases
+            reconstructed from this pack, or None to disable caching.
+    """
+
+    def __init__(self, path, index, delta_base_cache=None):
+        """Constructor"""
+        self.path = path
+        self.index = index
+        self.delta_base_cache = delta_base_cache
+        self._map = None
+
+    @classmethod
+    def from_index_path(cls, index_path, delta_base_cache=None):
+        """
+        Return the PackFile accompanying the pack index at the given
+        path
+
+        :param index_path: The absolute path to a .idx file
+        :param delta_base_cache: The DeltaBaseCache_ to store delta
+            bases in, if any
+        """
+        return cls(index_path[:-len(".idx")] + ".pack", PackIndex(index_path), delta_base_cache)
+
+    def read_object(self, offset, resolve_ref_delta_base=None):
+        """
+        Return a tuple with the type name (e.g., "commit") and the
+        inflated contents of the packed object at the given offset
+
+        Delta chains are followed iteratively down to their base object
+        (or to the nearest base found in the delta base cache), and the
+        deltas are then applied in order from the base up. Every base
+        reconstructed along the way is cached.
+
+        :param offset: The offset of the object in the pack file, in
+            number of bytes from the start of the file
+        :param resolve_ref_delta_base: A function taking a Sha1_ (or
+            raw 20-byte SHA-1) and returning the (type name, contents)
+            of a REF_DELTA base object that is not in this pack
+        """
+
+        cache = self.delta_base_cache
+
+        # Offsets of each delta object and its compressed delta data, from the outermost delta to
+        # the innermost
+        delta_chain = []
+
+        # Follow the delta chain until we reach a whole (or cached) object
+        while True:
+            if cache is not None and delta_chain:
+                cached_base = cache.get((self.path, offset))
+                if cached_base is not None:
+                    base_type_name, obj_contents = cached_base
+                    break
+            obj_type, obj_size, data_offset = self._read_object_header(offset)
+            if obj_type == OBJ_OFS_DELTA:
+                base_offset, data_offset = self._read_base_offset(data_offset)
+                delta_chain.append((offset, data_offset, obj_size))
+                offset = offset - base_offset
+            elif obj_type == OBJ_REF_DELTA:
+                base_sha = self._get_map()[data_offset:data_offset + 20]
+                delta_chain.append((offset, data_offset + 20, obj_size))
+                base_position = self.index.find_position(base_sha)
+                if base_position is not None:
+                    offset = self.index.get_offset(base_position)
+                elif resolve_ref_delta_base is not None:
+                    base_type_name, obj_contents = resolve_ref_delta_base(base_sha)
+                    break
+                else:
+                    raise KeyError("Delta base {0} not found in {1}"
+                                   .format(binascii.hexlify(base_sha).decode(), self.path))
+            elif obj_type in OBJECT_TYPE_NAMES:
+                base_type_name = OBJECT_TYPE_NAMES[obj_type]
+                obj_contents = self._inflate(data_offset, obj_size)
+                if cache is not None and delta_chain:
+                    cache.put((self.path, offset), base_type_name, obj_contents)
+                break
+            else:
+                raise ValueError("Invalid packed object type {0} at offset {1} in {2}"
+                                 .format(obj_type, offset, self.path))
+
+        # Apply each delta, starting with the one closest to the base object, caching each
+        # intermediate object as it is the base of the next delta
+        for i in range(len(delta_chain) - 1, -1, -1):
+            delta_offset, data_offset, delta_size = delta_chain[i]
+            obj_contents = _apply_delta(obj_contents, self._inflate(data_offset, delta_size))
+            if cache is not None and i:
+                cache.put((self.path, delta_offset), base_type_name, obj_contents)
+
+        return base_type_name, obj_contents
+
+    def close(self):
+        """
+        Release the resources held by this pack file
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self.index.close()
+
+    def _get_map(self):
+        """
+        Return the memory mapping of this pack file
+
+        The pack file is mapped on first use, and the mapping is shared
+        by every subsequent read.
+        """
+        if self._map is None:
+            with open(self.path, "rb") as packfile:
+                self._map = mmap.mmap(packfile.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _read_object_header(self, offset):
+        """
+        Return a tuple with the type, the inflated size, and the offset
+        of the data of the packed object at the given offset
+
+        The header is a variable-length integer: the first byte holds
+        the type in bits 4-6 and the lowest four bits of the size, and
+        each following byte holds seven more bits of the size. The most
+        significant bit of each byte is set if another byte follows.
+
+        :param offset: The offset of the packed object
+        """
+        packmap = self._get_map()
+        byte = packmap[offset]
+        obj_type = (byte >> 4) & 0x07
+        obj_size = byte & 0x0f
+        shift = 4
+        offset += 1
+        while byte & 0x80:
+            byte = packmap[offset]
+            obj_size |= (byte & 0x7f) << shift
+            shift += 7
+            offset += 1
+        return obj_type, obj_size, offset
+
+    def _read_base_offset(self, offset):
+        """
+        Return a tuple with the (negative) relative offset of an
+        OFS_DELTA object's base, and the offset of the delta data
+
+        The base offset is a big-endian variable-length integer, where
+        one is added to each group of seven bits before the next is
+        appended, so that every value has only one encoding.
+
+        :param offset: The offset just past the packed object header
+        """
+        packmap = self._get_map()
+        byte = packmap[offset]
+        base_offset = byte & 0x7f
+        offset += 1
+        while byte & 0x80:
+            byte = packmap[offset]
+            base_offset = ((base_offset + 1) << 7) | (byte & 0x7f)
+            offset += 1
+        return base_offset, offset
+
+    def _inflate(self, offset, size):
+        """
+        Return the inflated contents of the zlib stream at the given
+        offset in the pack file
+
+        The size recorded in the packed object header bounds both the
+        compressed input fed to zlib and the output it may produce, so
+        each object is inflated in (almost always) a single step, reading
+        no more of the pack than its own data.
+
+        :param offset: The offset of the compressed data
+        :param size: The inflated size of the data, from the packed
+            object header
+        """
+        packmap = self._get_map()
+        decompressor = zlib.decompressobj()
+        chunks = []
+        inflated_size = 0
+        chunk_size = size + DEFLATE_OVERHEAD
+        while not decompressor.eof:
+            compressed = packmap[offset:offset + chunk_size]
+            if not compressed:
+                raise zlib.error("Truncated object data at offset {0} in {1}"
+                                 .format(offset, self.path))
+            chunk = decompressor.decompress(compressed, size + 1 - inflated_size)
+            if decompressor.unconsumed_tail:
+                # The output limit was reached before the input ran out
+                raise zlib.error("Object data at offset {0} in {1} inflates past {2} bytes"
+                                 .format(offset, self.path, size))
+            chunks.append(chunk)
+            inflated_size += len(chunk)
+            offset += len(compressed)
+            chunk_size = DEFLATE_OVERHEAD + size - inflated_size
+        if inflated_size != size:
+            raise zlib.error("Inflated {0} bytes where {1} were expected in {2}"
+                             .format(inflated_size, size, self.path))
+        return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+    def __str__(self):
+        """
+        Return a string representation of this pack file
+        """
+        return "PackFile({0})".format(self.path)
+
+
+def _read_delta_size(delta, i):
+    """
+    Return a tuple with the size encoded at the given position in a
+    delta, and the position following it
+
+    Sizes in a delta are little-endian variable-length integers with
+    seven bits per byte, and the most significant bit of each byte set
+    if another byte follows.
+
+    :param delta: The inflated delta data
+    :param i: The position of the encoded size
+    """
+    size = 0
+    shift = 0
+    while True:
+        byte = delta[i]
+        i += 1
+        size |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return size, i
+
+
+def _apply_delta(base, delta):
+    """
+    Return the object reconstructed by applying a delta to its base
+
+    A delta begins with the sizes of the base and of the resulting
+    object, followed by a series of instructions. An instruction with
+    its most significant bit set copies a range of the base object: its
+    low four bits flag which offset bytes follow, and the next three
+    bits flag which size bytes follow (a size of 0 means 0x10000). Any
+    other non-zero instruction inserts that many literal bytes from the
+    delta.
+
+    :param base: The inflated contents of the base object
+    :param delta: The inflated delta data
+    """
+    base_size, i = _read_delta_size(delta, 0)
+    if base_size != len(base):
+        raise ValueError("Delta base is {0} bytes, but {1} were expected"
+                         .format(len(base), base_size))
+    result_size, i = _read_delta_size(delta, i)
+
+    result = bytearray()
+    delta_size = len(delta)
+    while i < delta_size:
+        instruction = delta[i]
+        i += 1
+        if instruction & 0x80:
+            # Copy a range of the base object
+            copy_offset = 0
+            for shift in (0, 8, 16, 24):
+                if instruction & 0x01:
+                    copy_offset |= delta[i] << shift
+                    i += 1
+                instruction >>= 1
+            copy_size = 0
+            for shift in (0, 8, 16):
+                if instruction & 0x01:
+                    copy_size |= delta[i] << shift
+                    i += 1
+                instruction >>= 1
+            if copy_size == 0:
+                copy_size = 0x10000
+            result += base[copy_offset:copy_offset + copy_size]
+        elif instruction:
+            # Insert the literal bytes that follow
+            result += delta[i:i + instruction]
+            i += instruction
+        else:
+            raise ValueError("Invalid delta instruction 0")
+
+    if len(result) != result_size:
+        raise ValueError("Delta produced {0} bytes, but {1} were expected"
+                         .format(len(result), result_size))
+    return bytes(result)
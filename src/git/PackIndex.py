@@ -0,0 +1,241 @@
+import binascii
+import mmap
+
+from git.Sha1 import Sha1
+
+# Pack index version 2 files begin with this magic number, followed by the version
+PACK_INDEX_V2_MAGIC = b"\377tOc"
+
+# Sizes (in bytes) of the tables found in a pack index
+FANOUT_TABLE_SIZE = 256 * 4
+SHA_SIZE = 20
+CRC_SIZE = 4
+OFFSET_SIZE = 4
+LARGE_OFFSET_SIZE = 8
+
+# Offsets in the 32-bit offset table with this bit set refer to the 64-bit offset table
+LARGE_OFFSET_FLAG = 0x80000000
+
+
+class PackIndex():
+    """
+    .. _PackIndex:
+
+    A memory-mapped index (.idx file) of the git objects stored in a
+    pack file
+
+    The pack index is mapped into memory once, when it is opened, and
+    all of its tables are exposed as zero-copy memoryviews over that
+    mapping, so looking up an object never seeks or re-reads the file.
+
+    A version 2 pack index is laid out as follows::
+
+        header          4-byte magic number and 4-byte version
+        fanout table    256 4-byte entries; entry n is the number of
+                        objects whose SHA-1 begins with a byte <= n
+        sha table       num_objects sorted 20-byte SHA-1s
+        crc table       num_objects 4-byte CRC32s of the packed objects
+        offset table    num_objects 4-byte pack file offsets
+        large offsets   8-byte offsets for packs larger than 2 GB
+        trailer         20-byte pack checksum and 20-byte index checksum
+
+    A version 1 pack index has no header, and follows the fanout table
+    with num_objects 24-byte entries, each a 4-byte offset followed by
+    a SHA-1. Version 1 indexes have no crc or large offset tables.
+
+    See the `git documentation <https://git-scm.com/docs/pack-format>`_
+    for detailed information on the data format of pack indexes.
+
+    Attributes:
+        path: A string representing the absolute path to the .idx file.
+        version: The version of the pack index (1 or 2).
+        num_objects: The number of git objects in the pack.
+        fanout_table: A memoryview of the fanout table.
+        sha_table: A memoryview of the sorted SHA-1 table (version 2),
+            or of the combined offset/SHA-1 entries (version 1).
+        crc_table: A memoryview of the CRC32 table, or None.
+        offset_table: A memoryview of the 32-bit offset table, or None.
+        large_offset_table: A memoryview of the 64-bit offset table, or
+            None.
+        pack_checksum: The 20-byte SHA-1 checksum of the matching pack
+            file.
+    """
+
+    def __init__(self, path):
+        """Constructor"""
+        self.path = path
+        with open(path, "rb") as packindex:
+            self._map = mmap.mmap(packindex.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+
+        if self._map[:4] == PACK_INDEX_V2_MAGIC:
+            self.version = int.from_bytes(self._map[4:8], byteorder="big")
+            fanout_start = 8
+        else:
+            self.version = 1
+            fanout_start = 0
+
+        self.fanout_table = self._view[fanout_start:fanout_start + FANOUT_TABLE_SIZE]
+        self.num_objects = self._get_fanout_entry(255)
+        tables_start = fanout_start + FANOUT_TABLE_SIZE
+
+        if self.version == 1:
+            self.sha_table = self._view[tables_start:
+                                        tables_start + self.num_objects * (OFFSET_SIZE + SHA_SIZE)]
+            self.crc_table = None
+            self.offset_table = None
+            self.large_offset_table = None
+        else:
+            crc_start = tables_start + self.num_objects * SHA_SIZE
+            offset_start = crc_start + self.num_objects * CRC_SIZE
+            large_offset_start = offset_start + self.num_objects * OFFSET_SIZE
+            large_offset_end = len(self._map) - 2 * SHA_SIZE
+            self.sha_table = self._view[tables_start:crc_start]
+            self.crc_table = self._view[crc_start:offset_start]
+            self.offset_table = self._view[offset_start:large_offset_start]
+            self.large_offset_table = self._view[large_offset_start:large_offset_end]
+
+        self.pack_checksum = bytes(self._view[-2 * SHA_SIZE:-SHA_SIZE])
+
+    def lookup(self, sha):
+        """
+        Return the offset of the git object with the given SHA-1 in the
+        pack file, or None if the object is not in this pack
+
+        :param sha: The Sha1_ (or hex string, or 20 raw bytes) of the
+            git object to look up
+        """
+        position = self.find_position(sha)
+        if position is None:
+            return None
+        return self.get_offset(position)
+
+    def find_position(self, sha):
+        """
+        Return the position of the given SHA-1 in the sha table, or None
+        if the object is not in this pack
+
+        :param sha: The Sha1_ (or hex string, or 20 raw bytes) of the
+            git object to look up
+        """
+        binsha = to_binary_sha(sha)
+        position = self.bisect(binsha)
+        if position < self.num_objects and self.get_sha(position) == binsha:
+            return position
+        return None
+
+    def bisect(self, binsha):
+        """
+        Return the position of the first SHA-1 in the sha table that is
+        not less than the given one (which may be a prefix)
+
+        Uses the fanout table to narrow the search to objects sharing
+        the first byte of the SHA-1, then binary searches the sha table.
+
+        :param binsha: The raw bytes of a SHA-1, or of the start of one
+        """
+        first_byte = binsha[0]
+        low = self._get_fanout_entry(first_byte - 1) if first_byte else 0
+        high = self._get_fanout_entry(first_byte)
+
+        while low < high:
+            mid = (low + high) // 2
+            if self.get_sha(mid) < binsha:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def get_sha(self, position):
+        """
+        Return the raw 20-byte SHA-1 at the given position in the sha
+        table
+
+        :param position: The index of the entry in the sha table
+        """
+        if self.version == 1:
+            start = position * (OFFSET_SIZE + SHA_SIZE) + OFFSET_SIZE
+        else:
+            start = position * SHA_SIZE
+        return bytes(self.sha_table[start:start + SHA_SIZE])
+
+    def get_offset(self, position):
+        """
+        Return the pack file offset of the object at the given position
+        in the sha table
+
+        :param position: The index of the entry in the sha table
+        """
+        if self.version == 1:
+            start = position * (OFFSET_SIZE + SHA_SIZE)
+            return int.from_bytes(self.sha_table[start:start + OFFSET_SIZE], byteorder="big")
+
+        start = position * OFFSET_SIZE
+        offset = int.from_bytes(self.offset_table[start:start + OFFSET_SIZE], byteorder="big")
+        if offset & LARGE_OFFSET_FLAG:
+            # The remaining bits index into the table of 64-bit offsets
+            start = (offset & ~LARGE_OFFSET_FLAG) * LARGE_OFFSET_SIZE
+            offset = int.from_bytes(self.large_offset_table[start:start + LARGE_OFFSET_SIZE],
+                                    byteorder="big")
+        return offset
+
+    def get_crc32(self, position):
+        """
+        Return the CRC32 of the packed object at the given position in
+        the sha table, or None for version 1 indexes
+
+        :param position: The index of the entry in the sha table
+        """
+        if self.crc_table is None:
+            return None
+        start = position * CRC_SIZE
+        return int.from_bytes(self.crc_table[start:start + CRC_SIZE], byteorder="big")
+
+    def close(self):
+        """
+        Release the memory mapping of this pack index
+        """
+        self.fanout_table.release()
+        self.sha_table.release()
+        for table in (self.crc_table, self.offset_table, self.large_offset_table):
+            if table is not None:
+                table.release()
+        self._view.release()
+        self._map.close()
+
+    def _get_fanout_entry(self, index):
+        """
+        Return the value of the fanout table at the given index
+
+        :param index: The first byte of a SHA-1 (0 - 255)
+        """
+        start = index * 4
+        return int.from_bytes(self.fanout_table[start:start + 4], byteorder="big")
+
+    def __len__(self):
+        """
+        Return the number of git objects in this pack index
+        """
+        return self.num_objects
+
+    def __contains__(self, sha):
+        """
+        Return True if the git object with the given SHA-1 is in this
+        pack
+
+        :param sha: The Sha1_ of the git object
+        """
+        return self.find_position(sha) is not None
+
+
+def to_binary_sha(sha):
+    """
+    Return the raw 20-byte form of the given SHA-1
+
+    :param sha: A Sha1_, 40-character hex string, or 20 raw bytes
+    """
+    if isinstance(sha, Sha1):
+        return sha.binsha
+    if isinstance(sha, (bytes, bytearray, memoryview)):
+        return bytes(sha)
+    return binascii.unhexlify(sha.strip())
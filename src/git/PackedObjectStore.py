@@ -0,0 +1,147 @@
+import binascii
+import glob
+import os
+
+from git.DeltaBaseCache import DeltaBaseCache
+from git.PackFile import PackFile
+
+
+class PackedObjectStore():
+    """
+    .. _PackedObjectStore:
+
+    All of the pack files in a local repository
+
+    A repository accumulates several pack files over time (each
+    incremental fetch typically adds one), and any object may live in
+    any of them. Every .pack/.idx pair is indexed once, when the store
+    is opened, and each lookup is routed to the pack that contains the
+    object.
+
+    Packs are probed in most-recently-hit order, so that the packs
+    holding the objects currently being read (typically the history
+    being walked) are checked first.
+
+    Attributes:
+        path: A string representing the absolute path to the
+            .git/objects/pack/ directory.
+        packs: A list of PackFiles_, most recently hit first.
+        delta_base_cache: The DeltaBaseCache_ shared by every pack in
+            this store.
+    """
+
+    def __init__(self, path, delta_base_cache=None):
+        """Constructor"""
+        self.path = path
+        self.packs = []
+        self.delta_base_cache = (delta_base_cache if delta_base_cache is not None
+                                 else DeltaBaseCache())
+        self.refresh()
+
+    def refresh(self):
+        """
+        Open any pack files added to the directory since the store was
+        opened (e.g., by a fetch), and close any that have been removed
+        (e.g., by a repack)
+
+        Packs that are still present are kept open, with their indexes.
+        """
+        pack_paths = set()
+        for packindex_filename in sorted(glob.glob(os.path.join(self.path, "*.idx"))):
+            # Ignore indexes whose pack file is missing (e.g., mid-repack)
+            pack_path = packindex_filename[:-len(".idx")] + ".pack"
+            if os.path.exists(pack_path):
+                pack_paths.add(pack_path)
+
+        open_packs = []
+        for pack in self.packs:
+            if pack.path in pack_paths:
+                open_packs.append(pack)
+                pack_paths.discard(pack.path)
+            else:
+                pack.close()
+        for pack_path in sorted(pack_paths):
+            open_packs.append(PackFile.from_index_path(pack_path[:-len(".pack")] + ".idx",
+                                                       self.delta_base_cache))
+        self.packs = open_packs
+
+    def find(self, sha):
+        """
+        Return a tuple with the PackFile_ containing the git object
+        with the given SHA-1 and the object's offset within it, or None
+        if the object is not in any pack
+
+        :param sha: The Sha1_ of the git object to find
+        """
+        for i, pack in enumerate(self.packs):
+            offset = pack.index.lookup(sha)
+            if offset is not None:
+                # Move the hit pack to the front so it is probed first next time
+                if i:
+                    del self.packs[i]
+                    self.packs.insert(0, pack)
+                return pack, offset
+        return None
+
+    def read_object(self, sha):
+        """
+        Return a tuple with the type name (e.g., "commit") and the
+        inflated contents of the git object with the given SHA-1, or
+        None if the object is not in any pack
+
+        :param sha: The Sha1_ of the git object to read
+        """
+        packed_obj_location = self.find(sha)
+        if packed_obj_location is None:
+            return None
+        pack, offset = packed_obj_location
+        return self.read_object_at(pack, offset)
+
+    def read_object_at(self, pack, offset):
+        """
+        Return a tuple with the type name and the inflated contents of
+        the object at the given offset in one of this store's packs
+
+        REF_DELTA bases missing from the object's own pack are looked up
+        in the other packs of this store.
+
+        :param pack: The PackFile_ containing the object
+        :param offset: The offset of the object in the pack file
+        """
+        return pack.read_object(offset, self._read_ref_delta_base)
+
+    def _read_ref_delta_base(self, sha):
+        """
+        Return the type name and contents of a REF_DELTA base object
+        that lives outside the pack of the delta referring to it
+
+        :param sha: The raw 20-byte SHA-1 of the base object
+        """
+        base = self.read_object(sha)
+        if base is None:
+            raise KeyError("Delta base {0} not found in any pack".format(binascii.hexlify(sha).decode()))
+        return base
+
+    def close(self):
+        """
+        Release the resources held by every pack in this store
+        """
+        for pack in self.packs:
+            pack.close()
+        self.packs = []
+        self.delta_base_cache.clear()
+
+    def __len__(self):
+        """
+        Return the number of packs in this store
+        """
+        return len(self.packs)
+
+    def __contains__(self, sha):
+        """
+        Return True if the git object with the given SHA-1 is in any
+        pack in this store
+
+        :param sha: The Sha1_ of the git object
+        """
+        return any(sha in pack.index for pack in self.packs)
@@ -0,0 +1,296 @@
+import os
+import string
+import time
+
+# Prefixes of the names of each kind of ref
+PREFIX_REFS = "refs/"
+PREFIX_BRANCHES = "refs/heads/"
+PREFIX_TAGS = "refs/tags/"
+
+HEAD = "HEAD"
+PACKED_REFS = "packed-refs"
+
+# The first line of packed-refs lists its traits, which tell which refs have their peeled object
+# recorded
+PACKED_REFS_HEADER = "# pack-refs with:"
+PACKED_REFS_PEELED = "peeled"
+PACKED_REFS_FULLY_PEELED = "fully-peeled"
+
+# Symbolic refs (like HEAD) hold the name of another ref after this prefix
+SYMBOLIC_REF_PREFIX = "ref: "
+# Git gives up resolving symbolic refs that point to symbolic refs beyond this depth
+MAX_SYMBOLIC_REF_DEPTH = 5
+
+# A directory modified less than this long (in nanoseconds) before it was read may have been
+# modified again within the same timestamp, so it is read again next time (see "racy git")
+RACY_INTERVAL_NS = 1000000000
+
+SHA_HEX_LENGTH = 40
+HEX_DIGITS = frozenset(string.hexdigits)
+
+
+class RefDatabase():
+    """
+    .. _RefDatabase:
+
+    The refs (branches, tags, HEAD, etc.) of a repository
+
+    Git stores each ref either loose, as a file under .git/refs/ named
+    after the ref (so namespaced refs like refs/heads/feature/foo are
+    in subdirectories) holding the SHA-1 it points to, or packed, as a
+    line of .git/packed-refs. Loose refs take precedence over packed
+    ones. After "git gc", most refs are packed, in the form::
+
+        # pack-refs with: peeled fully-peeled sorted
+        a6407f4a8a2bef57ed84d4853a89e940f2834c11 refs/heads/master
+        db5920fe02784ac83b2fe829a172383bb48c3027 refs/tags/v1.0
+        ^2bddce7d093dfc7ce7911b5e8ae4ccbdf048b7d3
+
+    where a line beginning with "^" holds the commit the annotated tag
+    above it peels to. A symbolic ref, like HEAD usually is, holds
+    "ref: " and the name of the ref it points to.
+
+    The packed-refs file is only parsed again when its modification
+    time or size changes, and each directory of loose refs is only
+    read again when its modification time changes (git always writes
+    refs by renaming a new file into place, which updates it), so
+    listing thousands of refs again costs one stat per directory. As in
+    git's handling of "racy" index entries, a directory that was
+    modified within RACY_INTERVAL_NS of being read is not trusted, and
+    is read again the next time, since a ref written within the same
+    timestamp would not change its modification time.
+
+    Attributes:
+        path_to_git_dir: A string representing the absolute path to the
+            repository's .git/ directory.
+    """
+
+    def __init__(self, path_to_git_dir):
+        """Constructor"""
+        self.path_to_git_dir = path_to_git_dir
+        self._packed_refs_key = None
+        self._packed_refs = {}
+        self._peeled_refs = {}
+        self._packed_traits = frozenset()
+        self._loose_ref_dirs = {}
+        self._raw_refs_key = None
+        self._raw_refs = {}
+        self._resolved_refs = {}
+
+    def get_refs(self, prefix=PREFIX_REFS):
+        """
+        Return a dict of the names of every ref beginning with the given
+        prefix to the 40-character hex SHA-1 each points to, in order of
+        their names
+
+        Symbolic refs are resolved, and refs that cannot be resolved are
+        left out.
+
+        :param prefix: The beginning of the names of the refs to return
+            (e.g., "refs/heads/" for branches)
+        """
+        raw_refs = self._get_raw_refs()
+        refs = self._resolved_refs.get(prefix)
+        if refs is None:
+            refs = {}
+            for ref_name in sorted(raw_refs):
+                if ref_name.startswith(prefix):
+                    sha = self._resolve_raw(raw_refs, raw_refs[ref_name])
+                    if sha is not None:
+                        refs[ref_name] = sha
+            self._resolved_refs[prefix] = refs
+        return dict(refs)
+
+    def resolve(self, ref_name):
+        """
+        Return the 40-character hex SHA-1 the given ref (e.g., "HEAD" or
+        "refs/heads/master") points to, following symbolic refs, or None
+        if it does not exist
+
+        :param ref_name: The full name of the ref
+        """
+        raw_refs = self._get_raw_refs()
+        value = self._read_raw_ref(ref_name, raw_refs)
+        return self._resolve_raw(raw_refs, value) if value is not None else None
+
+    def get_symbolic_ref(self, ref_name):
+        """
+        Return the name of the ref the given symbolic ref points to
+        (e.g., "refs/heads/master" for HEAD), or None if it is not a
+        symbolic ref (e.g., HEAD is detached)
+
+        :param ref_name: The full name of the ref
+        """
+        value = self._read_raw_ref(ref_name, self._get_raw_refs())
+        if value is not None and value.startswith(SYMBOLIC_REF_PREFIX):
+            return value[len(SYMBOLIC_REF_PREFIX):].strip()
+        return None
+
+    def get_peeled_refs(self, prefix=PREFIX_TAGS):
+        """
+        Return a dict of the names of the refs beginning with the given
+        prefix whose peeled object packed-refs records, to the
+        40-character hex SHA-1 of the object each annotated tag peels
+        to, or None for refs known to point directly to a commit (or
+        other object that is not a tag)
+
+        Refs that are not packed, or have been rewritten since they were
+        packed, are left out, as what they peel to is not known.
+
+        :param prefix: The beginning of the names of the refs
+        """
+        raw_refs = self._get_raw_refs()
+        peeled_refs = {}
+        for ref_name, sha in self._packed_refs.items():
+            if not ref_name.startswith(prefix) or raw_refs.get(ref_name) != sha:
+                continue
+            if ref_name in self._peeled_refs:
+                peeled_refs[ref_name] = self._peeled_refs[ref_name]
+            elif PACKED_REFS_FULLY_PEELED in self._packed_traits or (
+                    PACKED_REFS_PEELED in self._packed_traits and ref_name.startswith(PREFIX_TAGS)):
+                # Older versions of git only peeled tags
+                peeled_refs[ref_name] = None
+        return peeled_refs
+
+    def _read_raw_ref(self, ref_name, raw_refs):
+        """
+        Return the raw value of the given ref, which may be outside
+        refs/ (e.g., HEAD), or None if it does not exist
+
+        :param ref_name: The full name of the ref
+        :param raw_refs: The raw values of every ref under refs/
+        """
+        if ref_name in raw_refs:
+            return raw_refs[ref_name]
+        try:
+            with open(os.path.join(self.path_to_git_dir, ref_name)) as ref_file:
+                return ref_file.read().strip()
+        except (OSError, ValueError):
+            return None
+
+    def _resolve_raw(self, raw_refs, value):
+        """
+        Return the SHA-1 the given raw ref value resolves to, following
+        symbolic refs, or None if it cannot be resolved
+
+        :param raw_refs: The raw values of every ref under refs/
+        :param value: The raw value of a ref
+        """
+        for _ in range(MAX_SYMBOLIC_REF_DEPTH):
+            if not value.startswith(SYMBOLIC_REF_PREFIX):
+                break
+            value = self._read_raw_ref(value[len(SYMBOLIC_REF_PREFIX):].strip(), raw_refs)
+            if value is None:
+                return None
+        if len(value) == SHA_HEX_LENGTH and HEX_DIGITS.issuperset(value):
+            return value.lower()
+        return None
+
+    def _get_raw_refs(self):
+        """
+        Return a dict of the name of every ref under refs/ to its raw
+        value (a SHA-1, or "ref: " and the name of another ref)
+
+        The dict is only built again (and the refs resolved by get_refs
+        are only forgotten) when packed-refs or a directory of loose
+        refs has changed.
+        """
+        packed_refs = self._get_packed_refs()
+        loose_refs = {}
+        modified_times = []
+        self._read_loose_ref_dir(os.path.join(self.path_to_git_dir, "refs"), PREFIX_REFS,
+                                 loose_refs, modified_times)
+        key = (self._packed_refs_key, tuple(modified_times))
+        if key != self._raw_refs_key:
+            # Loose refs take precedence over packed ones
+            raw_refs = dict(packed_refs)
+            raw_refs.update(loose_refs)
+            self._raw_refs = raw_refs
+            self._resolved_refs = {}
+            self._raw_refs_key = key
+        return self._raw_refs
+
+    def _get_packed_refs(self):
+        """
+        Return a dict of the name of every packed ref to its SHA-1,
+        parsing packed-refs if it has changed since it was last parsed
+        """
+        path = os.path.join(self.path_to_git_dir, PACKED_REFS)
+        try:
+            stat = os.stat(path)
+            key = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            key = None
+        if key != self._packed_refs_key:
+            packed_refs = {}
+            peeled_refs = {}
+            traits = frozenset()
+            if key is not None:
+                with open(path) as packed_refs_file:
+                    ref_name = None
+                    for line in packed_refs_file:
+                        if line.startswith("^"):
+                            # The object the annotated tag on the previous line peels to
+                            if ref_name is not None:
+                                peeled_refs[ref_name] = line[1:].strip()
+                        elif line.startswith(PACKED_REFS_HEADER):
+                            traits = frozenset(line[len(PACKED_REFS_HEADER):].split())
+                        elif not line.startswith("#"):
+                            sha, _, ref_name = line.strip().partition(" ")
+                            if ref_name:
+                                packed_refs[ref_name] = sha
+                            else:
+                                ref_name = None
+            self._packed_refs = packed_refs
+            self._peeled_refs = peeled_refs
+            self._packed_traits = traits
+            self._packed_refs_key = key
+        return self._packed_refs
+
+    def _read_loose_ref_dir(self, path, prefix, raw_refs, modified_times):
+        """
+        Add the raw value of every loose ref in the given directory (and
+        its subdirectories) to the given dict, reading only the
+        directories that have changed since they were last read
+
+        :param path: The absolute path to a directory under .git/refs/
+        :param prefix: The ref name prefix of the refs in the directory
+        :param raw_refs: The dict of ref names to raw values to update
+        :param modified_times: The list to append the path,
+            modification time and time last read of each directory to
+        """
+        try:
+            modified_time = os.stat(path).st_mtime_ns
+        except OSError:
+            self._loose_ref_dirs.pop(path, None)
+            return
+        cached = self._loose_ref_dirs.get(path)
+        if (cached is None or cached[0] != modified_time or
+                modified_time + RACY_INTERVAL_NS >= cached[1]):
+            # Read the directory, recording None for each subdirectory
+            read_time = time.time_ns()
+            entries = {}
+            with os.scandir(path) as directory:
+                for entry in directory:
+                    if entry.name.endswith(".lock"):
+                        # A ref being written
+                        continue
+                    if entry.is_dir():
+                        entries[entry.name] = None
+                    else:
+                        try:
+                            with open(entry.path) as ref_file:
+                                entries[entry.name] = ref_file.read().strip()
+                        except (OSError, ValueError):
+                            continue
+            cached = (modified_time, read_time, entries)
+            self._loose_ref_dirs[path] = cached
+        # Racy directories are read again each time, so the time each was read is part of the key
+        modified_times.append((path, modified_time, cached[1]))
+
+        for name, value in cached[2].items():
+            if value is None:
+                self._read_loose_ref_dir(os.path.join(path, name), prefix + name + "/", raw_refs,
+                                         modified_times)
+            elif value:
+                raw_refs[prefix + name] = value
@@ -1,3 +1,10 @@
+import binascii
+import functools
+
+SHA_SIZE = 20
+
+
+@functools.total_ordering
 class Sha1():
     """
     .. _Sha1:
@@ -9,13 +16,42 @@ class Sha1():
     the first 5-8 characters are enough to use as a unique identifier
     within any git repository.
 
+    A SHA-1 is held in its canonical 20-byte form, which is what it is
+    compared and hashed by. The 40-character hex string is only built
+    when it is first needed, and then kept. Within a repository, Sha1s
+    are interned (see Sha1Pool_), so every reference to a given hash
+    shares one object.
+
     Attributes:
+        binsha: The raw 20-byte SHA-1 hash.
         name: A 40-character SHA-1 hash string.
     """
 
-    def __init__(self, hash_string):
-        """Constructor"""
-        self.name = hash_string
+    __slots__ = ("binsha", "_name", "__weakref__")
+
+    def __init__(self, sha):
+        """
+        Constructor
+
+        :param sha: A 40-character hex string, or 20 raw bytes
+        """
+        if isinstance(sha, (bytes, bytearray, memoryview)):
+            self.binsha = bytes(sha)
+            self._name = None
+        else:
+            self._name = str(sha).strip().lower()
+            self.binsha = binascii.unhexlify(self._name)
+        if len(self.binsha) != SHA_SIZE:
+            raise ValueError("{0!r} is not a SHA-1".format(sha))
+
+    @property
+    def name(self):
+        """
+        The 40-character SHA-1 hash string
+        """
+        if self._name is None:
+            self._name = binascii.hexlify(self.binsha).decode()
+        return self._name
 
     def get_string_of_length(self, n):
         """
@@ -39,61 +75,35 @@ class Sha1():
         """
         return self.name
 
-    def __gt__(self, other):
-        """
-        Return true if the hexadecimal value of this SHA-1 is greater
-        than the other
-
-        :param other: The SHA-1 hash to compare this to
-        """
-        return int(self.name, 16) > int(other.name, 16)
-
     def __lt__(self, other):
         """
-        Return true if the hexadecimal value of this SHA-1 is less than
-        the other
-
-        :param other: The SHA-1 hash to compare this to
-        """
-        return int(self.name, 16) < int(other.name, 16)
-
-    def __ge__(self, other):
-        """
-        Return true if the hexadecimal value of this SHA-1 is greater
-        than or equal to the other
+        Return true if the value of this SHA-1 is less than the other
 
         :param other: The SHA-1 hash to compare this to
         """
-        return int(self.name, 16) >= int(other.name, 16)
-
-    def __le__(self, other):
-        """
-        Return true if the hexadecimal value of this SHA-1 is less than
-        or equal to the other
-
-        :param other: The SHA-1 hash to compare this to
-        """
-        return int(self.name, 16) <= int(other.name, 16)
+        if isinstance(other, Sha1):
+            return self.binsha < other.binsha
+        return NotImplemented
 
     def __eq__(self, other):
         """
-        Return True if this SHA-1 hash string matches the other
+        Return True if this SHA-1 hash matches the other
 
         :param other: The SHA-1 hash to compare this to
         """
         if isinstance(other, Sha1):
-            return self.name == other.name
+            return self.binsha == other.binsha
         return NotImplemented
 
     def __ne__(self, other):
         """
-        Return True if this SHA-1 hash string matches the other
+        Return True if this SHA-1 hash does not match the other
 
         :param other: The SHA-1 hash to compare this to
         """
         if isinstance(other, Sha1):
-            return self.name != other.name
+            return self.binsha != other.binsha
         return NotImplemented
 
     def __hash__(self):
-        return hash(self.name)
+        return hash(self.binsha)
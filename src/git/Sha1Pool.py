@@ -0,0 +1,41 @@
+import weakref
+
+from git.PackIndex import to_binary_sha
+from git.Sha1 import Sha1
+
+
+class Sha1Pool():
+    """
+    .. _Sha1Pool:
+
+    The interned Sha1s of a repository
+
+    Every Sha1 handed out for a repository comes from its pool, so all
+    references to a given hash (from branches, commits, and the canvas)
+    share one object rather than each holding a copy. The pool only
+    holds weak references, so Sha1s that are no longer used anywhere
+    are freed as usual.
+    """
+
+    def __init__(self):
+        """Constructor"""
+        self._shas = weakref.WeakValueDictionary()
+
+    def get(self, sha):
+        """
+        Return the interned Sha1 for the given hash
+
+        :param sha: A Sha1_, 40-character hex string, or 20 raw bytes
+        """
+        binsha = to_binary_sha(sha)
+        interned_sha = self._shas.get(binsha)
+        if interned_sha is None:
+            interned_sha = sha if isinstance(sha, Sha1) else Sha1(binsha)
+            self._shas[binsha] = interned_sha
+        return interned_sha
+
+    def __len__(self):
+        """
+        Return the number of Sha1s currently interned
+        """
+        return len(self._shas)
@@ -0,0 +1,83 @@
+from git.CommitHeader import CommitHeader, DEFAULT_COMMIT_ENCODING
+
+
+class TagHeader():
+    """
+    .. _TagHeader:
+
+    The headers of an annotated tag object, parsed from its raw bytes
+
+    Tag object contents are in the form::
+
+        object 2bddce7d093dfc7ce7911b5e8ae4ccbdf048b7d3
+        type commit
+        tag v1.0
+        tagger Kahmali Rose <kahmali@mail.com> 1400873968 -0400
+
+        Tag message begins after the first blank line.
+
+    A signed tag's signature is appended to its message.
+
+    Attributes:
+        contents: The raw bytes of the tag object.
+        object: The 40-character hex SHA-1 string of the object the tag
+            points to (usually a commit, but possibly another tag), or
+            None.
+        type: The type name of the object the tag points to (e.g.,
+            "commit"), or None.
+        tag: The name of the tag, or None.
+        tagger: The raw bytes of the tagger header, or None (very old
+            tags have no tagger).
+        message_start: The offset of the message in the contents.
+    """
+
+    def __init__(self, contents):
+        """
+        Constructor
+
+        :param contents: The raw bytes of a tag object, without the
+            loose object header
+        """
+        if not isinstance(contents, bytes):
+            contents = bytes(contents)
+        self.contents = contents
+        self.object = None
+        self.type = None
+        self.tag = None
+        self.tagger = None
+
+        headers_end = contents.find(b"\n\n")
+        if headers_end == -1:
+            # There is no message
+            headers_end = len(contents)
+            self.message_start = len(contents)
+        else:
+            self.message_start = headers_end + 2
+
+        for line in contents[:headers_end].split(b"\n"):
+            key, _, value = line.partition(b" ")
+            if key == b"object":
+                self.object = value.decode("ascii", "replace")
+            elif key == b"type":
+                self.type = value.decode("ascii", "replace")
+            elif key == b"tag":
+                self.tag = value.decode(DEFAULT_COMMIT_ENCODING, "replace")
+            elif key == b"tagger":
+                self.tagger = value
+
+    def get_tagger(self):
+        """
+        Return a tuple with the tagger's raw "name <email>" bytes, the
+        time the tag was created (in seconds since the epoch), and the
+        tagger's timezone offset (in minutes), or (None, 0, 0) if there
+        is no tagger
+
+        The identity can be decoded with CommitHeader.decode_identity().
+        """
+        return CommitHeader.split_identity(self.tagger)
+
+    def get_message(self):
+        """
+        Return the decoded tag message (including any signature)
+        """
+        return self.contents[self.message_start:].decode(DEFAULT_COMMIT_ENCODING, "replace")
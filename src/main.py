@@ -6,8 +6,24 @@ import os
 import sys
 from PyQt4 import QtGui
 from canvas.GGraphicsScene import GGraphicsScene
+from canvas.GVirtualGraphicsScene import GVirtualGraphicsScene
 from git.LocalRepository import LocalRepository
 from mainwindow import Ui_MainWindow
+from workers.GitCommandWorker import GitCommandWorker
+from workers.RepositoryLoader import RepositoryLoader
+from workers.RepositoryWatcher import RepositoryWatcher
+
+# The number of commits loaded when a repo is opened, and added each time the user scrolls to the
+# oldest commit loaded (None to load the complete history at once)
+HISTORY_WINDOW_SIZE = 5000
+
+# Whether canvases only hold items for the commits in view (see GVirtualGraphicsScene)
+VIRTUALIZE_CANVAS = True
+
+# The most nodes (commits, and the dummy nodes of edges spanning several layers) a complete
+# history may have to be laid out again in layers once loaded (see
+# GGraphicsScene.apply_layered_layout); larger histories keep the lanes they were loaded in
+LAYERED_LAYOUT_MAX_SIZE = 50000
 
 
 class VisualGit(QtGui.QMainWindow):
@@ -16,6 +32,22 @@ class VisualGit(QtGui.QMainWindow):
 
     Attributes:
         open_repos: A map of absolute paths to open LocalRepositories_
+        git_command_worker: The GitCommandWorker that runs git commands
+            in the background, off the GUI thread
+        repo_loaders: A map of absolute paths to the RepositoryLoaders
+            still loading the history of open repos
+        repo_watchers: A map of absolute paths to the
+            RepositoryWatchers watching open repos for changes
+        history_window_size: The number of commits loaded when a repo
+            is opened, and added each time the user scrolls to the
+            oldest commit loaded, or None to load every commit
+        history_since: The datetime of the oldest commit loaded when a
+            repo is opened, or None
+        virtualize_canvas: True to only create items for the commits in
+            view on each canvas, rather than for every commit loaded
+        layered_layout_max_size: The most nodes (dummy nodes included) a
+            history may have to be laid out in layers once it has been
+            completely loaded
     """
 
     def __init__(self):
@@ -28,6 +60,31 @@ class VisualGit(QtGui.QMainWindow):
 
         # Initialize attributes
         self.open_repos = {}
+        self.repo_loaders = {}
+        self.repo_watchers = {}
+        self.history_window_size = HISTORY_WINDOW_SIZE
+        self.history_since = None
+        self.virtualize_canvas = VIRTUALIZE_CANVAS
+        self.layered_layout_max_size = LAYERED_LAYOUT_MAX_SIZE
+
+        # The paths of repos that changed while they were being loaded, to be updated once loaded
+        self._pending_updates = set()
+
+        # Show repository loading progress, with a way to cancel it, in the status bar
+        self.progress_loading = QtGui.QProgressBar()
+        self.progress_loading.setRange(0, 0)
+        self.progress_loading.setMaximumWidth(200)
+        self.btn_cancel_loading = QtGui.QPushButton("Cancel")
+        self.btn_cancel_loading.clicked.connect(self._cancel_loading)
+        self.ui.statusBar.addPermanentWidget(self.progress_loading)
+        self.ui.statusBar.addPermanentWidget(self.btn_cancel_loading)
+        self._update_loading_status()
+
+        # Start the worker that runs the git commands of open repos in the background, and show
+        # their results as they finish
+        self.git_command_worker = GitCommandWorker(self)
+        self.git_command_worker.command_finished.connect(self._show_command_result)
+        self.git_command_worker.start()
 
     def _connect_signals_to_slots(self):
         """
@@ -53,15 +110,8 @@ class VisualGit(QtGui.QMainWindow):
         if repo_path:
             # If the selected repo is not already open
             if repo_path not in self.open_repos:
-                # Get commit history and branches for selected repository
-                repo = LocalRepository(repo_path)
-                root_commit = repo.get_commit_graph()
-                branches = repo.branches
-
-                # Show the root commit's details by default
-                self._show_commit_details(root_commit)
-
                 # Add selected repo to the set of open repos
+                repo = LocalRepository(repo_path, self.git_command_worker)
                 self.open_repos[repo_path] = repo
 
                 # Add a new Canvas tab for the repo
@@ -71,20 +121,184 @@ class VisualGit(QtGui.QMainWindow):
                 index = self.ui.tabs_canvas.addTab(canvas, repo_name)
                 self.ui.tabs_canvas.widget(index).setStatusTip(repo_path)
 
-                # Display repo's commit graph on a new Canvas
-                q_graphics_scene = GGraphicsScene()
+                # Display repo's commit graph on a new Canvas as it is loaded
+                if self.virtualize_canvas:
+                    q_graphics_scene = GVirtualGraphicsScene()
+                else:
+                    q_graphics_scene = GGraphicsScene()
                 canvas.setScene(q_graphics_scene)
-                q_graphics_scene.render_scene(root_commit, branches)
                 self.ui.tabs_canvas.setCurrentWidget(canvas)
 
                 # Setup signals for the Canvas
                 q_graphics_scene.commitnode_selected.connect(self._show_commit_details)
+
+                # Load the recent commit history and branches in the background, newest first
+                loader = RepositoryLoader(repo, self, max_count=self.history_window_size,
+                                          since=self.history_since,
+                                          layout_max_size=self.layered_layout_max_size)
+                loader.commits_loaded.connect(q_graphics_scene.add_commits)
+                loader.layout_computed.connect(q_graphics_scene.apply_layered_layout)
+                loader.progress_changed.connect(self._update_loading_status)
+                loader.loading_finished.connect(
+                    lambda cancelled: self._finish_loading(repo_path, q_graphics_scene,
+                                                           show_head_commit=True))
+                loader.loading_failed.connect(
+                    lambda error: self._finish_loading(repo_path, q_graphics_scene, error))
+                self.repo_loaders[repo_path] = loader
+                loader.start()
+                self._update_loading_status()
+
+                # Load older history when the user scrolls to the bottom of what is loaded
+                canvas.verticalScrollBar().valueChanged.connect(
+                    lambda value: self._canvas_scrolled(repo_path, q_graphics_scene, canvas))
+
+                # Show changes made to the repo from now on as they happen
+                watcher = RepositoryWatcher(repo_path, self)
+                watcher.repository_changed.connect(
+                    lambda: self._update_repo(repo_path, q_graphics_scene))
+                self.repo_watchers[repo_path] = watcher
             else:
                 # Show existing tab containing selected repo
                 for i in range(0, self.ui.tabs_canvas.count()):
                     if repo_path == self.ui.tabs_canvas.widget(i).repo_path:
                         self.ui.tabs_canvas.setCurrentIndex(i)
 
+    def _finish_loading(self, repo_path, q_graphics_scene, error=None, new_commits=None,
+                        show_head_commit=False):
+        """
+        Finish displaying a repo once its history has been loaded (or
+        loading was cancelled or failed)
+
+        :param repo_path: The absolute path to the loaded repo
+        :param q_graphics_scene: The GGraphicsScene displaying the repo
+        :param error: A description of the error loading failed with,
+            if any
+        :param new_commits: The commits added to the repo since it was
+            loaded, newest first, if this was an update
+        :param show_head_commit: True to show the details of the
+            commit HEAD points to
+        """
+
+        loader = self.repo_loaders.pop(repo_path, None)
+        if loader is not None:
+            loader.wait()
+        repo = self.open_repos.get(repo_path)
+        if repo is not None:
+            if new_commits is not None:
+                q_graphics_scene.insert_commits(new_commits)
+
+            # Label the branches, tags and HEAD (redrawing commits no longer truncated)
+            q_graphics_scene.clear_labels()
+            q_graphics_scene.render_branch_labels(repo.branches)
+            q_graphics_scene.render_tag_labels(repo.tags)
+            q_graphics_scene.render_head_pointer(repo.head)
+            q_graphics_scene.update()
+
+            # Show the details of the checked out commit by default
+            if (show_head_commit and repo.head is not None and
+                    repo.head.commit_sha in repo.commits):
+                self._show_commit_details(repo.commits[repo.head.commit_sha])
+        if error is not None:
+            self.ui.statusBar.showMessage("Failed to load {0}: {1}".format(repo_path, error))
+        self._update_loading_status()
+
+        # Catch up with any changes made while the repo was loading
+        if repo is not None and repo_path in self._pending_updates:
+            self._pending_updates.discard(repo_path)
+            self._update_repo(repo_path, q_graphics_scene)
+
+    def _canvas_scrolled(self, repo_path, q_graphics_scene, canvas):
+        """
+        Load the next window of older history when the user scrolls to
+        the bottom of a repo's canvas, if only part of the history has
+        been loaded
+
+        :param repo_path: The absolute path to the repo
+        :param q_graphics_scene: The GGraphicsScene displaying the repo
+        :param canvas: The QGraphicsView showing the scene
+        """
+
+        scroll_bar = canvas.verticalScrollBar()
+        if scroll_bar.value() < scroll_bar.maximum() - scroll_bar.pageStep():
+            return
+        repo = self.open_repos.get(repo_path)
+        if repo is None or repo_path in self.repo_loaders or repo.is_history_complete():
+            return
+
+        # Add the older commits below the others as they are loaded
+        loader = RepositoryLoader(repo, self, RepositoryLoader.LOAD_OLDER_HISTORY,
+                                  self.history_window_size,
+                                  layout_max_size=self.layered_layout_max_size)
+        loader.commits_loaded.connect(q_graphics_scene.add_commits)
+        loader.layout_computed.connect(q_graphics_scene.apply_layered_layout)
+        loader.progress_changed.connect(self._update_loading_status)
+        loader.loading_finished.connect(
+            lambda cancelled: self._finish_loading(repo_path, q_graphics_scene))
+        loader.loading_failed.connect(
+            lambda error: self._finish_loading(repo_path, q_graphics_scene, error))
+        self.repo_loaders[repo_path] = loader
+        loader.start()
+        self._update_loading_status()
+
+    def _update_repo(self, repo_path, q_graphics_scene):
+        """
+        Load the commits and ref changes made to a repo since it was
+        loaded, and add them to its canvas
+
+        Only the new commits are read, in the background, and the
+        canvas is patched in place rather than drawn again.
+
+        :param repo_path: The absolute path to the changed repo
+        :param q_graphics_scene: The GGraphicsScene displaying the repo
+        """
+
+        repo = self.open_repos.get(repo_path)
+        if repo is None:
+            return
+        if repo_path in self.repo_loaders:
+            # Update once the current load is done
+            self._pending_updates.add(repo_path)
+            return
+
+        # Collect the new commits, and insert them all at once above the existing ones
+        new_commits = []
+        loader = RepositoryLoader(repo, self, RepositoryLoader.LOAD_UPDATES)
+        loader.commits_loaded.connect(new_commits.extend)
+        loader.loading_finished.connect(
+            lambda cancelled: self._finish_loading(repo_path, q_graphics_scene,
+                                                   new_commits=new_commits))
+        loader.loading_failed.connect(
+            lambda error: self._finish_loading(repo_path, q_graphics_scene, error, new_commits))
+        self.repo_loaders[repo_path] = loader
+        loader.start()
+
+    @pyqtSlot()
+    def _cancel_loading(self):
+        """
+        Stop loading the history of the repo in the current Canvas tab
+        """
+
+        canvas = self.ui.tabs_canvas.currentWidget()
+        if canvas is not None and canvas.repo_path in self.repo_loaders:
+            self.repo_loaders[canvas.repo_path].cancel()
+
+    def _update_loading_status(self, num_loaded=0):
+        """
+        Show the loading progress and cancel button while any repo is
+        loading, and hide them otherwise
+
+        :param num_loaded: The number of commits loaded by the loader
+            reporting progress, if any
+        """
+
+        loading = bool(self.repo_loaders)
+        if num_loaded:
+            self.progress_loading.setFormat("{0} commits".format(num_loaded))
+        else:
+            self.progress_loading.setFormat("Loading")
+        self.progress_loading.setVisible(loading)
+        self.btn_cancel_loading.setVisible(loading)
+
     @pyqtSlot(int)
     def _close_canvas_tab(self, index):
         """
@@ -92,28 +306,97 @@ class VisualGit(QtGui.QMainWindow):
         LocalRepository_
         """
 
-        self.open_repos.pop(self.ui.tabs_canvas.widget(index).repo_path)
+        repo_path = self.ui.tabs_canvas.widget(index).repo_path
+        watcher = self.repo_watchers.pop(repo_path, None)
+        if watcher is not None:
+            watcher.stop()
+        self._pending_updates.discard(repo_path)
+        loader = self.repo_loaders.pop(repo_path, None)
+        if loader is not None:
+            loader.cancel()
+            loader.wait()
+        repo = self.open_repos.pop(repo_path)
+        repo.close()
+        self._update_loading_status()
         self.ui.tabs_canvas.removeTab(index)
 
+    def closeEvent(self, event):
+        """
+        Stop background work and release all open repositories before
+        the window closes
+        """
+
+        self.git_command_worker.stop()
+        for watcher in self.repo_watchers.values():
+            watcher.stop()
+        for loader in self.repo_loaders.values():
+            loader.cancel()
+            loader.wait()
+        for repo in self.open_repos.values():
+            repo.close()
+        super().closeEvent(event)
+
+    @pyqtSlot(int, object)
+    def _show_command_result(self, request_id, result):
+        """
+        Log the result of a git command run by the GitCommandWorker, and
+        show it in the status bar
+
+        :param request_id: The request id of the command
+        :param result: The GitCommandResult of the command
+        """
+
+        command = "git " + " ".join(result.args)
+        if result.cancelled:
+            message = "{0}: cancelled".format(command)
+        elif result.timed_out:
+            message = "{0}: timed out".format(command)
+        else:
+            output = result.output.strip()
+            message = "{0}: {1}".format(command, output.splitlines()[-1] if output else
+                                        "exited with status {0}".format(result.returncode))
+        logging.getLogger('git_interaction_logger').info("%s\n%s", command, result.output)
+        self.ui.statusBar.showMessage(message)
+
     @pyqtSlot(Commit)
     def _show_commit_details(self, commit):
         """
         Display the details of the given commit in the Commit Explorer
 
+        Details the commit does not have (e.g., because it could not be
+        loaded) are shown as empty fields.
+
         :param commit: The Commit to display
         """
 
-        self.ui.lbl_commit_msg_header.setText(commit.message.splitlines()[0])
+        message = commit.message or ""
+        author = commit.author
+        committer = commit.committer
+        self.ui.lbl_commit_msg_header.setText(message.splitlines()[0] if message else "")
         self.ui.txt_commit_sha.setText(commit.sha.name)
-        self.ui.txt_author_name.setText(commit.author.name)
-        self.ui.txt_author_email.setText(commit.author.email)
-        self.ui.txt_author_date.setText(commit.date_authored.strftime("%x"))
-        self.ui.txt_author_time.setText(commit.date_authored.strftime("%X"))
-        self.ui.txt_committer_name.setText(commit.committer.name)
-        self.ui.txt_committer_email.setText(commit.committer.email)
-        self.ui.txt_commit_date.setText(commit.date_committed.strftime("%x"))
-        self.ui.txt_commit_time.setText(commit.date_committed.strftime("%X"))
-        self.ui.txt_commit_msg.setText(commit.message)
+        self.ui.txt_author_name.setText(author.name if author is not None else "")
+        self.ui.txt_author_email.setText(author.email if author is not None else "")
+        self.ui.txt_author_date.setText(_format_date(commit.date_authored, "%x"))
+        self.ui.txt_author_time.setText(_format_date(commit.date_authored, "%X"))
+        self.ui.txt_committer_name.setText(committer.name if committer is not None else "")
+        self.ui.txt_committer_email.setText(committer.email if committer is not None else "")
+        self.ui.txt_commit_date.setText(_format_date(commit.date_committed, "%x"))
+        self.ui.txt_commit_time.setText(_format_date(commit.date_committed, "%X"))
+        self.ui.txt_commit_msg.setText(message)
+
+
+def _format_date(date, date_format):
+    """
+    Return the given date formatted with the given strftime format, or
+    an empty string if there is no date (e.g., the commit has not been
+    loaded, or its timestamp is out of range)
+
+    :param date: A datetime, or None
+    :param date_format: A strftime format string
+    """
+    if date is None:
+        return ""
+    return date.strftime(date_format)
 
 
 def init_loggers():
@@ -0,0 +1,120 @@
+import asyncio
+
+from PyQt4.QtCore import QThread, pyqtSignal
+from git.GitCommandResult import GitCommandResult
+from git.GitCommandRunner import GitCommandRunner
+
+
+class GitCommandWorker(QThread):
+    """
+    A thread running git commands in the background for the GUI
+
+    The worker runs an asyncio event loop on its own thread, so git
+    commands never block the GUI thread, and any number of them can run
+    concurrently. Commands are submitted from the GUI thread, and their
+    output and results are delivered back to it through signals.
+
+    Signals:
+        output_received(int, str, str):
+            The command with the given request id wrote the given line
+            to the given stream ("stdout" or "stderr")
+        command_finished(int, object):
+            The command with the given request id finished with the
+            given GitCommandResult
+    """
+
+    # Define worker signals
+    output_received = pyqtSignal(int, str, str)
+    command_finished = pyqtSignal(int, object)
+
+    def __init__(self, parent=None):
+        """Constructor"""
+        super().__init__(parent)
+        self._loop = asyncio.new_event_loop()
+        self._tasks = {}
+        self._next_request_id = 0
+
+    def run(self):
+        """
+        Run the event loop until the worker is stopped
+        """
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+        # Kill any commands still running
+        for task in self._tasks.values():
+            task.cancel()
+        self._loop.run_until_complete(asyncio.gather(*self._tasks.values(),
+                                                     return_exceptions=True))
+        self._loop.close()
+
+    def submit(self, path_to_local_repository, args, timeout=None):
+        """
+        Start running a git command in the given repository and return
+        the request id identifying it in this worker's signals
+
+        :param path_to_local_repository: The absolute path to the git
+            directory to run the command in
+        :param args: A list of arguments to pass to git
+        :param timeout: The number of seconds to wait for the command,
+            or None to wait indefinitely
+        """
+        request_id = self._next_request_id
+        self._next_request_id += 1
+        self._loop.call_soon_threadsafe(self._start_command, request_id,
+                                        path_to_local_repository, list(args), timeout)
+        return request_id
+
+    def cancel(self, request_id):
+        """
+        Cancel the git command with the given request id, killing its
+        process if it is still running
+
+        :param request_id: The id returned when the command was
+            submitted
+        """
+        self._loop.call_soon_threadsafe(self._cancel_command, request_id)
+
+    def stop(self):
+        """
+        Stop the worker, killing any commands still running, and wait
+        for its thread to finish
+        """
+        if self.isRunning():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self.wait()
+
+    def _start_command(self, request_id, path_to_local_repository, args, timeout):
+        """
+        Start a git command on the event loop (runs on the worker thread)
+        """
+        runner = GitCommandRunner(path_to_local_repository)
+        task = self._loop.create_task(runner.run(
+            args, timeout,
+            on_stdout=lambda line: self.output_received.emit(request_id, "stdout", line),
+            on_stderr=lambda line: self.output_received.emit(request_id, "stderr", line)))
+        self._tasks[request_id] = task
+        task.add_done_callback(lambda done_task: self._finish_command(request_id, args,
+                                                                      done_task))
+
+    def _cancel_command(self, request_id):
+        """
+        Cancel a running git command (runs on the worker thread)
+        """
+        task = self._tasks.get(request_id)
+        if task is not None:
+            task.cancel()
+
+    def _finish_command(self, request_id, args, task):
+        """
+        Report the result of a finished git command (runs on the worker
+        thread)
+        """
+        self._tasks.pop(request_id, None)
+        if task.cancelled():
+            result = GitCommandResult(args, cancelled=True)
+        elif task.exception() is not None:
+            result = GitCommandResult(args, stderr=str(task.exception()))
+        else:
+            result = task.result()
+        self.command_finished.emit(request_id, result)
@@ -0,0 +1,120 @@
+from PyQt4.QtCore import QThread, pyqtSignal
+from canvas import rendering_algorithms
+
+
+class RepositoryLoader(QThread):
+    """
+    A thread loading the commit history of a LocalRepository in the
+    background
+
+    Commits are loaded newest first, and delivered to the GUI thread in
+    batches as they are loaded, so the most recent history can be drawn
+    while older history is still being read.
+
+    The history can be limited to a window of the most recent commits,
+    and a loader can instead extend that window to older commits (see
+    LocalRepository.iter_older_history), or load only the commits added
+    since the history was loaded (see
+    LocalRepository.iter_commit_graph_updates).
+
+    Once a loader has loaded the complete history, it can also compute
+    a layered layout of it (see rendering_algorithms.layered_layout),
+    on its own thread, for the GUI thread to apply. The layout is
+    skipped if it would have more than layout_max_size nodes, dummy
+    nodes included.
+
+    Signals:
+        commits_loaded(object):
+            A list of newly loaded commits, newest first
+        progress_changed(int):
+            The total number of commits loaded so far
+        layout_computed(object, object, object):
+            A layered layout of the complete history: the Sha1 of each
+            commit, and NumPy arrays of the layer and column of each
+        loading_finished(bool):
+            Loading stopped; True if it was cancelled before the whole
+            history was loaded
+        loading_failed(str):
+            Loading stopped because of the given error
+    """
+
+    # What a loader loads
+    LOAD_HISTORY = 0
+    LOAD_OLDER_HISTORY = 1
+    LOAD_UPDATES = 2
+
+    # Define loader signals
+    commits_loaded = pyqtSignal(object)
+    progress_changed = pyqtSignal(int)
+    layout_computed = pyqtSignal(object, object, object)
+    loading_finished = pyqtSignal(bool)
+    loading_failed = pyqtSignal(str)
+
+    def __init__(self, repo, parent=None, mode=LOAD_HISTORY, max_count=None, since=None,
+                 layout_max_size=None):
+        """
+        Constructor
+
+        :param repo: The LocalRepository to load
+        :param mode: LOAD_HISTORY to load the repository's history,
+            LOAD_OLDER_HISTORY to extend the loaded history to older
+            commits, or LOAD_UPDATES to load only the commits added
+            since the history was loaded
+        :param max_count: The most commits to load, or None
+        :param since: The datetime of the oldest commit to load, or None
+        :param layout_max_size: The most nodes a layered layout of the
+            complete history may have, or None to not compute one
+        """
+        super().__init__(parent)
+        self.repo = repo
+        self.mode = mode
+        self.max_count = max_count
+        self.since = since
+        self.layout_max_size = layout_max_size
+        self._cancelled = False
+
+    def run(self):
+        """
+        Load the repository's commit history, one batch at a time
+        """
+        num_loaded = 0
+        if self.mode == RepositoryLoader.LOAD_UPDATES:
+            batches = self.repo.iter_commit_graph_updates()
+        elif self.mode == RepositoryLoader.LOAD_OLDER_HISTORY:
+            batches = self.repo.iter_older_history(self.max_count, self.since)
+        else:
+            batches = self.repo.iter_commit_graph(max_count=self.max_count, since=self.since)
+        try:
+            for batch in batches:
+                num_loaded += len(batch)
+                self.commits_loaded.emit(batch)
+                self.progress_changed.emit(num_loaded)
+                if self._cancelled:
+                    break
+            if (not self._cancelled and self.layout_max_size is not None and
+                    self.mode != RepositoryLoader.LOAD_UPDATES and
+                    self.repo.is_history_complete()):
+                self._compute_layout()
+        except Exception as error:
+            self.loading_failed.emit(str(error))
+            return
+        self.loading_finished.emit(self._cancelled)
+
+    def _compute_layout(self):
+        """
+        Compute a layered layout of every commit in the repository, and
+        emit it, unless it would be too large
+        """
+        store = self.repo.commits
+        numbers = range(len(store))
+        layout = rendering_algorithms.layered_layout([store.get_parents(number)
+                                                      for number in numbers],
+                                                     self.layout_max_size)
+        if layout is not None:
+            self.layout_computed.emit([store.get_sha(number) for number in numbers], *layout)
+
+    def cancel(self):
+        """
+        Stop loading after the current batch
+        """
+        self._cancelled = True
@@ -0,0 +1,120 @@
+import os
+
+from PyQt4.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal
+
+# How long to wait for a burst of changes (e.g., a fetch updating many refs) to end before
+# reporting them, in milliseconds
+CHANGE_DELAY = 500
+
+# The files directly in .git/ whose changes are reported; the rest (index, index.lock, FETCH_HEAD,
+# ORIG_HEAD, etc.) change constantly without touching any refs
+WATCHED_GIT_FILES = ("HEAD", "packed-refs")
+
+
+class RepositoryWatcher(QObject):
+    """
+    Watches a local repository for changes made by git outside of the
+    application (commits, fetches, pushes, checkouts, garbage
+    collection, etc.)
+
+    Git writes every ref, HEAD and packed-refs by writing a new file
+    and renaming it into place, so watching the directories holding
+    them is enough to see every change: the .git/ directory (HEAD and
+    packed-refs), every directory under .git/refs/ (loose refs, which
+    may be nested, e.g. refs/heads/feature/foo), and .git/objects/pack/
+    (new pack files). Directories created under .git/refs/ are watched
+    as they appear.
+
+    The .git/ directory itself also changes whenever git writes any of
+    the other files in it (e.g., the index, on every git status), so a
+    change to it is only reported if the size, modification time or
+    inode of HEAD or packed-refs (see WATCHED_GIT_FILES) has changed.
+
+    Changes usually come in bursts, so they are reported once things
+    have been quiet for CHANGE_DELAY milliseconds.
+
+    Signals:
+        repository_changed():
+            The repository's refs or pack files have changed
+    """
+
+    # Define watcher signals
+    repository_changed = pyqtSignal()
+
+    def __init__(self, path, parent=None):
+        """
+        Constructor
+
+        :param path: The absolute path to the repository's working
+            directory
+        """
+        super().__init__(parent)
+        self.path = path
+        self._path_to_git_dir = os.path.join(path, ".git")
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(CHANGE_DELAY)
+        self._timer.timeout.connect(self.repository_changed.emit)
+
+        self._git_file_stats = self._stat_git_files()
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._directory_changed)
+        self._watch_directories()
+
+    def stop(self):
+        """
+        Stop watching the repository
+        """
+        self._timer.stop()
+        directories = self._watcher.directories()
+        if directories:
+            self._watcher.removePaths(directories)
+
+    def _directory_changed(self, path):
+        """
+        Watch any directories created by the change, and report the
+        change once the burst it belongs to is over
+
+        :param path: The absolute path to the directory that changed
+        """
+        if os.path.normpath(path) == os.path.normpath(self._path_to_git_dir):
+            git_file_stats = self._stat_git_files()
+            if git_file_stats == self._git_file_stats:
+                # Some other file in .git/ changed
+                return
+            self._git_file_stats = git_file_stats
+        self._watch_directories()
+        self._timer.start()
+
+    def _stat_git_files(self):
+        """
+        Return a list of the (size, modification time, inode) of each of
+        the WATCHED_GIT_FILES, or None for those that do not exist
+        """
+        stats = []
+        for name in WATCHED_GIT_FILES:
+            try:
+                stat = os.stat(os.path.join(self._path_to_git_dir, name))
+            except OSError:
+                stats.append(None)
+            else:
+                stats.append((stat.st_size, stat.st_mtime_ns, stat.st_ino))
+        return stats
+
+    def _watch_directories(self):
+        """
+        Start watching each directory that should be watched and is not
+        already
+        """
+        directories = [self._path_to_git_dir,
+                       os.path.join(self._path_to_git_dir, "objects", "pack")]
+        for directory, _, _ in os.walk(os.path.join(self._path_to_git_dir, "refs")):
+            directories.append(directory)
+
+        watched = set(self._watcher.directories())
+        new_directories = [directory for directory in directories
+                           if directory not in watched and os.path.isdir(directory)]
+        if new_directories:
+            self._watcher.addPaths(new_directories)
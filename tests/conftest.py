@@ -0,0 +1,150 @@
+"""
+Shared fixtures: a temporary repository built with the git command line,
+whose objects and history the pure-Python readers are checked against
+"""
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "Kahmali Rose",
+    "GIT_AUTHOR_EMAIL": "kahmali@mail.com",
+    "GIT_COMMITTER_NAME": "Kahmali Rose",
+    "GIT_COMMITTER_EMAIL": "kahmali@mail.com",
+    "GIT_CONFIG_NOSYSTEM": "1",
+    "GIT_CONFIG_GLOBAL": os.devnull,
+}
+
+# A (well-formed, but not valid) signature for the signed commit
+SIGNATURE = (b"-----BEGIN PGP SIGNATURE-----\n"
+             b"\n"
+             b"iQEzBAABCAAdFiEEK2WBUhxvWa7zBXKj0VpVSqHqkQ8FAl0M4RQACgkQ0VpVSqHq\n"
+             b"-----END PGP SIGNATURE-----")
+
+# The number of lines in the file rewritten by each commit, so that git stores it as deltas
+FILE_LINES = 200
+
+
+def git(repo_path, *args, input=None, env=None):
+    """
+    Run a git command in the given repository and return its output
+
+    :param repo_path: The path to the repository
+    :param args: The arguments to git
+    :param input: The bytes to write to the command's stdin
+    :param env: Environment variables to set in addition to GIT_ENV
+    """
+    command_env = dict(os.environ, **GIT_ENV)
+    if env:
+        command_env.update(env)
+    return subprocess.run(["git"] + list(args), cwd=repo_path, input=input, env=command_env,
+                          stdout=subprocess.PIPE, check=True).stdout
+
+
+def get_parents(repo_path, revision="--all"):
+    """
+    Return a list of (sha, parent shas) for every commit reachable from
+    the given revision, children first, as listed by git rev-list
+    --parents
+
+    :param repo_path: The path to the repository
+    :param revision: The revision to list the history of
+    """
+    commits = []
+    for line in git(repo_path, "rev-list", "--parents", "--topo-order", revision).split(b"\n"):
+        if line:
+            shas = line.decode().split()
+            commits.append((shas[0], shas[1:]))
+    return commits
+
+
+def _commit(repo_path, number, date, filename="file.txt"):
+    """
+    Rewrite one line of a file in the repository and commit it
+
+    :param repo_path: The path to the repository
+    :param number: The number of the commit, used in its file and message
+    :param date: The author and committer date of the commit
+    :param filename: The name of the file to write
+    """
+    lines = ["line {0} of a file changed a little by every commit\n".format(i)
+             for i in range(FILE_LINES)]
+    lines[number % FILE_LINES] = "changed by commit {0}\n".format(number)
+    with open(os.path.join(repo_path, filename), "w") as repo_file:
+        repo_file.writelines(lines)
+    git(repo_path, "add", filename)
+    git(repo_path, "commit", "-q", "-m", "Commit {0}".format(number),
+        env={"GIT_AUTHOR_DATE": "{0} +0000".format(date),
+             "GIT_COMMITTER_DATE": "{0} +0000".format(date)})
+
+
+@pytest.fixture(scope="session")
+def git_repo(tmp_path_factory):
+    """
+    Return the path to a repository with a long-lived topic branch, a
+    merge, an octopus merge, and a commit-graph split into a chain of
+    two files, with all of its objects in a single pack
+
+    The "signed" branch is a merge with gpgsig and mergetag headers,
+    and the "encoded" branch is a commit in ISO-8859-1; neither is in
+    the commit-graph.
+    """
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+    repo_path = str(tmp_path_factory.mktemp("repo"))
+    git(repo_path, "init", "-q", "-b", "master")
+
+    date = 1400873968
+    for number in range(20):
+        if number == 4:
+            git(repo_path, "branch", "topic")
+        _commit(repo_path, number, date + number * 60)
+    git(repo_path, "checkout", "-q", "topic")
+    for number in range(20, 30):
+        _commit(repo_path, number, date + number * 60)
+    git(repo_path, "checkout", "-q", "master")
+    git(repo_path, "merge", "-q", "--no-ff", "--no-edit", "topic")
+    git(repo_path, "commit-graph", "write", "--reachable", "--split")
+
+    for name, number in (("one", 30), ("two", 31), ("three", 32)):
+        git(repo_path, "checkout", "-q", "-b", name, "master")
+        _commit(repo_path, number, date + number * 60, name + ".txt")
+    git(repo_path, "checkout", "-q", "master")
+    git(repo_path, "merge", "-q", "--no-ff", "--no-edit", "one", "two", "three")
+    for number in range(33, 40):
+        _commit(repo_path, number, date + number * 60)
+    git(repo_path, "commit-graph", "write", "--reachable", "--split=no-merge")
+
+    # Commits git only writes with gpg or a non-UTF-8 i18n.commitEncoding, outside the graph
+    git(repo_path, "tag", "-a", "-m", "Release the topic", "topic-release", "topic")
+    tree = git(repo_path, "rev-parse", "master^{tree}").decode().strip()
+    master = git(repo_path, "rev-parse", "master").decode().strip()
+    topic = git(repo_path, "rev-parse", "topic").decode().strip()
+    tag = git(repo_path, "cat-file", "tag", "topic-release")
+    identity = "Kahmali Rose <kahmali@mail.com> {0} -0400".format(date + 3600).encode()
+    signed = (b"tree " + tree.encode() + b"\n" +
+              b"parent " + master.encode() + b"\n" +
+              b"parent " + topic.encode() + b"\n" +
+              b"author " + identity + b"\n" +
+              b"committer " + identity + b"\n" +
+              b"mergetag " + tag.rstrip(b"\n").replace(b"\n", b"\n ") + b"\n" +
+              b"gpgsig " + SIGNATURE.replace(b"\n", b"\n ") + b"\n" +
+              b"\nMerge tag 'topic-release'\n")
+    signed_sha = git(repo_path, "hash-object", "-t", "commit", "-w", "--stdin", input=signed)
+    git(repo_path, "update-ref", "refs/heads/signed", signed_sha.decode().strip())
+    encoded = (b"tree " + tree.encode() + b"\n" +
+               b"parent " + master.encode() + b"\n" +
+               b"author Ren\xe9 Fran\xe7ois <rene@mail.com> 1400873968 +0200\n" +
+               b"committer Ren\xe9 Fran\xe7ois <rene@mail.com> 1400873968 +0200\n" +
+               b"encoding ISO-8859-1\n" +
+               b"\nCaf\xe9 cr\xe8me br\xfbl\xe9e\n")
+    encoded_sha = git(repo_path, "hash-object", "-t", "commit", "-w", "--stdin", input=encoded)
+    git(repo_path, "update-ref", "refs/heads/encoded", encoded_sha.decode().strip())
+
+    git(repo_path, "repack", "-adq")
+    return repo_path
@@ -0,0 +1,168 @@
+"""
+Tests of the readers of git's on-disk formats, checked against the git
+command line on a temporary repository (see conftest.git_repo)
+"""
+import binascii
+import glob
+import os
+
+import pytest
+
+from conftest import SIGNATURE, get_parents, git
+from git.CommitGraphFile import CommitGraphFile
+from git.CommitHeader import CommitHeader
+from git.DeltaBaseCache import DeltaBaseCache
+from git.PackFile import PackFile, _apply_delta
+
+
+def _encode_delta_size(size):
+    """
+    Return the variable-length encoding of a size in a delta header
+    """
+    encoded = bytearray()
+    while size >= 0x80:
+        encoded.append(size & 0x7f | 0x80)
+        size >>= 7
+    encoded.append(size)
+    return bytes(encoded)
+
+
+def _cat_file(repo_path, shas):
+    """
+    Return a dict of the type name and contents of each of the given
+    objects, as read by git cat-file --batch
+    """
+    output = git(repo_path, "cat-file", "--batch",
+                 input="".join(sha + "\n" for sha in shas).encode())
+    objects = {}
+    position = 0
+    while position < len(output):
+        header_end = output.index(b"\n", position)
+        sha, type_name, size = output[position:header_end].decode().split()
+        contents_start = header_end + 1
+        objects[sha] = type_name, output[contents_start:contents_start + int(size)]
+        position = contents_start + int(size) + 1
+    return objects
+
+
+def _unindent(header):
+    """
+    Return the value of a multi-line commit header without the space
+    continuing each of its lines
+    """
+    return header.replace(b"\n ", b"\n")
+
+
+def test_apply_delta_copies_and_inserts():
+    base = bytes(range(256)) * 300
+    delta = (_encode_delta_size(len(base)) + _encode_delta_size(0x10000 + 3 + 5) +
+             # Copy from offset 0x10, with no size bytes (a size of 0x10000)
+             bytes([0x80 | 0x01, 0x10]) +
+             b"\x03abc" +
+             # Copy 5 bytes from offset 0x0102
+             bytes([0x80 | 0x01 | 0x02 | 0x10, 0x02, 0x01, 0x05]))
+    assert _apply_delta(base, delta) == base[0x10:0x10010] + b"abc" + base[0x102:0x107]
+
+
+def test_apply_delta_rejects_invalid_deltas():
+    with pytest.raises(ValueError):
+        _apply_delta(b"base", _encode_delta_size(5) + _encode_delta_size(1) + b"\x01a")
+    with pytest.raises(ValueError):
+        _apply_delta(b"base", _encode_delta_size(4) + _encode_delta_size(1) + b"\x00")
+    with pytest.raises(ValueError):
+        _apply_delta(b"base", _encode_delta_size(4) + _encode_delta_size(2) + b"\x01a")
+
+
+@pytest.mark.parametrize("delta_base_offset", [True, False], ids=["ofs_delta", "ref_delta"])
+def test_pack_file_matches_cat_file(git_repo, tmp_path, delta_base_offset):
+    if delta_base_offset:
+        pack_dir = os.path.join(git_repo, ".git", "objects", "pack")
+    else:
+        objects = git(git_repo, "rev-list", "--objects", "--all")
+        git(git_repo, "pack-objects", "-q", "--no-delta-base-offset", str(tmp_path / "pack"),
+            input=objects)
+        pack_dir = str(tmp_path)
+    index_path, = glob.glob(os.path.join(pack_dir, "pack-*.idx"))
+    chain_lengths = git(git_repo, "verify-pack", "-v", index_path).decode()
+    assert "chain length = 2:" in chain_lengths
+
+    # Read every object twice, the second time with delta bases from the cache
+    pack = PackFile.from_index_path(index_path, DeltaBaseCache())
+    try:
+        shas = [binascii.hexlify(pack.index.get_sha(position)).decode()
+                for position in range(len(pack.index))]
+        expected = _cat_file(git_repo, shas)
+        for sha in shas + shas:
+            assert pack.read_object(pack.index.lookup(sha)) == expected[sha]
+    finally:
+        pack.close()
+
+
+def test_commit_graph_split_chain_matches_rev_list(git_repo):
+    commits = get_parents(git_repo, "master")
+    commit_dates = dict(line.split() for line in
+                        git(git_repo, "log", "--format=%H %ct", "master").decode().splitlines())
+
+    # Generation numbers are one more than the greatest generation of the commit's parents
+    generations = {}
+    for sha, parents in reversed(commits):
+        generations[sha] = 1 + max((generations[parent] for parent in parents), default=0)
+
+    graph = CommitGraphFile.open(os.path.join(git_repo, ".git", "objects"))
+    try:
+        assert graph.base is not None and graph.base.base is None
+        assert len(graph) == len(commits)
+        for sha, parents in commits:
+            position = graph.find_position(sha)
+            assert graph.get_sha(position) == sha
+            parent_positions, generation, commit_date = graph.get_commit_data(position)
+            assert [graph.get_sha(parent) for parent in parent_positions] == parents
+            assert generation == generations[sha]
+            assert commit_date == int(commit_dates[sha])
+        assert graph.find_position(git(git_repo, "rev-parse", "signed").decode().strip()) is None
+    finally:
+        graph.close()
+
+
+def test_commit_header_matches_git_log(git_repo):
+    commits = get_parents(git_repo)
+    raw_commits = _cat_file(git_repo, [sha for sha, _ in commits])
+    log = git(git_repo, "log", "--all", "-z", "--encoding=UTF-8",
+              "--format=%H%n%T%n%an%n%ae%n%at%n%cn%n%ct%n%B").decode().split("\0")
+    entries = {entry.split("\n", 1)[0]: entry.split("\n", 7)[1:] for entry in log if entry}
+
+    for sha, parents in commits:
+        tree, author_name, author_email, author_time, committer_name, commit_time, message = \
+            entries[sha]
+        header = CommitHeader(raw_commits[sha][1])
+        assert header.tree == tree
+        assert header.parents == parents
+        author, time, _ = header.get_author()
+        assert CommitHeader.decode_identity(author, header.encoding).name == author_name
+        assert CommitHeader.decode_identity(author, header.encoding).email == author_email
+        assert time == int(author_time)
+        committer, _, _ = header.get_committer()
+        assert CommitHeader.decode_identity(committer, header.encoding).name == committer_name
+        assert header.get_commit_time() == int(commit_time)
+        assert header.get_message() == message
+        assert header.get_message_bytes() == message.encode()
+
+
+def test_commit_header_reads_signatures_and_merged_tags(git_repo):
+    sha = git(git_repo, "rev-parse", "signed").decode().strip()
+    tag = git(git_repo, "cat-file", "tag", "topic-release")
+    header = CommitHeader(_cat_file(git_repo, [sha])[sha][1])
+    assert _unindent(header.gpgsig) == SIGNATURE
+    assert [_unindent(mergetag) for mergetag in header.mergetag] == [tag.rstrip(b"\n")]
+    assert header.get_author()[2] == -4 * 60
+    assert header.get_message() == "Merge tag 'topic-release'\n"
+
+
+def test_commit_header_decodes_its_encoding(git_repo):
+    sha = git(git_repo, "rev-parse", "encoded").decode().strip()
+    header = CommitHeader(_cat_file(git_repo, [sha])[sha][1])
+    assert header.encoding == "ISO-8859-1"
+    assert CommitHeader.decode_identity(header.get_author()[0], header.encoding).name == \
+        "René François"
+    assert header.get_message() == "Café crème brûlée\n"
+    assert header.get_message_bytes() == "Café crème brûlée\n".encode()
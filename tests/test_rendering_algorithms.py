@@ -0,0 +1,97 @@
+"""
+Tests of the layout algorithms, on the history of a temporary repository
+as listed by git rev-list --parents (see conftest.git_repo)
+"""
+import pytest
+
+from canvas.rendering_algorithms import (LaneAllocator, MAX_DUMMY_SPAN, layered_layout,
+                                         minimum_width_layout)
+from conftest import get_parents
+
+
+@pytest.fixture(scope="module")
+def history(git_repo):
+    """
+    Return the commits of the repository, children first, and the
+    indices of each commit's parents
+    """
+    commits = get_parents(git_repo)
+    indices = {sha: i for i, (sha, _) in enumerate(commits)}
+    return commits, [[indices[parent] for parent in parents] for _, parents in commits]
+
+
+def test_layered_layout_puts_each_commit_below_its_longest_path(history):
+    commits, parent_indices = history
+    # The commits are children first, so each commit's parents are numbered after it
+    expected_layers = [0] * len(commits)
+    for i in reversed(range(len(commits))):
+        expected_layers[i] = 1 + max((expected_layers[parent] for parent in parent_indices[i]),
+                                     default=-1)
+    assert max(expected_layers[i] - expected_layers[parent]
+               for i, parents in enumerate(parent_indices)
+               for parent in parents) > MAX_DUMMY_SPAN
+
+    layers, columns = layered_layout(parent_indices)
+    assert layers.tolist() == expected_layers
+    for layer in set(expected_layers):
+        layer_columns = sorted(columns[i] for i in range(len(commits)) if layers[i] == layer)
+        assert all(right - left >= 1 - 1e-9
+                   for left, right in zip(layer_columns, layer_columns[1:]))
+
+
+def test_layered_layout_gives_up_past_max_size(history):
+    _, parent_indices = history
+    assert layered_layout(parent_indices, len(parent_indices) - 1) is None
+    assert layered_layout(parent_indices, 10 * len(parent_indices)) is not None
+
+
+def test_minimum_width_layout_puts_each_commit_below_a_parent(history):
+    commits, parent_indices = history
+    rows, columns = minimum_width_layout(parent_indices)
+    for i, parents in enumerate(parent_indices):
+        if parents:
+            assert rows[i] - 1 in [rows[parent] for parent in parents]
+        else:
+            assert rows[i] == 0
+    assert len({(row, column) for row, column in zip(rows.tolist(), columns.tolist())}) == \
+        len(commits)
+
+
+def test_lane_allocator_draws_every_edge_without_overlaps(history):
+    commits, _ = history
+    allocator = LaneAllocator()
+    edges = []
+    for expected_row, (sha, parents) in enumerate(commits):
+        row, column, placed_edges = allocator.place(sha, parents)
+        assert row == expected_row
+        edges.extend(placed_edges)
+
+    assert len(allocator) == len(commits)
+    assert sorted((edge.child, edge.parent) for edge in edges) == \
+        sorted((sha, parent) for sha, parents in commits for parent in parents)
+    columns = allocator.columns
+    assert max(columns) == allocator.num_lanes - 1
+    first_parents = {sha: parents[0] for sha, parents in commits if parents}
+    for edge in edges:
+        assert edge.child_row < edge.parent_row
+        assert edge.child_column == columns[edge.child_row]
+        assert edge.parent_column == columns[edge.parent_row]
+        if first_parents[edge.child] == edge.parent:
+            # The first parent continues down its child's lane
+            assert edge.lane == edge.child_column
+
+    # No lane is shared by commits, or by edges to different parents, in any row
+    for row, column in enumerate(columns):
+        passing_edges = [edge for edge in edges if edge.child_row < row < edge.parent_row]
+        assert column not in [edge.lane for edge in passing_edges]
+        lane_parents = {}
+        for edge in passing_edges:
+            assert lane_parents.setdefault(edge.lane, edge.parent) == edge.parent
+
+
+def test_lane_allocator_keeps_linear_history_in_one_lane():
+    allocator = LaneAllocator()
+    for commit in range(10):
+        allocator.place(commit, [commit + 1] if commit < 9 else [])
+    assert allocator.num_lanes == 1
+    assert list(allocator.columns) == [0] * 10